@@ -0,0 +1,87 @@
+"""
+추적 데이터 perspective transform + ROI 필터링의 처리량(rows/sec)을 행 단위(apply) 구현과 비교한다.
+
+usage: python bench/perspective_transform_bench.py [--rows 1000000] [--legacy-rows 200000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from srv.cctv_tracking_analysis import find_closest_rectangle, transform_persp_data
+
+
+def legacy_transform_persp_data(
+    df: pd.DataFrame, matrix: np.ndarray, roiwidth: int, roiheight: int
+) -> pd.DataFrame:
+    # 행마다 cv2.perspectiveTransform을 호출하던 이전 구현
+    df["_src"] = list(zip(df["x"], df["y"]))
+    df["_dst"] = df["_src"].apply(
+        lambda p: cv2.perspectiveTransform(np.array([[p]], dtype=np.float32), matrix)[
+            0
+        ][0]
+    )
+    df["perspx"] = df["_dst"].apply(lambda p: p[0])
+    df["perspy"] = df["_dst"].apply(lambda p: p[1])
+    df = df.drop(columns=["_src", "_dst"])
+    df = df[(df["perspx"] >= 0) & (df["perspx"] < roiwidth)]
+    df = df[(df["perspy"] >= 0) & (df["perspy"] < roiheight)]
+    return df
+
+
+def make_track_data(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "frame": np.arange(rows) // 20,
+            "objid": rng.integers(1, 5000, rows),
+            "clsid": rng.integers(0, 8, rows),
+            "x": rng.integers(0, 1920, rows),
+            "y": rng.integers(0, 1080, rows),
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--legacy-rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    srcpoints = [(700, 300), (300, 1000), (1200, 300), (1700, 1000)]
+    dstpoints, roiwidth, roiheight = find_closest_rectangle(*srcpoints, ratio=3.0)
+    matrix = cv2.getPerspectiveTransform(
+        np.array(srcpoints, dtype=np.float32), np.array(dstpoints, dtype=np.float32)
+    )
+
+    results = []
+    for name, func, rows in [
+        ("legacy", legacy_transform_persp_data, args.legacy_rows),
+        ("vectorized", transform_persp_data, args.rows),
+    ]:
+        df = make_track_data(rows)
+        start = time.perf_counter()
+        out = func(df, matrix, roiwidth, roiheight)
+        elapsed = time.perf_counter() - start
+        results.append(
+            {
+                "impl": name,
+                "rows": rows,
+                "kept": len(out),
+                "sec": round(elapsed, 4),
+                "rows_per_sec": round(rows / elapsed, 1),
+            }
+        )
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,481 @@
+"""
+합성 도로 영상(synthetic_traffic.py)으로 주요 처리 경로의 성능을 측정하여 JSON으로 저장한다.
+ITS API 키나 실제 CCTV 영상 없이 실행할 수 있으며, --compare로 이전 커밋의 결과와 비교한다.
+객체 추적은 ultralytics, deep_sort_realtime이 설치되어 있고 --yolo-model이 주어진 경우에만 측정한다.
+
+usage: python bench/run_bench.py [--output bench.json] [--compare baseline.json]
+                                 [--only repo,its,analysis,aerial,preview,tracking]
+                                 [--quick] [--yolo-model yolov8n.pt] [--workdir DIR]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+import cv2
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench.synthetic_traffic import make_dataset, simulate_vehicles
+from core.engine import JobContext
+from core.model import CCTVStream, TaskItem, TaskOutput, TaskState
+from repo.cctv_stream_its import CCTVStreamITSRepo
+from repo.task_item_file import TaskItemJsonRepo
+from repo.task_output_file import TaskOutputFileRepo
+from srv.cctv_aerial_render import render_aerial_video
+from srv.cctv_tracking_analysis import (
+    calculate_speed,
+    find_closest_rectangle,
+    interpolate_persp_data,
+    transform_persp_data,
+)
+from srv.video_frame_source import open_frame_source
+from srv.video_output_info import get_video_frame
+from srv.video_sprite import VideoSpriteStore
+from srv.video_thumbnail import VideoThumbnailStore
+
+# results whose value grows when the code gets slower
+SLOWER_IS_WORSE = ("_sec", "_ms")
+
+
+def measure(fn: Callable[[], object], repeat: int) -> float:
+    """
+    fn을 repeat번 실행하여 가장 짧은 실행 시간(초)을 반환한다.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def latency_ms(samples: list[float]) -> dict:
+    values = np.array(samples) * 1000
+    return {
+        "mean_ms": round(float(values.mean()), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def perspective(dataset: dict) -> tuple[np.ndarray, int, int]:
+    # the synthetic road is 3.5m x 4 lanes wide and 20m long
+    lt, lb, rt, rb = dataset["roi"]
+    dstpoints, roiwidth, roiheight = find_closest_rectangle(lt, lb, rt, rb, 20 / 14)
+    matrix = cv2.getPerspectiveTransform(
+        np.array([lt, lb, rt, rb], dtype=np.float32),
+        np.array(dstpoints, dtype=np.float32),
+    )
+    return matrix, roiwidth, roiheight
+
+
+def bench_repo(dataset: dict, workdir: str, args: argparse.Namespace) -> dict:
+    """
+    작업(TaskItem) 추가/갱신, 결과(TaskOutput) 저장 시간. 저장할 때마다 JSON 파일 전체를 다시 쓴다.
+    """
+    n = args.repo_items
+    path = os.path.join(workdir, "repo")
+    os.makedirs(path, exist_ok=True)
+    task_repo = TaskItemJsonRepo(os.path.join(path, "tasks.json"))
+    output_repo = TaskOutputFileRepo(os.path.join(path, "outputs.json"), path)
+    params = {"targetname": "traffic.mp4", "confidence": "0.6", "cctv": "bench"}
+
+    start = time.perf_counter()
+    for i in range(n):
+        task_repo.add(
+            TaskItem(str(i), "bench", params, TaskState.PENDING, "submitted", 0.0)
+        )
+    add = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(n):
+        task_repo.update(str(i), TaskState.FINISHED, "finished")
+    update = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(n):
+        output_repo.save(TaskOutput(f"{i}.csv", "text/csv", "bench", str(i), params))
+    save = time.perf_counter() - start
+
+    return {
+        "items": n,
+        "task_add_ms": round(add / n * 1000, 3),
+        "task_update_ms": round(update / n * 1000, 3),
+        "output_save_ms": round(save / n * 1000, 3),
+    }
+
+
+def its_stub_handler(cctvs: list[dict]) -> type[BaseHTTPRequestHandler]:
+    body = json.dumps({"response": {"data": cctvs}}).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def bench_its(dataset: dict, workdir: str, args: argparse.Namespace) -> dict:
+    """
+    로컬 ITS API stub 서버를 대상으로 한 get_hls 지연 시간. 네트워크를 제외한 요청/응답 처리 비용을 본다.
+    """
+    rng = np.random.default_rng(0)
+    cctvs = [
+        {
+            "cctvtype": 1,
+            "cctvurl": f"http://stub/{i}.m3u8",
+            "coordx": str(127.0 + x),
+            "coordy": str(37.5 + y),
+            "cctvformat": "HLS",
+            "cctvname": f"cctv {i}",
+        }
+        for i, (x, y) in enumerate(rng.uniform(-0.01, 0.01, (args.its_cctvs, 2)))
+    ]
+    server = ThreadingHTTPServer(("127.0.0.1", 0), its_stub_handler(cctvs))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        repo = CCTVStreamITSRepo(
+            os.path.join(workdir, "cctvstream.json"),
+            "bench",
+            api_url=f"http://127.0.0.1:{server.server_address[1]}/cctvInfo",
+        )
+        stream = repo.save("bench", (127.0, 37.5))
+
+        samples = []
+        for _ in range(args.its_requests):
+            start = time.perf_counter()
+            repo.get_hls(CCTVStream(stream.name, stream.coordx, stream.coordy))
+            samples.append(time.perf_counter() - start)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    return {
+        "cctvs": args.its_cctvs,
+        "requests": args.its_requests,
+        **latency_ms(samples),
+    }
+
+
+def bench_analysis(dataset: dict, workdir: str, args: argparse.Namespace) -> dict:
+    """
+    긴 추적 데이터에 대한 perspective transform, 보간, 속도 계산 시간.
+    """
+    size = tuple(dataset["size"])
+    vehicles = simulate_vehicles(
+        args.analysis_frames, size, dataset["density"], dataset["speed"], seed=1
+    )
+    # drop observations like a real tracker, keeping both ends of each object
+    rng = np.random.default_rng(2)
+    group = vehicles.groupby("objid")["frame"]
+    edge = (vehicles["frame"] == group.transform("min")) | (
+        vehicles["frame"] == group.transform("max")
+    )
+    df = vehicles[edge | (rng.random(len(vehicles)) >= 0.1)]
+    df = df[["frame", "objid", "clsid", "x", "y"]].reset_index(drop=True)
+
+    matrix, roiwidth, roiheight = perspective(dataset)
+    transform = measure(
+        lambda: transform_persp_data(df, matrix, roiwidth, roiheight), args.repeat
+    )
+    persp = transform_persp_data(df, matrix, roiwidth, roiheight)
+    interpolate = measure(lambda: interpolate_persp_data(persp), args.repeat)
+    interpolated = interpolate_persp_data(persp)
+    speed = measure(
+        lambda: calculate_speed(interpolated, dataset["fps"], 0.05, smoothing=5),
+        args.repeat,
+    )
+
+    return {
+        "rows": len(df),
+        "interpolated_rows": len(interpolated),
+        "transform_sec": round(transform, 4),
+        "interpolate_sec": round(interpolate, 4),
+        "speed_sec": round(speed, 4),
+        "interpolate_rows_per_sec": round(len(interpolated) / interpolate, 1),
+    }
+
+
+def bench_aerial(dataset: dict, workdir: str, args: argparse.Namespace) -> dict:
+    """
+    합성 영상과 추적 데이터로 항공뷰 영상을 만드는 속도(fps).
+    """
+    matrix, roiwidth, roiheight = perspective(dataset)
+    df = interpolate_persp_data(
+        transform_persp_data(pd.read_csv(dataset["csv"]), matrix, roiwidth, roiheight)
+    )
+
+    path = os.path.join(workdir, "aerial.mp4")
+    source = open_frame_source(dataset["video"])
+    writer = cv2.VideoWriter(
+        path, cv2.VideoWriter.fourcc(*"mp4v"), dataset["fps"], (roiwidth, roiheight)
+    )
+    try:
+        start = time.perf_counter()
+        render_aerial_video(source, writer, df, matrix, (roiwidth, roiheight), 30)
+        elapsed = time.perf_counter() - start
+    finally:
+        source.release()
+        writer.release()
+
+    return {
+        "frames": dataset["frames"],
+        "size": [roiwidth, roiheight],
+        "render_sec": round(elapsed, 4),
+        "render_fps": round(dataset["frames"] / elapsed, 1),
+    }
+
+
+def bench_preview(dataset: dict, workdir: str, args: argparse.Namespace) -> dict:
+    """
+    미리보기 이미지(무작위 프레임, 키프레임 썸네일), 스크러빙 스프라이트의 생성 및 조회 시간.
+    """
+    outputs_path = os.path.join(workdir, "outputs")
+    os.makedirs(outputs_path, exist_ok=True)
+    name = "traffic.mp4"
+    shutil.copy(dataset["video"], os.path.join(outputs_path, name))
+
+    samples = []
+    for _ in range(args.preview_requests):
+        start = time.perf_counter()
+        get_video_frame(os.path.join(outputs_path, name), random_number=True)
+        samples.append(time.perf_counter() - start)
+    random_frame = latency_ms(samples)
+
+    thumbnails = VideoThumbnailStore(outputs_path)
+    thumbnail_generate = measure(lambda: thumbnails.generate(name), args.repeat)
+    samples = []
+    for _ in range(args.preview_requests):
+        start = time.perf_counter()
+        thumbnails.get(name, 320)
+        samples.append(time.perf_counter() - start)
+    thumbnail_get = latency_ms(samples)
+
+    sprites = VideoSpriteStore(outputs_path, interval=1.0)
+    sprite_generate = measure(lambda: sprites.generate(name), 1)
+    duration = dataset["frames"] / dataset["fps"]
+    samples = []
+    for i in range(args.preview_requests):
+        start = time.perf_counter()
+        sprites.get_tile(name, duration * i / args.preview_requests)
+        samples.append(time.perf_counter() - start)
+    sprite_tile = latency_ms(samples)
+
+    return {
+        "random_frame_mean_ms": random_frame["mean_ms"],
+        "random_frame_p95_ms": random_frame["p95_ms"],
+        "thumbnail_generate_sec": round(thumbnail_generate, 4),
+        "thumbnail_get_mean_ms": thumbnail_get["mean_ms"],
+        "thumbnail_get_p95_ms": thumbnail_get["p95_ms"],
+        "sprite_generate_sec": round(sprite_generate, 4),
+        "sprite_tile_mean_ms": sprite_tile["mean_ms"],
+        "sprite_tile_p95_ms": sprite_tile["p95_ms"],
+    }
+
+
+def bench_tracking(dataset: dict, workdir: str, args: argparse.Namespace) -> dict:
+    """
+    합성 영상에 대한 객체 추적 실행 시간과 단계(decode, inference, tracker, encode)별 프레임당 시간.
+    """
+    if not args.yolo_model:
+        return {"skipped": "--yolo-model is not given"}
+    try:
+        from srv.cctv_yolov8_deepsort import (
+            TRACKING_FRAME_SECONDS,
+            YOLOv8DeepSORTTackingTaskSrv,
+            load_tracking_modules,
+        )
+
+        load_tracking_modules()
+    except ImportError as e:
+        return {"skipped": f"tracking modules are not installed: {e.name}"}
+
+    outputs_path = os.path.join(workdir, "tracking")
+    os.makedirs(outputs_path, exist_ok=True)
+    shutil.copy(dataset["video"], os.path.join(outputs_path, "traffic.mp4"))
+    task_repo = TaskItemJsonRepo(os.path.join(outputs_path, "tasks.json"))
+    output_repo = TaskOutputFileRepo(
+        os.path.join(outputs_path, "outputs.json"), outputs_path
+    )
+    srv = YOLOv8DeepSORTTackingTaskSrv(
+        task_repo=task_repo,
+        model_path=args.yolo_model,
+        outputs_path=outputs_path,
+        output_repo=output_repo,
+        engine=None,  # type: ignore (run_task does not submit jobs)
+    )
+    task = TaskItem(
+        id="bench",
+        name=srv.get_name(),
+        params={
+            "targetname": "traffic.mp4",
+            "confidence": "0.6",
+            "fps": str(dataset["fps"]),
+            "cctv": "bench",
+        },
+        state=TaskState.PENDING,
+        reason="submitted",
+        progress=0.0,
+    )
+    task_repo.add(task)
+
+    stages = ["decode", "inference", "tracker", "encode"]
+    children = {s: TRACKING_FRAME_SECONDS.labels(s) for s in stages}
+    before = {s: (child.sum, child.count) for s, child in children.items()}
+    start = time.perf_counter()
+    srv.run_task(JobContext(task.id, task_repo, threading.Event(), ""), task)
+    elapsed = time.perf_counter() - start
+
+    task = task_repo.get(task.id)
+    if task.state != TaskState.FINISHED:
+        raise RuntimeError(f"tracking failed: {task.reason}")
+
+    result = {
+        "frames": dataset["frames"],
+        "task_sec": round(elapsed, 4),
+        "task_fps": round(dataset["frames"] / elapsed, 1),
+    }
+    for s, child in children.items():
+        total, count = child.sum - before[s][0], child.count - before[s][1]
+        if count:
+            result[f"{s}_ms"] = round(total / count * 1000, 3)
+    result["peak_rss_bytes"] = task.stats.get("peak_rss_bytes")
+    return result
+
+
+BENCHMARKS: dict[str, Callable[[dict, str, argparse.Namespace], dict]] = {
+    "repo": bench_repo,
+    "its": bench_its,
+    "analysis": bench_analysis,
+    "aerial": bench_aerial,
+    "preview": bench_preview,
+    "tracking": bench_tracking,
+}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    시간 지표(_sec, _ms)별로 baseline 대비 비율을 출력하고, threshold보다 느려진 지표 목록을 반환한다.
+    """
+    regressions = []
+    for name, values in results["results"].items():
+        base = baseline.get("results", {}).get(name, {})
+        for key, value in values.items():
+            if not key.endswith(SLOWER_IS_WORSE):
+                continue
+            if not isinstance(base.get(key), (int, float)) or not base[key]:
+                continue
+            ratio = value / base[key]
+            mark = ""
+            if ratio > threshold:
+                mark = "  <-- slower"
+                regressions.append(f"{name}.{key}")
+            print(
+                f"{name}.{key}: {base[key]} -> {value} (x{ratio:.2f}){mark}",
+                file=sys.stderr,
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--output", help="결과 JSON 파일 (기본값: stdout)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 파일")
+    parser.add_argument("--threshold", type=float, default=1.2, help="느려짐 판정 비율")
+    parser.add_argument("--only", help="실행할 벤치마크 (쉼표로 구분)")
+    parser.add_argument("--quick", action="store_true", help="작은 규모로 빠르게 실행")
+    parser.add_argument("--yolo-model", help="객체 추적에 사용할 YOLOv8 모델 경로")
+    parser.add_argument("--workdir", help="작업 디렉터리 (기본값: 임시 디렉터리)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scale = 0.2 if args.quick else 1.0
+    args.frames = int(900 * scale)
+    args.repo_items = int(500 * scale)
+    args.its_cctvs = 200
+    args.its_requests = int(200 * scale)
+    args.analysis_frames = int(108000 * scale)  # 1 hour at 30 fps
+    args.preview_requests = int(100 * scale)
+    args.repeat = 1 if args.quick else 3
+
+    names = list(BENCHMARKS)
+    if args.only:
+        names = [name.strip() for name in args.only.split(",") if name.strip()]
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="cctv-bench-")
+    try:
+        dataset = make_dataset(
+            os.path.join(workdir, "dataset"), frames=args.frames, seed=args.seed
+        )
+        results = {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "createdat": datetime.now().isoformat(timespec="seconds"),
+            "quick": args.quick,
+            "dataset": {k: v for k, v in dataset.items() if k not in ("video", "csv")},
+            "results": {},
+        }
+        for name in names:
+            print(f"running {name} ...", file=sys.stderr)
+            results["results"][name] = BENCHMARKS[name](dataset, workdir, args)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"slower than baseline: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
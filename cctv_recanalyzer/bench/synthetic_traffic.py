@@ -0,0 +1,194 @@
+"""
+벤치마크용 합성 도로 영상과 그에 맞는 추적 데이터(csv)를 만든다.
+차로를 따라 위에서 아래로 움직이는 사각형(차량)을 그리며, 화면에 동시에 보이는 평균 차량 수(density)와
+속도(speed, px/frame)를 조절할 수 있다. 같은 seed이면 같은 영상과 추적 데이터가 만들어진다.
+
+usage: python bench/synthetic_traffic.py <out_dir> [--frames 900] [--size 1280x720]
+                                         [--density 8] [--speed 6] [--seed 0]
+"""
+
+import argparse
+import json
+import os
+
+import cv2
+import numpy as np
+import pandas as pd
+
+# [lt, lb, rt, rb] ROI of the road, as a fraction of the video size
+ROI_FRACTIONS = [(0.3, 0.1), (0.1, 0.95), (0.7, 0.1), (0.9, 0.95)]
+
+
+def road_roi(size: tuple[int, int]) -> list[tuple[int, int]]:
+    """
+    합성 영상의 도로 영역(ROI) 좌표 [lt, lb, rt, rb]를 반환한다.
+    """
+    width, height = size
+    return [(int(fx * width), int(fy * height)) for fx, fy in ROI_FRACTIONS]
+
+
+def simulate_vehicles(
+    frames: int,
+    size: tuple[int, int],
+    density: float,
+    speed: float,
+    lanes: int = 4,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    차량의 프레임별 중심 좌표(frame, objid, clsid, x, y, w, h)를 만든다. (objid, frame) 순으로 정렬된다.
+    차량은 도로 위쪽에서 나타나 원근에 따라 커지면서 아래로 이동하며, 속도는 speed의 ±30% 범위에서 정해진다.
+    """
+    rng = np.random.default_rng(seed)
+    (ltx, lty), (lbx, lby), (rtx, _), (rbx, _) = road_roi(size)
+
+    # frames a vehicle stays on the road, and the arrival rate giving `density`
+    travel = (lby - lty) / speed
+    arrivals = rng.poisson(density / travel, frames + int(travel))
+
+    rows = []
+    objid = 0
+    for start, count in enumerate(arrivals):
+        for _ in range(count):
+            objid += 1
+            lane = rng.integers(0, lanes)
+            clsid = int(rng.choice([2, 2, 2, 5, 7]))  # car, bus, truck (COCO)
+            vspeed = speed * rng.uniform(0.7, 1.3)
+
+            frame = np.arange(start - int(travel), frames)
+            y = lty + (frame - (start - int(travel))) * vspeed
+            keep = (frame >= 0) & (y < lby)
+            frame, y = frame[keep], y[keep]
+            if len(frame) == 0:
+                continue
+
+            # lane center at that depth (the road narrows towards the top)
+            t = (y - lty) / (lby - lty)
+            left = ltx + (lbx - ltx) * t
+            right = rtx + (rbx - rtx) * t
+            x = left + (right - left) * (lane + 0.5) / lanes
+            w = (right - left) / lanes * (0.4 if clsid == 2 else 0.5)
+            h = w * (1.2 if clsid == 2 else 2.0)
+
+            rows.append(
+                pd.DataFrame(
+                    {
+                        "frame": frame,
+                        "objid": objid,
+                        "clsid": clsid,
+                        "x": x.astype(int),
+                        "y": y.astype(int),
+                        "w": w.astype(int),
+                        "h": h.astype(int),
+                    }
+                )
+            )
+
+    if not rows:
+        return pd.DataFrame(columns=["frame", "objid", "clsid", "x", "y", "w", "h"])
+    return pd.concat(rows, ignore_index=True)
+
+
+def write_video(
+    path: str, vehicles: pd.DataFrame, frames: int, size: tuple[int, int], fps: int
+):
+    """
+    vehicles의 차량을 회색 도로 위의 사각형으로 그린 영상(mp4v)을 저장한다.
+    """
+    width, height = size
+    roi = road_roi(size)
+    background = np.full((height, width, 3), (60, 90, 60), dtype=np.uint8)
+    road = np.array([roi[0], roi[2], roi[3], roi[1]], dtype=np.int32)
+    cv2.fillPoly(background, [road], (90, 90, 90))
+    cv2.polylines(background, [road], True, (220, 220, 220), 2)
+
+    rng = np.random.default_rng(0)
+    colors = rng.integers(40, 255, (int(vehicles["objid"].max() or 0) + 1, 3))
+    by_frame = vehicles.sort_values("frame", kind="stable")
+    offsets = np.searchsorted(by_frame["frame"].to_numpy(), np.arange(frames + 1))
+    values = by_frame[["objid", "x", "y", "w", "h"]].to_numpy()
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter.fourcc(*"mp4v"), fps, size)
+    try:
+        for i in range(frames):
+            frame = background.copy()
+            for objid, x, y, w, h in values[offsets[i] : offsets[i + 1]]:
+                color = tuple(int(c) for c in colors[objid])
+                cv2.rectangle(
+                    frame, (x - w // 2, y - h // 2), (x + w // 2, y + h // 2), color, -1
+                )
+            writer.write(frame)
+    finally:
+        writer.release()
+
+
+def make_dataset(
+    out_dir: str,
+    frames: int = 900,
+    size: tuple[int, int] = (1280, 720),
+    fps: int = 30,
+    density: float = 8.0,
+    speed: float = 6.0,
+    drop: float = 0.1,
+    seed: int = 0,
+) -> dict:
+    """
+    out_dir에 합성 영상(traffic.mp4)과 추적 데이터(traffic.csv)를 만들고 데이터셋 정보를 반환한다.
+    추적 데이터는 실제 추적 결과처럼 drop 비율의 관측을 빠뜨려 보간할 구간을 만든다.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    vehicles = simulate_vehicles(frames, size, density, speed, seed=seed)
+
+    video_path = os.path.join(out_dir, "traffic.mp4")
+    write_video(video_path, vehicles, frames, size, fps)
+
+    # drop observations but keep the first and last frame of each object
+    rng = np.random.default_rng(seed + 1)
+    group = vehicles.groupby("objid")["frame"]
+    edge = (vehicles["frame"] == group.transform("min")) | (
+        vehicles["frame"] == group.transform("max")
+    )
+    track = vehicles[edge | (rng.random(len(vehicles)) >= drop)]
+    csv_path = os.path.join(out_dir, "traffic.csv")
+    track[["frame", "objid", "clsid", "x", "y"]].to_csv(csv_path, index=False)
+
+    return {
+        "video": video_path,
+        "csv": csv_path,
+        "frames": frames,
+        "size": list(size),
+        "fps": fps,
+        "density": density,
+        "speed": speed,
+        "objects": int(vehicles["objid"].nunique()),
+        "rows": len(track),
+        "roi": road_roi(size),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("out_dir")
+    parser.add_argument("--frames", type=int, default=900)
+    parser.add_argument("--size", default="1280x720", help="WIDTHxHEIGHT")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--density", type=float, default=8.0, help="동시에 보이는 차량 수")
+    parser.add_argument("--speed", type=float, default=6.0, help="px/frame")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    width, height = args.size.lower().split("x")
+    dataset = make_dataset(
+        args.out_dir,
+        frames=args.frames,
+        size=(int(width), int(height)),
+        fps=args.fps,
+        density=args.density,
+        speed=args.speed,
+        seed=args.seed,
+    )
+    print(json.dumps(dataset, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+프레임 소스 백엔드별 디코딩 속도(fps)를 측정한다.
+
+usage: python bench/video_decode_bench.py <video.mp4> [--backends opencv,pyav,ffmpeg]
+                                           [--size 960x540] [--frames 900] [--threads 0]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from srv.video_frame_source import FRAME_SOURCE_BACKENDS, open_frame_source
+
+
+def bench_decode(
+    path: str,
+    backend: str,
+    size: tuple[int, int] | None,
+    max_frames: int,
+    threads: int,
+) -> dict:
+    start = time.perf_counter()
+    with open_frame_source(path, backend=backend, size=size, threads=threads) as src:
+        opened = time.perf_counter()
+        frames = 0
+        checksum = 0
+        for frame in src:
+            checksum += int(frame[0, 0, 0])  # 실제로 버퍼를 읽도록 강제한다.
+            frames += 1
+            if max_frames and frames >= max_frames:
+                break
+    end = time.perf_counter()
+
+    return {
+        "backend": backend,
+        "size": f"{src.width}x{src.height}",
+        "frames": frames,
+        "open_sec": round(opened - start, 4),
+        "decode_sec": round(end - opened, 4),
+        "fps": round(frames / (end - opened), 2) if end > opened else 0.0,
+        "checksum": checksum,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("video")
+    parser.add_argument("--backends", default=",".join(FRAME_SOURCE_BACKENDS))
+    parser.add_argument("--size", default=None, help="WIDTHxHEIGHT")
+    parser.add_argument("--frames", type=int, default=0, help="0: 전체 프레임")
+    parser.add_argument("--threads", type=int, default=0)
+    args = parser.parse_args()
+
+    size = None
+    if args.size:
+        width, height = args.size.lower().split("x")
+        size = (int(width), int(height))
+
+    results = []
+    for backend in args.backends.split(","):
+        try:
+            results.append(
+                bench_decode(args.video, backend, size, args.frames, args.threads)
+            )
+        except Exception as e:
+            results.append({"backend": backend, "error": repr(e)})
+        print(json.dumps(results[-1], ensure_ascii=False), file=sys.stderr)
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
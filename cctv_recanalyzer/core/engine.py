@@ -0,0 +1,252 @@
+import heapq
+import itertools
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Callable
+
+from core.model import EntityNotFound, TaskCancelException, TaskState
+from core.repo import TaskItemRepository
+
+
+class ResourceClass(Enum):
+    IO = "io"  # 녹화: 시작 시각이 정해져 있어 늦게 시작하면 영상이 유실되는 작업
+    CPU_HEAVY = "cpu_heavy"  # 객체 인식, 영상 렌더링 (GPU/CPU 전체 사용)
+    CPU_LIGHT = "cpu_light"  # 추적 데이터 분석
+    CONTROL = "control"  # 다른 작업의 완료를 기다리며 다음 단계를 시작하는 작업 (파이프라인)
+
+
+FINISHED_STATES = (TaskState.FINISHED, TaskState.FAILED, TaskState.CANCELED)
+
+# started as soon as they are due, never queued behind a concurrency limit
+UNBOUNDED_RESOURCES = (ResourceClass.IO,)
+
+
+class JobContext:
+    """
+    엔진에서 실행되는 작업이 진행률(0~1)과 상태 메시지를 보고하고, 취소 요청을 확인한다.
+    """
+
+    def __init__(
+        self,
+        taskid: str,
+        task_repo: TaskItemRepository,
+        cancel_event: threading.Event,
+        cancel_reason: str,
+    ):
+        self.taskid = taskid
+        self._task_repo = task_repo
+        self._cancel_event = cancel_event
+        self._cancel_reason = cancel_reason
+        self._last_progress = -1.0
+
+    def set_progress(self, progress: float, reason: str | None = None):
+        """
+        작업의 진행률을 갱신한다. 상태 메시지가 있으면 작업을 STARTED 상태로 갱신한다.
+        이미 종료되었거나 삭제된 작업은 무시한다.
+        """
+        # update at most every 1% unless a message is attached
+        if reason is None and abs(progress - self._last_progress) < 0.01:
+            return
+        self._last_progress = progress
+
+        try:
+            task = self._task_repo.get(self.taskid)
+        except EntityNotFound:
+            return
+        if task.state in FINISHED_STATES:
+            return
+
+        task.progress = min(1.0, max(0.0, progress))
+        if reason is not None:
+            self._task_repo.update(self.taskid, TaskState.STARTED, reason)
+
+    def is_canceled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def raise_if_canceled(self, message: str | None = None):
+        if self._cancel_event.is_set():
+            raise TaskCancelException(message or self._cancel_reason)
+
+    def wait(self, timeout: float) -> bool:
+        """
+        최대 timeout초 동안 기다린다. 그 사이 취소가 요청되면 바로 True를 반환한다.
+        """
+        return self._cancel_event.wait(timeout)
+
+
+@dataclass(order=True)
+class _Job:
+    sort_key: tuple
+    taskid: str = field(compare=False)
+    resource: ResourceClass = field(compare=False)
+    fn: Callable[[JobContext], None] = field(compare=False)
+    cancel_reason: str = field(compare=False)
+    cancel_event: threading.Event = field(compare=False)
+    started: bool = field(default=False, compare=False)
+
+
+class TaskEngine:
+    """
+    작업 서비스들이 공유하는 작업 실행기.
+    작업은 자원 종류(ResourceClass)별 우선순위 큐에서 대기하며, 종류별 동시 실행 수(limits)를 넘지 않게 실행된다.
+    UNBOUNDED_RESOURCES(녹화)는 동시 실행 수를 제한하지 않으므로 limits에 주지 않는다.
+    우선순위가 높은 작업이 먼저, 같으면 먼저 제출된 작업이 먼저 실행된다.
+    not_before가 주어진 작업은 그 시각이 된 뒤에 큐에 들어간다. (예약 녹화)
+    대기 중에 취소된 작업은 실행하지 않고 CANCELED 상태로 바꾸며, 실행 중인 작업에는 JobContext로 취소를 알린다.
+    """
+
+    def __init__(
+        self, task_repo: TaskItemRepository, limits: dict[ResourceClass, int]
+    ):
+        for resource in ResourceClass:
+            if resource in UNBOUNDED_RESOURCES:
+                continue
+            if limits.get(resource, 0) < 1:
+                raise ValueError(f"{resource.value} 동시 실행 수는 1 이상이어야 합니다.")
+
+        self._cond = threading.Condition()
+        self._task_repo = task_repo
+        self._limits = {
+            r: n for r, n in limits.items() if r not in UNBOUNDED_RESOURCES
+        }
+        self._seq = itertools.count()
+
+        self._queues: dict[ResourceClass, list[_Job]] = {r: [] for r in ResourceClass}
+        self._running: dict[ResourceClass, int] = {r: 0 for r in ResourceClass}
+        # (not_before timestamp, seq, job)
+        self._scheduled: list[tuple[float, int, _Job]] = []
+        self._jobs: dict[str, _Job] = {}
+
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    def submit(
+        self,
+        taskid: str,
+        resource: ResourceClass,
+        fn: Callable[[JobContext], None],
+        priority: int = 0,
+        not_before: datetime | None = None,
+        cancel_reason: str = "작업이 요청에 의해 취소되었습니다.",
+    ):
+        """
+        fn(JobContext)을 resource 종류의 작업으로 제출한다.
+        """
+        seq = next(self._seq)
+        job = _Job(
+            sort_key=(-priority, seq),
+            taskid=taskid,
+            resource=resource,
+            fn=fn,
+            cancel_reason=cancel_reason,
+            cancel_event=threading.Event(),
+        )
+
+        with self._cond:
+            if taskid in self._jobs:
+                raise ValueError(f"이미 제출된 작업입니다. id={taskid}")
+            self._jobs[taskid] = job
+            if not_before is not None and not_before.timestamp() > time.time():
+                heapq.heappush(self._scheduled, (not_before.timestamp(), seq, job))
+            else:
+                heapq.heappush(self._queues[resource], job)
+            self._cond.notify_all()
+
+    def cancel(self, taskid: str) -> bool:
+        """
+        대기 중인 작업은 실행하지 않고 취소하고, 실행 중인 작업에는 취소를 요청한다. 작업이 없으면 False를 반환한다.
+        """
+        with self._cond:
+            job = self._jobs.get(taskid)
+            if job is None:
+                return False
+            job.cancel_event.set()
+            if job.started:
+                return True
+
+            del self._jobs[taskid]
+            queue = self._queues[job.resource]
+            if job in queue:
+                queue.remove(job)
+                heapq.heapify(queue)
+            else:
+                self._scheduled = [s for s in self._scheduled if s[2] is not job]
+                heapq.heapify(self._scheduled)
+
+        try:
+            self._task_repo.update(taskid, TaskState.CANCELED, job.cancel_reason)
+        except EntityNotFound:
+            pass
+        return True
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """
+        자원 종류별 실행 중/대기 중 작업 수와 동시 실행 한도(0: 제한 없음)를 반환한다.
+        """
+        with self._cond:
+            scheduled: dict[ResourceClass, int] = {r: 0 for r in ResourceClass}
+            for _, _, job in self._scheduled:
+                scheduled[job.resource] += 1
+            return {
+                r.value: {
+                    "running": self._running[r],
+                    "queued": len(self._queues[r]),
+                    "scheduled": scheduled[r],
+                    "limit": self._limits.get(r, 0),
+                }
+                for r in ResourceClass
+            }
+
+    def _dispatch(self):
+        with self._cond:
+            while True:
+                now = time.time()
+                while self._scheduled and self._scheduled[0][0] <= now:
+                    _, _, job = heapq.heappop(self._scheduled)
+                    heapq.heappush(self._queues[job.resource], job)
+
+                for resource in ResourceClass:
+                    queue = self._queues[resource]
+                    limit = self._limits.get(resource)
+                    while queue and (limit is None or self._running[resource] < limit):
+                        job = heapq.heappop(queue)
+                        job.started = True
+                        self._running[resource] += 1
+                        threading.Thread(
+                            target=self._run, args=(job,), daemon=True
+                        ).start()
+
+                timeout = None
+                if self._scheduled:
+                    timeout = max(0.0, self._scheduled[0][0] - now)
+                self._cond.wait(timeout)
+
+    def _run(self, job: _Job):
+        ctx = JobContext(
+            job.taskid, self._task_repo, job.cancel_event, job.cancel_reason
+        )
+        try:
+            job.fn(ctx)
+        except TaskCancelException as e:
+            self._finish_task(job.taskid, TaskState.CANCELED, str(e))
+        except Exception as e:
+            self._finish_task(
+                job.taskid, TaskState.FAILED, "".join(traceback.format_exception(e))
+            )
+        finally:
+            with self._cond:
+                self._running[job.resource] -= 1
+                del self._jobs[job.taskid]
+                self._cond.notify_all()
+
+    def _finish_task(self, taskid: str, state: TaskState, reason: str):
+        # fallback for exceptions the task function did not handle
+        try:
+            if self._task_repo.get(taskid).state not in FINISHED_STATES:
+                self._task_repo.update(taskid, state, reason)
+        except EntityNotFound:
+            pass
@@ -0,0 +1,347 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+# seconds, from a fraction of a frame to a long-running stage
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _ValueChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_upper", "_counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self._lock = threading.Lock()
+        self._upper = buckets
+        self._counts = [0] * (len(buckets) + 1)  # last: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self._upper, value)
+        with self._lock:
+            self._counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def buckets(self) -> list[tuple[float, int]]:
+        """
+        (상한, 누적 개수) 목록을 반환한다. 마지막 상한은 +Inf이다.
+        """
+        with self._lock:
+            counts = list(self._counts)
+        cumulative = 0
+        result = []
+        for upper, count in zip((*self._upper, float("inf")), counts):
+            cumulative += count
+            result.append((upper, cumulative))
+        return result
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: list[str] | None = None,
+        registry: "MetricsRegistry | None" = None,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames or [])
+        self._lock = threading.Lock()
+        self._children: dict[tuple[str, ...], object] = {}
+        (registry or REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """
+        레이블 값에 해당하는 측정값을 반환한다. 반복문에서는 미리 받아 두고 사용한다.
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: 레이블 {self.labelnames}의 값이 필요합니다.")
+
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, *values):
+        with self._lock:
+            self._children.pop(tuple(str(v) for v in values), None)
+
+    def _items(self) -> list[tuple[tuple[str, ...], object]]:
+        with self._lock:
+            return list(self._children.items())
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """
+    증가만 하는 값 (처리한 프레임 수, 오류 횟수 등)
+    """
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _samples(self) -> Iterator[str]:
+        for key, child in self._items():
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}{labels} {_format_value(child.value)}"  # type: ignore
+
+
+class Gauge(_Metric):
+    """
+    현재 값 (대기 중인 작업 수, 녹화 비트레이트 등)
+    collect가 주어지면 수집할 때마다 collect()가 반환한 {레이블 값: 값}을 내보낸다.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: list[str] | None = None,
+        registry: "MetricsRegistry | None" = None,
+        collect: Callable[[], dict[tuple[str, ...], float]] | None = None,
+    ):
+        super().__init__(name, help, labelnames, registry)
+        self._collect = collect
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def _samples(self) -> Iterator[str]:
+        if self._collect is not None:
+            items = list(self._collect().items())
+        else:
+            items = [(key, child.value) for key, child in self._items()]  # type: ignore
+        for key, value in items:
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}{labels} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """
+    값의 분포 (프레임 단계별 처리 시간, API 응답 시간 등)
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: list[str] | None = None,
+        registry: "MetricsRegistry | None" = None,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self._buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self._buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _samples(self) -> Iterator[str]:
+        names = (*self.labelnames, "le")
+        for key, child in self._items():
+            for upper, count in child.buckets():  # type: ignore
+                labels = _format_labels(names, (*key, _format_value(upper)))
+                yield f"{self.name}_bucket{labels} {count}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"  # type: ignore
+            yield f"{self.name}_count{labels} {child.count}"  # type: ignore
+
+
+class MetricsRegistry:
+    """
+    측정값을 모아 Prometheus 텍스트 형식(/metrics)으로 내보낸다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"이미 등록된 측정값입니다: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class StageTimer:
+    """
+    반복문의 단계별 소요 시간을 every번에 한 번만 측정하여 histogram의 stages 레이블에 기록한다.
+    측정하지 않는 반복에서는 정수 비교만 하므로 프레임 단위 반복문에 그대로 둘 수 있다.
+
+        timer.start()
+        for frame in source:
+            timer.lap(0)  # decode
+            ...
+            timer.lap(1)  # inference
+            timer.start()
+    """
+
+    def __init__(self, histogram: Histogram, stages: list[str], every: int = 10):
+        self._children = [histogram.labels(stage) for stage in stages]
+        self._every = every
+        self._count = 0
+        self._sampling = False
+        self._last = 0.0
+
+    def start(self):
+        self._count += 1
+        self._sampling = self._count >= self._every
+        if self._sampling:
+            self._count = 0
+            self._last = time.perf_counter()
+
+    def lap(self, stage: int):
+        if self._sampling:
+            now = time.perf_counter()
+            self._children[stage].observe(now - self._last)
+            self._last = now
+
+
+class StageClock:
+    """
+    작업의 단계별 소요 시간(초)을 잰다. 다른 프로세스에서 잰 결과는 durations를 반환하여 기록한다.
+    """
+
+    def __init__(self):
+        self.durations: dict[str, float] = {}
+        self._stage: str | None = None
+        self._start = 0.0
+
+    def stage(self, name: str | None):
+        """
+        이전 단계를 끝내고 name 단계를 시작한다. None이면 이전 단계만 끝낸다.
+        """
+        now = time.perf_counter()
+        if self._stage is not None:
+            self.durations[self._stage] = (
+                self.durations.get(self._stage, 0.0) + now - self._start
+            )
+        self._stage = name
+        self._start = now
+
+
+@contextmanager
+def timed(child) -> Iterator[None]:
+    """
+    블록의 실행 시간을 histogram(labels()의 반환값)에 기록한다.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        child.observe(time.perf_counter() - start)
+
+
+@contextmanager
+def timed_lock(lock, wait_child) -> Iterator[None]:
+    """
+    lock을 얻을 때까지 기다린 시간을 histogram에 기록하고 블록을 실행한다.
+    """
+    start = time.perf_counter()
+    with lock:
+        wait_child.observe(time.perf_counter() - start)
+        yield
+
+
+REPO_LOCK_WAIT_SECONDS = Histogram(
+    "cctv_repo_lock_wait_seconds",
+    "Time spent waiting for a repository lock",
+    ["repo"],
+)
+REPO_SAVE_SECONDS = Histogram(
+    "cctv_repo_save_seconds",
+    "Time spent writing a repository file",
+    ["repo"],
+)
@@ -28,7 +28,7 @@ class TaskParamMeta:
     optional: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class TaskItem:
     id: str
     name: str
@@ -37,9 +37,11 @@ class TaskItem:
     reason: str
     progress: float
     createdat: datetime = field(default_factory=datetime.now)
+    # 완료된 작업의 자원 사용량 (wall_seconds, cpu_seconds, peak_rss_bytes, read_bytes, ...)
+    stats: dict[str, float] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class TaskOutput:
     name: str  # filename [identifier]
     type: str
@@ -47,10 +49,37 @@ class TaskOutput:
     taskid: str
     metadata: dict[str, str]  # custom field
     createdat: datetime = field(default_factory=datetime.now)
+    size: int = 0  # bytes, set by the repository when saved
+    pinned: bool = False  # excluded from quota / retention eviction
 
 
-@dataclass
+@dataclass(slots=True)
 class CCTVStream:
     name: str
     coordx: float
     coordy: float
+
+
+@dataclass
+class QueuedJob:
+    """
+    작업 대기열(JobQueueRepository)에 들어간 작업. 작업자(worker.py)가 임대(lease)하여 실행한다.
+    """
+
+    id: str  # TaskItem.id
+    kind: str  # 작업 종류 (tracking, analysis, batch_analysis)
+    name: str
+    params: dict[str, str]
+    priority: int = 0
+    cancelreason: str = "작업이 요청에 의해 취소되었습니다."
+    state: TaskState = TaskState.PENDING
+    reason: str = ""
+    progress: float = 0.0
+    attempts: int = 0
+    worker: str | None = None
+    leaseuntil: float | None = None  # unix timestamp
+    canceled: bool = False
+    outputs: list[TaskOutput] = field(default_factory=list)
+    stats: dict[str, float] = field(default_factory=dict)  # TaskItem.stats
+    version: int = 0  # 대기열 전체에서 증가하는 변경 번호
+    createdat: datetime = field(default_factory=datetime.now)
@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
+from typing import Callable
 
-from core.model import CCTVStream, TaskItem, TaskOutput, TaskState
+from core.model import CCTVStream, QueuedJob, TaskItem, TaskOutput, TaskState
+from core.serialize import dumps
 
 
 class TaskItemRepository(ABC):
@@ -42,10 +44,28 @@ class TaskOutputRepository(ABC):
     def get_all(self) -> list[TaskOutput]:
         pass
 
+    def get_all_json(self) -> bytes:
+        """
+        get_all()의 JSON 직렬화 결과. 목록이 바뀌기 전까지 결과를 재사용하는 구현이 재정의한다.
+        """
+        return dumps(self.get_all())
+
     @abstractmethod
     def delete(self, taskid: str):
         pass
 
+    @abstractmethod
+    def add_save_listener(self, listener: Callable[[TaskOutput], None]):
+        pass
+
+    @abstractmethod
+    def set_pinned(self, name: str, pinned: bool) -> TaskOutput:
+        pass
+
+    @abstractmethod
+    def update(self, output: TaskOutput):
+        pass
+
 
 class CCTVStreamRepository(ABC):
     @abstractmethod
@@ -64,6 +84,73 @@ class CCTVStreamRepository(ABC):
     def get_all(self) -> list[CCTVStream]:
         pass
 
+    def get_all_json(self) -> bytes:
+        # see TaskOutputRepository.get_all_json
+        return dumps(self.get_all())
+
     @abstractmethod
     def get_hls(self, cctvstream: CCTVStream) -> str:
         pass
+
+
+class TaskResultCacheRepository(ABC):
+    @abstractmethod
+    def restore(self, key: str, taskid: str) -> list[TaskOutput] | None:
+        pass
+
+    @abstractmethod
+    def put(self, key: str, outputs: list[TaskOutput]):
+        pass
+
+    @abstractmethod
+    def stats(self) -> dict[str, int]:
+        pass
+
+
+class JobQueueRepository(ABC):
+    @abstractmethod
+    def enqueue(self, job: QueuedJob):
+        pass
+
+    @abstractmethod
+    def lease(
+        self, worker: str, kinds: list[str], lease_seconds: float
+    ) -> QueuedJob | None:
+        pass
+
+    @abstractmethod
+    def update(
+        self,
+        id: str,
+        worker: str,
+        state: TaskState,
+        reason: str,
+        progress: float,
+        lease_seconds: float,
+        stats: dict[str, float] | None = None,
+    ) -> QueuedJob | None:
+        pass
+
+    @abstractmethod
+    def add_output(self, id: str, worker: str, output: TaskOutput) -> bool:
+        pass
+
+    @abstractmethod
+    def cancel(self, id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def requeue_expired(self) -> list[str]:
+        pass
+
+    @abstractmethod
+    def get(self, id: str) -> QueuedJob:
+        pass
+
+    @abstractmethod
+    def get_updated(self, version: int) -> list[QueuedJob]:
+        pass
+
+    @abstractmethod
+    def delete(self, id: str):
+        pass
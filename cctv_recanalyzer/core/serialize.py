@@ -0,0 +1,42 @@
+"""
+모델(dataclass) 목록의 JSON 직렬화. orjson이 설치되어 있으면 사용하고, 없으면 표준 json 모듈을 사용한다.
+두 경로 모두 같은 형식(UTF-8, 공백 없음, datetime은 isoformat, Enum은 value)의 bytes를 만든다.
+"""
+
+import json
+from dataclasses import fields, is_dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return {f.name: getattr(obj, f.name) for f in fields(obj)}
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    obj를 JSON bytes로 직렬화한다. dataclass, datetime, Enum을 포함할 수 있다.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(
+        obj, ensure_ascii=False, separators=(",", ":"), default=_default
+    ).encode()
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
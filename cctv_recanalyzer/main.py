@@ -1,8 +1,20 @@
+import mimetypes
 import os
+import threading
 from typing import Optional, Type
-
-from core.model import CCTVStream, EntityNotFound, TaskItem, TaskOutput
-from core.repo import CCTVStreamRepository, TaskItemRepository, TaskOutputRepository
+from urllib.parse import quote
+
+import numpy as np
+from core.engine import ResourceClass, TaskEngine
+from core.metrics import REGISTRY, Gauge, Histogram, timed
+from core.model import CCTVStream, EntityNotFound, TaskItem, TaskOutput, TaskState
+from core.repo import (
+    CCTVStreamRepository,
+    TaskItemRepository,
+    TaskOutputRepository,
+    TaskResultCacheRepository,
+)
+from core.serialize import dumps
 from core.srv import TaskService
 from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, FastAPI, Query, Request, Response, responses
@@ -10,12 +22,29 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.routing import APIRoute
 from pydantic import BaseModel, Field, create_model
 from repo.cctv_stream_its import CCTVStreamITSRepo
+from repo.job_queue_sqlite import JobQueueSQLiteRepo
 from repo.task_item_file import TaskItemJsonRepo
 from repo.task_output_file import TaskOutputFileRepo
+from repo.task_result_cache_file import TaskResultCacheFileRepo
+from srv.cctv_aerial_render import CCTVAerialRenderTaskSrv
+from srv.cctv_pipeline import CCTVPipelineTaskSrv
 from srv.cctv_record_ffmpeg import CCTVRecordFFmpegTaskSrv
 from srv.cctv_tracking_analysis import CCTVTrackingAnalysisTaskSrv
-from srv.cctv_yolov8_deepsort import YOLOv8DeepSORTTackingTaskSrv
+from srv.cctv_tracking_batch_analysis import CCTVTrackingBatchAnalysisTaskSrv
+from srv.cctv_yolov8_deepsort import (
+    YOLOv8DeepSORTTackingTaskSrv,
+    load_tracking_modules,
+)
+from srv.job_queue import JobQueueScheduler
+from srv.output_file import output_file_response
+from srv.output_storage import OutputStorageManager
+from srv.output_tier import OutputTieringJob
+from srv.process_task_executor import ProcessTaskExecutor
+from srv.task_result_cache import prefetch_output_digest
+from srv.trajectory_index import TrajectoryIndexStore
 from srv.video_output_info import get_video_frame
+from srv.video_sprite import VideoSpriteStore
+from srv.video_thumbnail import VideoThumbnailStore
 
 load_dotenv()
 
@@ -32,6 +61,24 @@ ITS_API_KEY = get_env_force("ITS_API_KEY")
 TASK_OUTPUT_PATH = get_env_force("TASK_OUTPUT_PATH")
 YOLO_MODEL_PATH = get_env_force("YOLO_MODEL_PATH")
 LISTEN_PORT = int(os.getenv("LISTEN_PORT", "8080"))
+VIDEO_DECODE_BACKEND = os.getenv("VIDEO_DECODE_BACKEND", "opencv")
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(20 * 1024**3)))
+ANALYSIS_CHUNK_ROWS = int(os.getenv("ANALYSIS_CHUNK_ROWS", "0"))
+ANALYSIS_MAX_WORKERS = int(os.getenv("ANALYSIS_MAX_WORKERS", "2"))
+TASK_CPU_HEAVY_WORKERS = int(os.getenv("TASK_CPU_HEAVY_WORKERS", "1"))
+TASK_CONTROL_WORKERS = int(os.getenv("TASK_CONTROL_WORKERS", "32"))
+OUTPUT_ACCEL_REDIRECT = os.getenv("OUTPUT_ACCEL_REDIRECT")
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH")
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+PRELOAD_TRACKING_MODULES = os.getenv("PRELOAD_TRACKING_MODULES", "false") == "true"
+STORAGE_QUOTA_BYTES = int(os.getenv("STORAGE_QUOTA_BYTES", "0"))
+STORAGE_MIN_FREE_BYTES = int(os.getenv("STORAGE_MIN_FREE_BYTES", "0"))
+STORAGE_MAX_AGE_DAYS = float(os.getenv("STORAGE_MAX_AGE_DAYS", "0"))
+STORAGE_EVICTION_POLICY = os.getenv("STORAGE_EVICTION_POLICY", "lru")
+RECORD_DEFAULT_BITRATE = float(os.getenv("RECORD_DEFAULT_BITRATE", "4000000"))
+OUTPUT_TIER_VIDEO_IDLE_DAYS = float(os.getenv("OUTPUT_TIER_VIDEO_IDLE_DAYS", "0"))
+OUTPUT_TIER_TEXT_IDLE_DAYS = float(os.getenv("OUTPUT_TIER_TEXT_IDLE_DAYS", "0"))
+OUTPUT_TIER_VIDEO_CRF = int(os.getenv("OUTPUT_TIER_VIDEO_CRF", "28"))
 
 os.makedirs(TASK_OUTPUT_PATH, exist_ok=True)
 
@@ -44,29 +91,173 @@ task_item_repo: TaskItemRepository = TaskItemJsonRepo(
 task_output_repo: TaskOutputRepository = TaskOutputFileRepo(
     os.path.join(JSON_DB_STORAGE, "task_output.json"), TASK_OUTPUT_PATH
 )
+result_cache_repo: TaskResultCacheRepository = TaskResultCacheFileRepo(
+    os.path.join(JSON_DB_STORAGE, "result_cache.json"),
+    TASK_OUTPUT_PATH,
+    RESULT_CACHE_MAX_BYTES,
+)
+# cache keys hash the whole input, computed in the background when it is saved
+task_output_repo.add_save_listener(
+    lambda output: prefetch_output_digest(TASK_OUTPUT_PATH, output)
+)
+trajectory_index_store = TrajectoryIndexStore(TASK_OUTPUT_PATH)
+video_thumbnail_store = VideoThumbnailStore(TASK_OUTPUT_PATH)
+task_output_repo.add_save_listener(video_thumbnail_store.on_output_saved)
+video_sprite_store = VideoSpriteStore(TASK_OUTPUT_PATH)
+task_output_repo.add_save_listener(video_sprite_store.on_output_saved)
+output_storage = OutputStorageManager(
+    TASK_OUTPUT_PATH,
+    task_output_repo,
+    lambda: [task for s in task_services.values() for task in s.get_tasks()],
+    quota_bytes=STORAGE_QUOTA_BYTES,
+    min_free_bytes=STORAGE_MIN_FREE_BYTES,
+    max_age_seconds=STORAGE_MAX_AGE_DAYS * 86400,
+    policy=STORAGE_EVICTION_POLICY,
+)
+task_output_repo.add_save_listener(output_storage.on_output_saved)
+
+# all task services submit their jobs to one engine (per-resource limits)
+task_engine = TaskEngine(
+    task_item_repo,
+    {
+        ResourceClass.CPU_HEAVY: TASK_CPU_HEAVY_WORKERS,
+        ResourceClass.CPU_LIGHT: ANALYSIS_MAX_WORKERS,
+        ResourceClass.CONTROL: TASK_CONTROL_WORKERS,
+    },
+)
+# analysis jobs run in a pool of worker processes (one per cpu-light slot)
+analysis_executor = ProcessTaskExecutor(ANALYSIS_MAX_WORKERS)
+# with a job queue, tracking and analysis jobs run on worker nodes (worker.py)
+job_queue_scheduler = None
+if JOB_QUEUE_PATH:
+    job_queue_scheduler = JobQueueScheduler(
+        JobQueueSQLiteRepo(JOB_QUEUE_PATH, max_attempts=JOB_MAX_ATTEMPTS),
+        task_item_repo,
+        task_output_repo,
+    )
 
 cctv_record_srv: TaskService = CCTVRecordFFmpegTaskSrv(
     task_repo=task_item_repo,
     cctv_stream_repo=cctv_stream_repo,
     outputs_path=TASK_OUTPUT_PATH,
     output_repo=task_output_repo,
+    engine=task_engine,
+    storage=output_storage,
+    default_bitrate=RECORD_DEFAULT_BITRATE,
 )
 cctv_tracking_srv: TaskService = YOLOv8DeepSORTTackingTaskSrv(
     task_repo=task_item_repo,
     model_path=YOLO_MODEL_PATH,
     outputs_path=TASK_OUTPUT_PATH,
     output_repo=task_output_repo,
+    engine=task_engine,
+    decode_backend=VIDEO_DECODE_BACKEND,
+    result_cache=result_cache_repo,
+    job_queue=job_queue_scheduler,
+)
+if PRELOAD_TRACKING_MODULES and job_queue_scheduler is None:
+    # warm up in the background: the API answers requests while torch loads
+    threading.Thread(target=load_tracking_modules, daemon=True).start()
+cctv_render_srv: TaskService = CCTVAerialRenderTaskSrv(
+    task_repo=task_item_repo,
+    outputs_path=TASK_OUTPUT_PATH,
+    output_repo=task_output_repo,
+    engine=task_engine,
+    decode_backend=VIDEO_DECODE_BACKEND,
 )
 cctv_analysis_srv: TaskService = CCTVTrackingAnalysisTaskSrv(
     task_repo=task_item_repo,
     outputs_path=TASK_OUTPUT_PATH,
     output_repo=task_output_repo,
+    engine=task_engine,
+    render_srv=cctv_render_srv,
+    result_cache=result_cache_repo,
+    chunk_rows=ANALYSIS_CHUNK_ROWS,
+    executor=analysis_executor,
+    job_queue=job_queue_scheduler,
+)
+cctv_batch_analysis_srv: TaskService = CCTVTrackingBatchAnalysisTaskSrv(
+    task_repo=task_item_repo,
+    outputs_path=TASK_OUTPUT_PATH,
+    output_repo=task_output_repo,
+    engine=task_engine,
+    executor=analysis_executor,
+    job_queue=job_queue_scheduler,
+)
+cctv_pipeline_srv: TaskService = CCTVPipelineTaskSrv(
+    task_repo=task_item_repo,
+    outputs_path=TASK_OUTPUT_PATH,
+    output_repo=task_output_repo,
+    engine=task_engine,
+    record_srv=cctv_record_srv,
+    tracking_srv=cctv_tracking_srv,
+    analysis_srv=cctv_analysis_srv,
+)
+
+task_services: dict[str, TaskService] = {
+    "record": cctv_record_srv,
+    "tracking": cctv_tracking_srv,
+    "analysis": cctv_analysis_srv,
+    "batch_analysis": cctv_batch_analysis_srv,
+    "render": cctv_render_srv,
+    "pipeline": cctv_pipeline_srv,
+}
+# apply the retention policy to the outputs kept while the API was down
+output_storage.enforce()
+if OUTPUT_TIER_VIDEO_IDLE_DAYS > 0 or OUTPUT_TIER_TEXT_IDLE_DAYS > 0:
+    OutputTieringJob(
+        TASK_OUTPUT_PATH,
+        task_output_repo,
+        output_storage,
+        video_idle_seconds=OUTPUT_TIER_VIDEO_IDLE_DAYS * 86400,
+        text_idle_seconds=OUTPUT_TIER_TEXT_IDLE_DAYS * 86400,
+        video_crf=OUTPUT_TIER_VIDEO_CRF,
+    ).start()
+
+
+def collect_task_counts() -> dict[tuple[str, ...], float]:
+    counts: dict[tuple[str, ...], float] = {}
+    for name, service in task_services.items():
+        for state in ("active", "queued"):
+            counts[(name, state)] = 0
+        for task in service.get_tasks():
+            if task.state == TaskState.STARTED:
+                counts[(name, "active")] += 1
+            elif task.state == TaskState.PENDING:
+                counts[(name, "queued")] += 1
+    return counts
+
+
+def collect_engine_jobs() -> dict[tuple[str, ...], float]:
+    return {
+        (resource, state): count
+        for resource, stats in task_engine.stats().items()
+        for state, count in stats.items()
+    }
+
+
+Gauge(
+    "cctv_tasks",
+    "Active (started) and queued (pending) tasks per service",
+    ["service", "state"],
+    collect=collect_task_counts,
+)
+Gauge(
+    "cctv_engine_jobs",
+    "Task engine jobs per resource class (running, queued, scheduled, limit)",
+    ["resource", "state"],
+    collect=collect_engine_jobs,
+)
+PREVIEW_SECONDS = Histogram(
+    "cctv_preview_seconds", "Preview image response latency", ["kind"]
 )
 
 
 def create_task_router(task_service: TaskService, name: str) -> APIRouter:
-    def read_all() -> list[TaskItem]:
-        return task_service.get_tasks()
+    def read_all() -> Response:
+        return Response(
+            content=dumps(task_service.get_tasks()), media_type="application/json"
+        )
 
     start_query_params = {}
     for param in task_service.get_params():
@@ -93,7 +284,9 @@ def create_task_router(task_service: TaskService, name: str) -> APIRouter:
     router = APIRouter()
     tags = ["task", name]
 
-    router.add_api_route("", read_all, methods=["GET"], tags=tags)  # type: ignore
+    router.add_api_route(
+        "", read_all, methods=["GET"], tags=tags, response_model=list[TaskItem]
+    )
     router.add_api_route("/start", start, methods=["POST"], tags=tags)  # type: ignore
     router.add_api_route("/stop/{taskid}", stop, methods=["POST"], tags=tags)  # type: ignore
     router.add_api_route("/{taskid}", delete, methods=["DELETE"], tags=tags)  # type: ignore
@@ -140,9 +333,13 @@ def app_exception_handler(request: Request, exc: Exception):
 #################
 
 
-@app.get("/stream", tags=["stream"], name="read_all")
-def read_cctv_stream_list() -> list[CCTVStream]:
-    return cctv_stream_repo.get_all()
+@app.get(
+    "/stream", tags=["stream"], name="read_all", response_model=list[CCTVStream]
+)
+def read_cctv_stream_list() -> Response:
+    return Response(
+        content=cctv_stream_repo.get_all_json(), media_type="application/json"
+    )
 
 
 @app.post("/stream", tags=["stream"], name="create")
@@ -162,11 +359,23 @@ app.include_router(
 app.include_router(
     create_task_router(cctv_analysis_srv, "analysis"), prefix="/task/analysis"
 )
+app.include_router(
+    create_task_router(cctv_batch_analysis_srv, "batch_analysis"),
+    prefix="/task/analysis/batch",
+)
+app.include_router(create_task_router(cctv_render_srv, "render"), prefix="/task/render")
+app.include_router(
+    create_task_router(cctv_pipeline_srv, "pipeline"), prefix="/task/pipeline"
+)
 
 
-@app.get("/output", tags=["output"], name="read_all")
-def read_task_output_list() -> list[TaskOutput]:
-    return task_output_repo.get_all()
+@app.get(
+    "/output", tags=["output"], name="read_all", response_model=list[TaskOutput]
+)
+def read_task_output_list() -> Response:
+    return Response(
+        content=task_output_repo.get_all_json(), media_type="application/json"
+    )
 
 
 @app.get("/output/name/{name}", tags=["output"], name="read_by_name")
@@ -174,9 +383,76 @@ def read_task_output_by_name(name: str) -> TaskOutput:
     return task_output_repo.get_by_name(name)
 
 
-@app.get("/output/{taskid}", tags=["output"], name="read_by_taskid")
-def read_task_output(taskid: str) -> list[TaskOutput]:
-    return task_output_repo.get_by_taskid(taskid)
+def get_tracking_output(name: str) -> TaskOutput:
+    # only csv outputs hold tracking data; other types cannot be indexed
+    output = task_output_repo.get_by_name(name)
+    if output.type != "text/csv":
+        raise ValueError(f"추적/분석 결과(csv)가 아닙니다: {name} ({output.type})")
+    return output
+
+
+@app.get("/output/{name}/tracks", tags=["output"], name="read_tracks")
+def read_output_tracks(
+    name: str,
+    objid: Optional[int] = None,
+    framestart: Optional[int] = None,
+    frameend: Optional[int] = None,
+    timestart: Optional[float] = None,
+    timeend: Optional[float] = None,
+    limit: int = 100000,
+):
+    """
+    추적/분석 결과에서 objid 객체의 궤적, 또는 [framestart, frameend) / [timestart, timeend)(s) 구간의 모든 객체 데이터를 조회합니다.
+    """
+    output = get_tracking_output(name)
+    index = trajectory_index_store.get(output.name)
+
+    if objid is not None:
+        df = index.by_objid(objid)
+    else:
+        fps = float(output.metadata.get("fps", "30"))
+        if timestart is not None:
+            framestart = int(round(timestart * fps))
+        if timeend is not None:
+            frameend = int(round(timeend * fps))
+        if framestart is None and frameend is None:
+            raise ValueError("objid 또는 조회할 프레임(시간) 구간을 지정해야 합니다.")
+        df = index.by_frame(
+            framestart if framestart is not None else 0,
+            frameend if frameend is not None else np.iinfo(np.int64).max,
+            limit=limit,
+        )
+
+    return Response(
+        content=df.to_json(orient="records"), media_type="application/json"
+    )
+
+
+@app.get(
+    "/output/{name}/tracks/objects", tags=["output"], name="read_track_objects"
+)
+def read_output_track_objects(name: str, minspeed: Optional[float] = None):
+    """
+    추적/분석 결과의 객체 목록을 조회합니다. minspeed(km/h)가 주어지면 최대 속도가 그 이상인 객체만 반환합니다.
+    """
+    output = get_tracking_output(name)
+    objects = trajectory_index_store.get(output.name).objects(minspeed)
+    return Response(
+        content=objects.to_json(orient="records"), media_type="application/json"
+    )
+
+
+@app.get(
+    "/output/{taskid}",
+    tags=["output"],
+    name="read_by_taskid",
+    response_model=list[TaskOutput],
+)
+def read_task_output(taskid: str) -> Response:
+    return Response(
+        content=dumps(task_output_repo.get_by_taskid(taskid)),
+        media_type="application/json",
+    )
 
 
 @app.delete("/output/{taskid}", tags=["output"], name="delete")
@@ -184,9 +460,143 @@ def delete_task_output(taskid: str):
     task_output_repo.delete(taskid)
 
 
+@app.post("/output/{name}/pin", tags=["output"], name="pin")
+def pin_task_output(name: str, pinned: bool = True) -> TaskOutput:
+    """
+    결과를 고정(pinned=true)하거나 고정을 해제합니다. 고정된 결과의 작업은 용량 한도, 보관 기간에 따라 삭제되지 않습니다.
+    """
+    return task_output_repo.set_pinned(name, pinned)
+
+
+@app.get("/storage", tags=["storage"], name="read_usage")
+def read_storage_usage() -> dict:
+    """
+    결과 파일의 전체 사용량, 예약량, 용량 한도와 CCTV별, 작업 종류별 사용량(bytes)을 반환합니다.
+    """
+    return output_storage.usage()
+
+
+@app.get("/cache", tags=["cache"], name="read_stats")
+def read_result_cache_stats() -> dict[str, int]:
+    return result_cache_repo.stats()
+
+
+@app.get("/engine", tags=["engine"], name="read_stats")
+def read_task_engine_stats() -> dict[str, dict[str, int]]:
+    return task_engine.stats()
+
+
+@app.get("/metrics", tags=["metrics"], name="read")
+def read_metrics():
+    """
+    작업 수, 단계별 처리 시간 등 측정값을 Prometheus 텍스트 형식으로 반환합니다.
+    """
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/output/video/preview/{name}", tags=["output"], name="get_video_preview")
-def get_video_preview(name: str, random: bool = True):
-    preview = get_video_frame(
-        os.path.join(TASK_OUTPUT_PATH, name), random_number=random
+def get_video_preview(
+    request: Request, name: str, random: bool = True, w: Optional[int] = None
+):
+    """
+    영상의 미리보기 이미지를 반환합니다.
+    random=false이거나 w(너비, px)가 주어지면 결과 저장 시 미리 만들어 둔 대표 키프레임 이미지를 반환합니다.
+    """
+    if random and w is None:
+        with timed(PREVIEW_SECONDS.labels("random")):
+            preview = get_video_frame(
+                os.path.join(TASK_OUTPUT_PATH, name), random_number=random
+            )
+        return Response(content=preview, media_type="image/jpeg")
+
+    with timed(PREVIEW_SECONDS.labels("keyframe")):
+        preview, etag = video_thumbnail_store.get(name, w or 0)
+    return cached_response(request, preview, etag, "image/jpeg")
+
+
+@app.api_route(
+    "/output/file/{name}", methods=["GET", "HEAD"], tags=["output"], name="get_file"
+)
+def get_output_file(request: Request, name: str):
+    """
+    등록된 결과 파일을 전송합니다. Range(206), If-None-Match/If-Modified-Since(304), If-Range를 지원하고,
+    텍스트 결과는 Accept-Encoding에 따라 gzip으로 압축합니다.
+    OUTPUT_ACCEL_REDIRECT가 설정되어 있으면 전송은 nginx(X-Accel-Redirect)가 처리합니다.
+    """
+    try:
+        output = task_output_repo.get_by_name(name)
+    except ValueError:
+        raise EntityNotFound(f"결과가 존재하지 않습니다: {name}")
+
+    output_storage.touch(output.name)
+    accel_redirect = None
+    if OUTPUT_ACCEL_REDIRECT:
+        accel_redirect = f"{OUTPUT_ACCEL_REDIRECT.rstrip('/')}/{quote(output.name)}"
+    return output_file_response(
+        os.path.join(TASK_OUTPUT_PATH, output.name),
+        mimetypes.guess_type(output.name)[0] or "application/octet-stream",
+        request.method,
+        request.headers,
+        accel_redirect,
+    )
+
+
+def cached_response(
+    request: Request, content: bytes | str, etag: str, media_type: str
+) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+@app.get(
+    "/output/video/sprite/{name}/index.json",
+    tags=["output"],
+    name="read_video_sprite_index",
+)
+def read_video_sprite_index(name: str) -> dict:
+    """
+    스크러빙용 스프라이트 시트 인덱스(타일 간격, 크기, 시트 목록)를 반환합니다.
+    아직 생성 중이면 404를 반환합니다.
+    """
+    return video_sprite_store.get_index(name)
+
+
+@app.get(
+    "/output/video/sprite/{name}/index.vtt",
+    tags=["output"],
+    name="read_video_sprite_vtt",
+)
+def read_video_sprite_vtt(request: Request, name: str):
+    index = video_sprite_store.get_index(name)
+    return cached_response(
+        request,
+        video_sprite_store.get_vtt(name),
+        f'"{index["source"]}-vtt"',
+        "text/vtt",
     )
-    return Response(content=preview, media_type="image/jpeg")
+
+
+@app.get(
+    "/output/video/sprite/{name}/tile",
+    tags=["output"],
+    name="get_video_sprite_tile",
+)
+def get_video_sprite_tile(request: Request, name: str, t: float = 0.0):
+    """
+    t(초) 시각의 스프라이트 타일 이미지를 반환합니다. 영상을 디코딩하지 않습니다.
+    """
+    with timed(PREVIEW_SECONDS.labels("sprite_tile")):
+        tile, etag = video_sprite_store.get_tile(name, t)
+    return cached_response(request, tile, etag, "image/jpeg")
+
+
+@app.get(
+    "/output/video/sprite/{name}/{sheet}",
+    tags=["output"],
+    name="get_video_sprite_sheet",
+)
+def get_video_sprite_sheet(request: Request, name: str, sheet: str):
+    content, etag = video_sprite_store.get_sheet(name, sheet)
+    return cached_response(request, content, etag, "image/jpeg")
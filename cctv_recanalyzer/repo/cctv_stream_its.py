@@ -1,28 +1,36 @@
-import json
 import threading
 
 import requests
+from core.metrics import Counter, Histogram, timed
 from core.model import CCTVStream, EntityNotFound
 from core.repo import CCTVStreamRepository
+from core.serialize import dumps, loads
+
+ITS_API_URL = "https://openapi.its.go.kr:9443/cctvInfo"
+
+ITS_API_SECONDS = Histogram("cctv_its_api_seconds", "ITS CCTV API request latency")
+ITS_API_ERRORS = Counter("cctv_its_api_errors_total", "Failed ITS CCTV API requests")
 
 
 class CCTVStreamITSRepo(CCTVStreamRepository):
 
-    def __init__(self, json_path: str, api_key: str):
+    def __init__(self, json_path: str, api_key: str, api_url: str = ITS_API_URL):
         self._lock = threading.Lock()
         self._data: list[CCTVStream] = []
+        self._payload: bytes | None = None  # serialized self._data
         self._delta_coord = 0.01
         self._dist_epsilon = 1e-6
 
         self._json_path = json_path
         self._api_key = api_key
+        self._api_url = api_url
         self._load_data()
 
     def _load_data(self):
         # deserialize from json file
         try:
-            with open(self._json_path, "r") as f:
-                data = json.load(f)
+            with open(self._json_path, "rb") as f:
+                data = loads(f.read())
                 self._data = [
                     CCTVStream(
                         name=stream["name"],
@@ -35,14 +43,10 @@ class CCTVStreamITSRepo(CCTVStreamRepository):
             pass
 
     def _save_data(self):
-        # serialize to json file
-        data = [
-            {"name": stream.name, "coordx": stream.coordx, "coordy": stream.coordy}
-            for stream in self._data
-        ]
-
-        with open(self._json_path, "w") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # serialize to json file, the same bytes are served by get_all_json
+        self._payload = dumps(self._data)
+        with open(self._json_path, "wb") as f:
+            f.write(self._payload)
 
     def save(self, name: str, coord: tuple[float, float]) -> CCTVStream:
         """
@@ -82,6 +86,12 @@ class CCTVStreamITSRepo(CCTVStreamRepository):
         """
         return [stream for stream in self._data]  # shallow copy
 
+    def get_all_json(self) -> bytes:
+        with self._lock:
+            if self._payload is None:
+                self._payload = dumps(self._data)
+            return self._payload
+
     def get_hls(self, cctvstream: CCTVStream) -> str:
         """
         ITS 국가교통정보센터 API를 통해 CCTV 스트리밍 주소(HLS)를 반환한다.
@@ -92,21 +102,23 @@ class CCTVStreamITSRepo(CCTVStreamRepository):
         x, y = cctv.coordx, cctv.coordy
 
         # API 호출
-        res = requests.get(
-            "https://openapi.its.go.kr:9443/cctvInfo",
-            params={
-                "apiKey": self._api_key,
-                "type": "ex",
-                "cctvType": 1,
-                "minX": x - self._delta_coord,
-                "maxX": x + self._delta_coord,
-                "minY": y - self._delta_coord,
-                "maxY": y + self._delta_coord,
-                "getType": "json",
-            },
-        )
+        with timed(ITS_API_SECONDS.labels()):
+            res = requests.get(
+                self._api_url,
+                params={
+                    "apiKey": self._api_key,
+                    "type": "ex",
+                    "cctvType": 1,
+                    "minX": x - self._delta_coord,
+                    "maxX": x + self._delta_coord,
+                    "minY": y - self._delta_coord,
+                    "maxY": y + self._delta_coord,
+                    "getType": "json",
+                },
+            )
 
         if res.status_code != 200:
+            ITS_API_ERRORS.inc()
             raise EntityNotFound(f"API 호출에 실패하였습니다.")
 
         """
@@ -0,0 +1,335 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator
+
+from core.engine import FINISHED_STATES
+from core.model import EntityNotFound, QueuedJob, TaskOutput, TaskState
+from core.repo import JobQueueRepository
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        name TEXT NOT NULL,
+        params TEXT NOT NULL,
+        priority INTEGER NOT NULL,
+        cancelreason TEXT NOT NULL,
+        state INTEGER NOT NULL,
+        reason TEXT NOT NULL,
+        progress REAL NOT NULL,
+        attempts INTEGER NOT NULL,
+        worker TEXT,
+        leaseuntil REAL,
+        canceled INTEGER NOT NULL,
+        outputs TEXT NOT NULL,
+        stats TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        createdat TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, kind, priority)",
+    "CREATE INDEX IF NOT EXISTS jobs_version ON jobs (version)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)",
+]
+
+
+def _dump_outputs(outputs: list[TaskOutput]) -> str:
+    return json.dumps(
+        [
+            {
+                "taskid": output.taskid,
+                "name": output.name,
+                "type": output.type,
+                "desc": output.desc,
+                "createdat": output.createdat.isoformat(),
+                "metadata": output.metadata,
+            }
+            for output in outputs
+        ],
+        ensure_ascii=False,
+    )
+
+
+def _load_outputs(data: str) -> list[TaskOutput]:
+    return [
+        TaskOutput(
+            taskid=output["taskid"],
+            name=output["name"],
+            type=output["type"],
+            desc=output["desc"],
+            createdat=datetime.fromisoformat(output["createdat"]),
+            metadata=output["metadata"],
+        )
+        for output in json.loads(data)
+    ]
+
+
+def _to_job(row: sqlite3.Row) -> QueuedJob:
+    return QueuedJob(
+        id=row["id"],
+        kind=row["kind"],
+        name=row["name"],
+        params=json.loads(row["params"]),
+        priority=row["priority"],
+        cancelreason=row["cancelreason"],
+        state=TaskState(row["state"]),
+        reason=row["reason"],
+        progress=row["progress"],
+        attempts=row["attempts"],
+        worker=row["worker"],
+        leaseuntil=row["leaseuntil"],
+        canceled=bool(row["canceled"]),
+        outputs=_load_outputs(row["outputs"]),
+        stats=json.loads(row["stats"]),
+        version=row["version"],
+        createdat=datetime.fromisoformat(row["createdat"]),
+    )
+
+
+class JobQueueSQLiteRepo(JobQueueRepository):
+    """
+    공유 볼륨의 SQLite 파일에 보관하는 작업 대기열. 별도의 메시지 브로커 없이 API 노드와 여러 작업자가 함께 사용한다.
+    모든 변경은 BEGIN IMMEDIATE 트랜잭션으로 처리하므로 같은 작업을 두 작업자가 동시에 임대하지 않는다.
+    임대 기간(leaseuntil)이 지나도록 갱신되지 않은 작업은 다시 대기 상태로 돌리며, max_attempts번 시도한 작업은 실패 처리한다.
+    변경될 때마다 대기열 전체에서 증가하는 version을 기록하므로, API 노드는 마지막으로 확인한 version 이후의 변경만 읽는다.
+    (WAL 모드는 네트워크 파일 시스템에서 동작하지 않으므로 기본 롤백 저널을 사용한다.)
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = 3, timeout: float = 30.0):
+        if max_attempts < 1:
+            raise ValueError("max_attempts는 1 이상이어야 합니다.")
+
+        self._db_path = db_path
+        self._max_attempts = max_attempts
+        self._timeout = timeout
+        self._local = threading.local()  # one connection per thread
+
+        with self._transaction() as db:
+            for statement in SCHEMA:
+                db.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(
+                self._db_path, timeout=self._timeout, isolation_level=None
+            )
+            db.row_factory = sqlite3.Row
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def _next_version(self, db: sqlite3.Connection) -> int:
+        db.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        row = db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0]
+
+    def _get(self, db: sqlite3.Connection, id: str) -> sqlite3.Row | None:
+        return db.execute("SELECT * FROM jobs WHERE id = ?", (id,)).fetchone()
+
+    def _set(self, db: sqlite3.Connection, id: str, **values):
+        values["version"] = self._next_version(db)
+        columns = ", ".join(f"{key} = ?" for key in values)
+        db.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*values.values(), id))
+
+    def enqueue(self, job: QueuedJob):
+        with self._transaction() as db:
+            if self._get(db, job.id) is not None:
+                raise ValueError(f"이미 대기열에 있는 작업입니다. id={job.id}")
+            db.execute(
+                "INSERT INTO jobs VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL, 0, '[]', '{}', ?, ?)",
+                (
+                    job.id,
+                    job.kind,
+                    job.name,
+                    json.dumps(job.params, ensure_ascii=False),
+                    job.priority,
+                    job.cancelreason,
+                    TaskState.PENDING.value,
+                    job.reason,
+                    0.0,
+                    0,
+                    self._next_version(db),
+                    job.createdat.isoformat(),
+                ),
+            )
+
+    def lease(
+        self, worker: str, kinds: list[str], lease_seconds: float
+    ) -> QueuedJob | None:
+        """
+        kinds 종류 중 우선순위가 가장 높고 먼저 들어온 대기 작업을 worker에게 lease_seconds 동안 임대한다.
+        """
+        if not kinds:
+            return None
+
+        with self._transaction() as db:
+            self._requeue_expired(db)
+            row = db.execute(
+                "SELECT * FROM jobs WHERE state = ? AND canceled = 0 "
+                f"AND kind IN ({', '.join('?' * len(kinds))}) "
+                "ORDER BY priority DESC, createdat, rowid LIMIT 1",
+                (TaskState.PENDING.value, *kinds),
+            ).fetchone()
+            if row is None:
+                return None
+
+            self._set(
+                db,
+                row["id"],
+                state=TaskState.STARTED.value,
+                reason=f"작업자({worker})가 작업을 시작합니다.",
+                worker=worker,
+                leaseuntil=time.time() + lease_seconds,
+                attempts=row["attempts"] + 1,
+            )
+            return _to_job(self._get(db, row["id"]))  # type: ignore
+
+    def update(
+        self,
+        id: str,
+        worker: str,
+        state: TaskState,
+        reason: str,
+        progress: float,
+        lease_seconds: float,
+        stats: dict[str, float] | None = None,
+    ) -> QueuedJob | None:
+        """
+        worker가 임대 중인 작업의 상태와 진행률을 갱신하고 임대 기간을 연장한다. (heartbeat)
+        종료 상태로 갱신하면 임대를 반납한다. 임대가 만료되었거나 작업이 삭제되었으면 None을 반환한다.
+        stats가 주어지면 작업의 자원 사용량도 갱신한다.
+        """
+        with self._transaction() as db:
+            row = self._get(db, id)
+            if (
+                row is None
+                or row["worker"] != worker
+                or row["state"] != TaskState.STARTED.value
+            ):
+                return None
+
+            finished = state in FINISHED_STATES
+            values = {}
+            if stats is not None:
+                values["stats"] = json.dumps(stats)
+            self._set(
+                db,
+                id,
+                state=state.value if finished else TaskState.STARTED.value,
+                reason=reason,
+                progress=progress,
+                leaseuntil=None if finished else time.time() + lease_seconds,
+                **values,
+            )
+            return _to_job(self._get(db, id))  # type: ignore
+
+    def add_output(self, id: str, worker: str, output: TaskOutput) -> bool:
+        with self._transaction() as db:
+            row = self._get(db, id)
+            if (
+                row is None
+                or row["worker"] != worker
+                or row["state"] != TaskState.STARTED.value
+            ):
+                return False
+
+            outputs = _load_outputs(row["outputs"])
+            outputs.append(output)
+            self._set(db, id, outputs=_dump_outputs(outputs))
+            return True
+
+    def cancel(self, id: str) -> bool:
+        """
+        대기 중인 작업은 바로 취소하고, 실행 중인 작업에는 취소 요청을 기록한다. (작업자가 heartbeat에서 확인)
+        종료되었거나 없는 작업이면 False를 반환한다.
+        """
+        with self._transaction() as db:
+            row = self._get(db, id)
+            if row is None or TaskState(row["state"]) in FINISHED_STATES:
+                return False
+
+            if row["state"] == TaskState.PENDING.value:
+                self._set(
+                    db,
+                    id,
+                    state=TaskState.CANCELED.value,
+                    reason=row["cancelreason"],
+                    canceled=1,
+                )
+            else:
+                self._set(db, id, canceled=1)
+            return True
+
+    def _requeue_expired(self, db: sqlite3.Connection) -> list[str]:
+        rows = db.execute(
+            "SELECT * FROM jobs WHERE state = ? AND leaseuntil < ?",
+            (TaskState.STARTED.value, time.time()),
+        ).fetchall()
+
+        for row in rows:
+            lost = f"작업자({row['worker']})의 응답이 없어"
+            if row["canceled"]:
+                values = {
+                    "state": TaskState.CANCELED.value,
+                    "reason": row["cancelreason"],
+                }
+            elif row["attempts"] >= self._max_attempts:
+                values = {
+                    "state": TaskState.FAILED.value,
+                    "reason": f"{lost} 작업이 실패하였습니다. (시도 {row['attempts']}회)",
+                }
+            else:
+                values = {
+                    "state": TaskState.PENDING.value,
+                    "reason": f"{lost} 작업을 다시 대기열에 넣었습니다.",
+                    "progress": 0.0,
+                    "outputs": "[]",
+                    "stats": "{}",
+                }
+            self._set(db, row["id"], worker=None, leaseuntil=None, **values)
+
+        return [row["id"] for row in rows]
+
+    def requeue_expired(self) -> list[str]:
+        """
+        임대 기간이 지난 작업을 다시 대기 상태로 돌리고(시도 횟수를 넘었으면 실패 처리) 해당 작업 ID를 반환한다.
+        """
+        with self._transaction() as db:
+            return self._requeue_expired(db)
+
+    def get(self, id: str) -> QueuedJob:
+        row = self._get(self._connect(), id)
+        if row is None:
+            raise EntityNotFound("대기열에서 작업을 찾을 수 없습니다.")
+        return _to_job(row)
+
+    def get_updated(self, version: int) -> list[QueuedJob]:
+        """
+        version 이후에 변경된 작업을 변경 순서대로 반환한다.
+        """
+        rows = self._connect().execute(
+            "SELECT * FROM jobs WHERE version > ? ORDER BY version", (version,)
+        )
+        return [_to_job(row) for row in rows]
+
+    def delete(self, id: str):
+        with self._transaction() as db:
+            db.execute("DELETE FROM jobs WHERE id = ?", (id,))
@@ -1,15 +1,18 @@
-import json
 import threading
 from datetime import datetime
 
+from core.metrics import REPO_LOCK_WAIT_SECONDS, REPO_SAVE_SECONDS, timed, timed_lock
 from core.model import EntityNotFound, TaskItem, TaskState
 from core.repo import TaskItemRepository
+from core.serialize import dumps, loads
 
 
 class TaskItemJsonRepo(TaskItemRepository):
 
     def __init__(self, json_path: str, fix_invalid_state: bool = True):
         self._lock = threading.Lock()
+        self._lock_wait = REPO_LOCK_WAIT_SECONDS.labels("task_item")
+        self._save_time = REPO_SAVE_SECONDS.labels("task_item")
         self._tasks: list[TaskItem] = []
         self._json_path = json_path
         self._init_tasks()
@@ -25,8 +28,8 @@ class TaskItemJsonRepo(TaskItemRepository):
     def _init_tasks(self):
         try:
             # deserialize from json file
-            with open(self._json_path, "r") as f:
-                data = json.load(f)
+            with open(self._json_path, "rb") as f:
+                data = loads(f.read())
                 self._tasks = [
                     TaskItem(
                         id=task["id"],
@@ -36,6 +39,7 @@ class TaskItemJsonRepo(TaskItemRepository):
                         reason=task["reason"],
                         progress=task["progress"],
                         createdat=datetime.fromisoformat(task["createdat"]),
+                        stats=task.get("stats", {}),
                     )
                     for task in data
                 ]
@@ -44,41 +48,28 @@ class TaskItemJsonRepo(TaskItemRepository):
 
     def _save_tasks(self):
         # serialize to json file
-        data = [
-            {
-                "id": task.id,
-                "name": task.name,
-                "params": task.params,
-                "state": task.state.value,
-                "reason": task.reason,
-                "progress": task.progress,
-                "createdat": task.createdat.isoformat(),
-            }
-            for task in self._tasks
-        ]
-
-        with open(self._json_path, "w") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        with timed(self._save_time), open(self._json_path, "wb") as f:
+            f.write(dumps(self._tasks))
 
     def add(self, task: TaskItem):
-        with self._lock:
+        with timed_lock(self._lock, self._lock_wait):
             self._tasks.append(task)
             self._save_tasks()
             return task
 
     def get(self, id: str) -> TaskItem:
-        with self._lock:
+        with timed_lock(self._lock, self._lock_wait):
             for task in self._tasks:
                 if task.id == id:
                     return task
             raise EntityNotFound("작업을 찾을 수 없습니다.")
 
     def get_by_name(self, name: str) -> list[TaskItem]:
-        with self._lock:
+        with timed_lock(self._lock, self._lock_wait):
             return [task for task in self._tasks if task.name == name]
 
     def update(self, id: str, state: TaskState, reason: str) -> TaskItem:
-        with self._lock:
+        with timed_lock(self._lock, self._lock_wait):
             for task in self._tasks:
                 if task.id == id:
                     task.state = state
@@ -88,6 +79,6 @@ class TaskItemJsonRepo(TaskItemRepository):
             raise EntityNotFound("작업을 찾을 수 없습니다.")
 
     def delete(self, id: str):
-        with self._lock:
+        with timed_lock(self._lock, self._lock_wait):
             self._tasks = [task for task in self._tasks if task.id != id]
             self._save_tasks()
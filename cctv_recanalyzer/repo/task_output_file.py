@@ -1,26 +1,32 @@
-import json
 import os
 import threading
 from datetime import datetime
+from typing import Callable
 
+from core.metrics import REPO_LOCK_WAIT_SECONDS, REPO_SAVE_SECONDS, timed, timed_lock
 from core.model import TaskOutput
 from core.repo import TaskOutputRepository
+from core.serialize import dumps, loads
 
 
 class TaskOutputFileRepo(TaskOutputRepository):
 
     def __init__(self, json_path: str, outputs_path: str):
         self._lock = threading.Lock()
+        self._lock_wait = REPO_LOCK_WAIT_SECONDS.labels("task_output")
+        self._save_time = REPO_SAVE_SECONDS.labels("task_output")
         self._json_path = json_path
         self._outputs_path = outputs_path
         self._outputs: list[TaskOutput] = []
+        self._payload: bytes | None = None  # serialized self._outputs
+        self._save_listeners: list[Callable[[TaskOutput], None]] = []
         self._load_data()
 
     def _load_data(self):
         # deserialize from json file
         try:
-            with open(self._json_path, "r") as f:
-                data = json.load(f)
+            with open(self._json_path, "rb") as f:
+                data = loads(f.read())
                 self._outputs = [
                     TaskOutput(
                         taskid=output["taskid"],
@@ -29,54 +35,95 @@ class TaskOutputFileRepo(TaskOutputRepository):
                         desc=output["desc"],
                         createdat=datetime.fromisoformat(output["createdat"]),
                         metadata=output.get("metadata", {}),
+                        size=output.get("size") or self._file_size(output["name"]),
+                        pinned=output.get("pinned", False),
                     )
                     for output in data
                 ]
         except FileNotFoundError:
             pass
 
+    def _paths(self, name: str) -> list[str]:
+        # the file and its compressed form (srv/output_tier.py)
+        path = os.path.join(self._outputs_path, name)
+        return [path, f"{path}.gz"]
+
+    def _file_size(self, name: str) -> int:
+        for path in self._paths(name):
+            if os.path.exists(path):
+                return os.path.getsize(path)
+        return 0
+
     def _save_data(self):
-        # serialize to json file
-        data = [
-            {
-                "taskid": output.taskid,
-                "name": output.name,
-                "type": output.type,
-                "desc": output.desc,
-                "createdat": output.createdat.isoformat(),
-                "metadata": output.metadata,
-            }
-            for output in self._outputs
-        ]
-
-        with open(self._json_path, "w") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # serialize to json file, the same bytes are served by get_all_json
+        with timed(self._save_time):
+            self._payload = dumps(self._outputs)
+            with open(self._json_path, "wb") as f:
+                f.write(self._payload)
 
     def save(self, output: TaskOutput):
-        with self._lock:
+        if output.size == 0:
+            output.size = self._file_size(output.name)
+        with timed_lock(self._lock, self._lock_wait):
             self._outputs.append(output)
             self._save_data()
 
+        for listener in self._save_listeners:
+            listener(output)
+
+    def add_save_listener(self, listener: Callable[[TaskOutput], None]):
+        """
+        결과가 저장된 뒤 호출할 함수를 등록한다. (미리보기 생성 등 후처리)
+        """
+        self._save_listeners.append(listener)
+
     def get_by_taskid(self, taskid: str) -> list[TaskOutput]:
-        with self._lock:
+        with timed_lock(self._lock, self._lock_wait):
             return [output for output in self._outputs if output.taskid == taskid]
 
     def get_by_name(self, name: str) -> TaskOutput:
-        with self._lock:
+        with timed_lock(self._lock, self._lock_wait):
             for output in self._outputs:
                 if output.name == name:
                     return output
             raise ValueError(f"TaskOutput not found: {name}")
 
+    def set_pinned(self, name: str, pinned: bool) -> TaskOutput:
+        with timed_lock(self._lock, self._lock_wait):
+            for output in self._outputs:
+                if output.name == name:
+                    output.pinned = pinned
+                    self._save_data()
+                    return output
+            raise ValueError(f"TaskOutput not found: {name}")
+
+    def update(self, output: TaskOutput):
+        """
+        이름이 같은 결과를 output으로 바꾼다. (보관 형태, 크기 변경)
+        """
+        with timed_lock(self._lock, self._lock_wait):
+            for i, stored in enumerate(self._outputs):
+                if stored.name == output.name:
+                    self._outputs[i] = output
+                    self._save_data()
+                    return
+            raise ValueError(f"TaskOutput not found: {output.name}")
+
     def get_all(self) -> list[TaskOutput]:
-        with self._lock:
+        with timed_lock(self._lock, self._lock_wait):
             return [output for output in self._outputs]
 
+    def get_all_json(self) -> bytes:
+        with timed_lock(self._lock, self._lock_wait):
+            if self._payload is None:
+                self._payload = dumps(self._outputs)
+            return self._payload
+
     def delete(self, taskid: str):
         deleted: list[TaskOutput] = []
         outputs: list[TaskOutput] = []
 
-        with self._lock:
+        with timed_lock(self._lock, self._lock_wait):
             for output in self._outputs:
                 if output.taskid == taskid:
                     deleted.append(output)
@@ -87,6 +134,6 @@ class TaskOutputFileRepo(TaskOutputRepository):
             self._save_data()
 
         for output in deleted:
-            path = os.path.join(self._outputs_path, output.name)
-            if os.path.exists(path):
-                os.remove(path)
+            for path in self._paths(output.name):
+                if os.path.exists(path):
+                    os.remove(path)
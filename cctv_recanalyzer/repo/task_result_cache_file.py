@@ -0,0 +1,178 @@
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from core.metrics import REPO_LOCK_WAIT_SECONDS, REPO_SAVE_SECONDS, timed, timed_lock
+from core.model import TaskOutput
+from core.repo import TaskResultCacheRepository
+from core.serialize import dumps, loads
+
+
+def link_or_copy(src: str, dst: str):
+    """
+    같은 파일 시스템이면 하드 링크를 만들고, 그렇지 않으면 파일을 복사한다.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class TaskResultCacheFileRepo(TaskResultCacheRepository):
+    """
+    입력 내용 해시(key)로 작업 결과 파일을 보관하는 캐시.
+    결과 파일은 <outputs_path>/.cache/<key>/ 에 하드 링크로 보관하므로, 원본 작업이 삭제되어도 캐시는 유지된다.
+    보관 중인 파일 크기의 합이 max_bytes를 넘으면 가장 오래 사용되지 않은 항목부터 제거한다(LRU).
+    """
+
+    def __init__(self, json_path: str, outputs_path: str, max_bytes: int):
+        self._lock = threading.Lock()
+        self._lock_wait = REPO_LOCK_WAIT_SECONDS.labels("result_cache")
+        self._save_time = REPO_SAVE_SECONDS.labels("result_cache")
+        self._json_path = json_path
+        self._outputs_path = outputs_path
+        self._cache_path = os.path.join(outputs_path, ".cache")
+        self._max_bytes = max_bytes
+
+        # key -> {"taskid", "size", "lastused", "outputs": [...]} (LRU order)
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        os.makedirs(self._cache_path, exist_ok=True)
+        self._load_data()
+
+    def _load_data(self):
+        # deserialize from json file
+        try:
+            with open(self._json_path, "rb") as f:
+                data = loads(f.read())
+                entries = sorted(data["entries"].items(), key=lambda e: e[1]["lastused"])
+                self._entries = OrderedDict(entries)
+                self._hits = data.get("hits", 0)
+                self._misses = data.get("misses", 0)
+                self._evictions = data.get("evictions", 0)
+        except FileNotFoundError:
+            pass
+
+    def _save_data(self):
+        # serialize to json file
+        data = {
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "entries": self._entries,
+        }
+
+        with timed(self._save_time), open(self._json_path, "wb") as f:
+            f.write(dumps(data))
+
+    def _total_bytes(self) -> int:
+        return sum(entry["size"] for entry in self._entries.values())
+
+    def _remove_entry(self, key: str):
+        self._entries.pop(key, None)
+        shutil.rmtree(os.path.join(self._cache_path, key), ignore_errors=True)
+
+    def restore(self, key: str, taskid: str) -> list[TaskOutput] | None:
+        """
+        key에 해당하는 결과 파일을 taskid의 결과로 복원(하드 링크)하고, 저장해야 할 TaskOutput 목록을 반환한다.
+        캐시에 없거나 파일이 손상된 경우 None을 반환한다.
+        """
+        with timed_lock(self._lock, self._lock_wait):
+            entry = self._entries.get(key)
+            entry_path = os.path.join(self._cache_path, key)
+            if entry is not None and not all(
+                os.path.exists(os.path.join(entry_path, o["name"]))
+                for o in entry["outputs"]
+            ):
+                self._remove_entry(key)
+                entry = None
+
+            if entry is None:
+                self._misses += 1
+                self._save_data()
+                return None
+
+            outputs: list[TaskOutput] = []
+            for output in entry["outputs"]:
+                name: str = output["name"]
+                if name.startswith(entry["taskid"]):
+                    newname = taskid + name[len(entry["taskid"]) :]
+                else:
+                    newname = f"{taskid}_{name}"
+
+                link_or_copy(
+                    os.path.join(entry_path, name),
+                    os.path.join(self._outputs_path, newname),
+                )
+                outputs.append(
+                    TaskOutput(
+                        name=newname,
+                        type=output["type"],
+                        desc=output["desc"],
+                        taskid=taskid,
+                        metadata=output["metadata"],
+                    )
+                )
+
+            self._hits += 1
+            entry["lastused"] = datetime.now().isoformat()
+            self._entries.move_to_end(key)
+            self._save_data()
+            return outputs
+
+    def put(self, key: str, outputs: list[TaskOutput]):
+        """
+        작업 결과 파일을 캐시에 등록한다. 등록 후 용량 제한을 넘으면 LRU 항목을 제거한다.
+        """
+        if not outputs:
+            return
+
+        with timed_lock(self._lock, self._lock_wait):
+            self._remove_entry(key)
+            entry_path = os.path.join(self._cache_path, key)
+            os.makedirs(entry_path, exist_ok=True)
+
+            size = 0
+            for output in outputs:
+                src = os.path.join(self._outputs_path, output.name)
+                link_or_copy(src, os.path.join(entry_path, output.name))
+                size += os.path.getsize(src)
+
+            self._entries[key] = {
+                "taskid": outputs[0].taskid,
+                "size": size,
+                "lastused": datetime.now().isoformat(),
+                "outputs": [
+                    {
+                        "name": output.name,
+                        "type": output.type,
+                        "desc": output.desc,
+                        "metadata": output.metadata,
+                    }
+                    for output in outputs
+                ],
+            }
+
+            # evict least recently used entries
+            while self._entries and self._total_bytes() > self._max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove_entry(oldest)
+                self._evictions += 1
+
+            self._save_data()
+
+    def stats(self) -> dict[str, int]:
+        with timed_lock(self._lock, self._lock_wait):
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes(),
+                "maxbytes": self._max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
@@ -0,0 +1,238 @@
+import json
+import os
+from collections import deque
+from typing import Callable
+from uuid import uuid4
+
+import cv2
+import numpy as np
+import pandas as pd
+from core.engine import JobContext, ResourceClass, TaskEngine
+from core.model import (
+    TaskCancelException,
+    TaskItem,
+    TaskOutput,
+    TaskParamMeta,
+    TaskState,
+)
+from core.repo import TaskItemRepository, TaskOutputRepository
+from core.srv import TaskService
+from srv.output_tier import output_path
+from srv.video_frame_source import FrameSource, open_frame_source
+
+
+def render_aerial_video(
+    source: FrameSource,
+    writer: cv2.VideoWriter,
+    df: pd.DataFrame,
+    matrix: np.ndarray,
+    size: tuple[int, int],
+    trail_length: int,
+    on_frame: Callable[[int], None] | None = None,
+):
+    """
+    원본 영상을 perspective transform 한 항공뷰 영상에 객체의 이동 궤적을 그려 writer에 기록합니다.
+    프레임별 데이터 범위는 frame 기준으로 정렬된 배열에서 미리 계산하고, 궤적은 객체별로 최대 trail_length개의
+    점을 보관하는 ring buffer(deque)에 저장하여 프레임마다 한 번의 cv2.polylines 호출로 그립니다.
+    on_frame은 프레임을 기록할 때마다 프레임 번호와 함께 호출됩니다(진행률 갱신, 취소 확인 용도).
+    """
+    width, height = size
+    df = df.sort_values(by="frame", kind="stable")
+    frames = df["frame"].to_numpy()
+    objids = df["objid"].to_numpy()
+    points = df[["perspx", "perspy"]].to_numpy().astype(np.int32)
+
+    # offsets[i]:offsets[i + 1] is the row range of frame i
+    last_frame = int(frames[-1]) if len(frames) else -1
+    offsets = np.searchsorted(frames, np.arange(last_frame + 2))
+
+    persp = np.empty((height, width, 3), dtype=np.uint8)
+    trails: dict[int, deque] = {}
+
+    for frame_idx, frame in enumerate(source):
+        if frame_idx <= last_frame:
+            begin, end = offsets[frame_idx], offsets[frame_idx + 1]
+        else:
+            begin = end = len(frames)
+
+        # remove tracked point from buffer if object is lost
+        identities = set(objids[begin:end].tolist())
+        for key in trails.keys() - identities:
+            trails.pop(key)
+
+        # perspective transform
+        cv2.warpPerspective(frame, matrix, size, dst=persp)
+
+        # append points and draw trails
+        for objid, point in zip(objids[begin:end].tolist(), points[begin:end]):
+            trail = trails.get(objid)
+            if trail is None:
+                trail = trails[objid] = deque(maxlen=trail_length)
+            trail.append(point)
+
+        polylines = [np.array(trail) for trail in trails.values() if len(trail) > 1]
+        if polylines:
+            cv2.polylines(persp, polylines, False, (0, 255, 0), 1)
+
+        writer.write(persp)
+        if on_frame is not None:
+            on_frame(frame_idx)
+
+
+class CCTVAerialRenderTaskSrv(TaskService):
+    """
+    차량 추적 데이터 분석 결과(csv)와 원본 영상으로 항공뷰 객체 추적 영상을 렌더링한다.
+    분석 작업과 분리되어 있으므로, 필요한 경우에만 별도로 요청하여 생성한다.
+    """
+
+    def __init__(
+        self,
+        task_repo: TaskItemRepository,
+        outputs_path: str,
+        output_repo: TaskOutputRepository,
+        engine: TaskEngine,
+        decode_backend: str = "opencv",
+    ):
+
+        self._trail_length = 90  # frames
+        self._engine = engine
+
+        self._task_repo = task_repo
+        self._outputs_path = outputs_path
+        self._output_repo = output_repo
+        self._decode_backend = decode_backend
+
+    def _run_task(self, ctx: JobContext, task: TaskItem):
+        source = None
+        cap_out = None
+
+        try:
+            srcpoints = json.loads(task.params["srcpoints"])
+            dstpoints = json.loads(task.params["dstpoints"])
+            width, height = dstpoints[-1]  # right bottom
+            fps = int(task.params["fps"])
+
+            # calculate perspective transform matrix
+            matrix = cv2.getPerspectiveTransform(
+                np.array(srcpoints, dtype=np.float32),
+                np.array(dstpoints, dtype=np.float32),
+            )
+
+            # read analysis data (already transformed and interpolated)
+            df = pd.read_csv(
+                output_path(self._outputs_path, task.params["analysis"]),
+                usecols=["frame", "objid", "perspx", "perspy"],
+            )
+
+            source = open_frame_source(
+                os.path.join(self._outputs_path, task.params["targetname"]),
+                backend=self._decode_backend,
+            )
+            frame_total_count = max(1, source.frame_count)
+            fourcc = cv2.VideoWriter.fourcc(*"mp4v")
+            cap_out = cv2.VideoWriter(
+                os.path.join(self._outputs_path, f"{task.id}.mp4"),
+                fourcc,
+                fps,
+                (width, height),
+            )
+
+            ctx.set_progress(0.0, "항공뷰 영상 렌더링을 시작합니다.")
+
+            def on_frame(frame_idx: int):
+                ctx.raise_if_canceled()
+                ctx.set_progress((frame_idx + 1) / frame_total_count)
+
+            render_aerial_video(
+                source,
+                cap_out,
+                df,
+                matrix,
+                (width, height),
+                self._trail_length,
+                on_frame=on_frame,
+            )
+            cap_out.release()
+
+            self._output_repo.save(
+                TaskOutput(
+                    name=f"{task.id}.mp4",
+                    type="video/mp4",
+                    desc=f"{task.params['cctv']} 항공뷰 객체 추적 영상",
+                    taskid=task.id,
+                    metadata=task.params,
+                )
+            )
+
+            task.progress = 1.0
+            self._task_repo.update(
+                task.id, TaskState.FINISHED, "항공뷰 렌더링이 완료되었습니다."
+            )
+
+        except TaskCancelException as e:
+            self._task_repo.update(task.id, TaskState.CANCELED, str(e))
+            self._remove_partial_output(task)
+        except Exception as e:
+            self._task_repo.update(task.id, TaskState.FAILED, str(e))
+            self._remove_partial_output(task)
+
+        finally:
+            if source is not None:
+                source.release()
+            if cap_out is not None and cap_out.isOpened():
+                cap_out.release()
+
+    def _remove_partial_output(self, task: TaskItem):
+        path = os.path.join(self._outputs_path, f"{task.id}.mp4")
+        if os.path.exists(path):
+            os.remove(path)
+
+    def get_name(self) -> str:
+        return "항공뷰 영상 렌더링"
+
+    def get_params(self) -> list[TaskParamMeta]:
+        return [
+            TaskParamMeta(
+                name="analysis", desc="차량 추적 데이터 분석 결과(csv)", accept=["text/csv"]
+            ),
+        ]
+
+    def get_tasks(self) -> list[TaskItem]:
+        return self._task_repo.get_by_name(self.get_name())
+
+    def del_task(self, id: str):
+        self._engine.cancel(id)
+        self._task_repo.delete(id)
+        self._output_repo.delete(id)
+
+    def start(self, params: dict[str, str]) -> TaskItem:
+        analysis = params["analysis"]
+        analysis_metadata = self._output_repo.get_by_name(analysis).metadata
+        if "dstpoints" not in analysis_metadata:
+            raise ValueError(f"차량 추적 데이터 분석 결과가 아닙니다: {analysis}")
+
+        metadata = {**analysis_metadata, "analysis": analysis}
+
+        task = TaskItem(
+            id=str(uuid4()),
+            name=self.get_name(),
+            params=metadata,
+            state=TaskState.PENDING,
+            reason="작업이 제출되었습니다.",
+            progress=0.0,
+        )
+        self._task_repo.add(task)
+        # derived output: runs after tracking jobs waiting for the same resource
+        self._engine.submit(
+            task.id,
+            ResourceClass.CPU_HEAVY,
+            lambda ctx: self._run_task(ctx, task),
+            priority=-1,
+            cancel_reason="항공뷰 렌더링이 요청에 의해 중단되었습니다.",
+        )
+
+        return task
+
+    def stop(self, id: str):
+        self._task_repo.get(id)  # raises EntityNotFound
+        self._engine.cancel(id)
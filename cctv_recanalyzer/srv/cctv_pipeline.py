@@ -0,0 +1,334 @@
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pandas as pd
+from core.engine import JobContext, ResourceClass, TaskEngine
+from core.model import (
+    EntityNotFound,
+    TaskCancelException,
+    TaskItem,
+    TaskOutput,
+    TaskParamMeta,
+    TaskState,
+)
+from core.repo import TaskItemRepository, TaskOutputRepository
+from core.srv import TaskService
+from srv.output_tier import output_path
+
+# 분석 작업에 그대로 전달하는 선택 인자
+ANALYSIS_OPTIONS = ["deltaframe", "smoothing", "binsec", "countline", "lanes"]
+
+
+@dataclass
+class PipelineSegment:
+    """
+    녹화 구간 하나에 대한 녹화/객체 추적/분석 작업 ID
+    """
+
+    startat: datetime
+    endat: datetime
+    record: str
+    tracking: str | None = None
+    analysis: str | None = None
+
+
+def split_segments(
+    startat: datetime, endat: datetime, segmentsec: float
+) -> list[tuple[datetime, datetime]]:
+    """
+    [startat, endat) 구간을 segmentsec(초) 길이의 연속된 구간으로 나눈다. 0이면 나누지 않는다.
+    """
+    if segmentsec <= 0:
+        return [(startat, endat)]
+
+    segments = []
+    step = timedelta(seconds=segmentsec)
+    while startat < endat:
+        segments.append((startat, min(startat + step, endat)))
+        startat += step
+    return segments
+
+
+class CCTVPipelineTaskSrv(TaskService):
+    """
+    CCTV 녹화 → 객체 추적 → 차량 추적 데이터 분석을 하나의 작업으로 연결한다.
+    녹화 구간을 segmentsec 단위로 나누면 구간별 녹화가 끝나는 대로 그 구간의 객체 추적과 분석을 시작하므로,
+    전체 결과를 얻는 시간이 녹화 길이에 가까워진다. 각 단계는 기존 작업 서비스의 작업으로 실행되어 목록에 함께 표시된다.
+    모든 구간의 분석이 끝나면 구간별 교통류 지표를 하나로 합쳐 {id}_flow.csv로 저장한다.
+    """
+
+    def __init__(
+        self,
+        task_repo: TaskItemRepository,
+        outputs_path: str,
+        output_repo: TaskOutputRepository,
+        engine: TaskEngine,
+        record_srv: TaskService,
+        tracking_srv: TaskService,
+        analysis_srv: TaskService,
+    ):
+
+        self._poll_seconds = 1.0
+        self._task_repo = task_repo
+        self._outputs_path = outputs_path
+        self._output_repo = output_repo
+        self._engine = engine
+        self._record_srv = record_srv
+        self._tracking_srv = tracking_srv
+        self._analysis_srv = analysis_srv
+
+    def get_name(self) -> str:
+        return "CCTV 녹화 · 추적 · 분석 파이프라인"
+
+    def get_params(self) -> list[TaskParamMeta]:
+        return [
+            TaskParamMeta("cctv", "CCTV 이름", ["str"]),
+            TaskParamMeta("startat", "녹화 시작 시간", ["datetime"]),
+            TaskParamMeta("endat", "녹화 종료 시간", ["datetime"]),
+            TaskParamMeta("confidence", "신뢰도 임계값", ["float"], optional=True),
+            TaskParamMeta("roi", "ROI 좌표", ["json"]),
+            TaskParamMeta("roadwidth", "도로 너비(m)", ["float"]),
+            TaskParamMeta("roadheight", "도로 길이(m)", ["float"]),
+            TaskParamMeta(
+                "segmentsec",
+                "구간 길이(s, 0: 녹화가 끝난 뒤 한 번에 처리)",
+                ["int"],
+                optional=True,
+            ),
+            TaskParamMeta("deltaframe", "속도 계산 프레임 간격", ["int"], optional=True),
+            TaskParamMeta("smoothing", "속도 이동 평균 윈도우(프레임)", ["int"], optional=True),
+            TaskParamMeta("binsec", "교통류 집계 시간 간격(s)", ["float"], optional=True),
+            TaskParamMeta(
+                "countline",
+                "ROI 상단으로부터 검지선까지의 거리(m)",
+                ["float"],
+                optional=True,
+            ),
+            TaskParamMeta("lanes", "교통류 집계 차로 구간 수", ["int"], optional=True),
+        ]
+
+    def get_tasks(self) -> list[TaskItem]:
+        return self._task_repo.get_by_name(self.get_name())
+
+    def del_task(self, id: str):
+        try:
+            self.stop(id)
+        except EntityNotFound:
+            pass
+        self._task_repo.delete(id)
+        self._output_repo.delete(id)
+
+    def start(self, params: dict[str, str]) -> TaskItem:
+        startat = datetime.fromisoformat(params["startat"])
+        endat = datetime.fromisoformat(params["endat"])
+        segmentsec = int(params.get("segmentsec", 0))
+        if endat <= startat or segmentsec < 0:
+            raise ValueError("녹화 구간 또는 segmentsec이 올바르지 않습니다.")
+
+        # validate analysis options before recording starts
+        if len(json.loads(params["roi"])) != 4:
+            raise ValueError("ROI 좌표는 4개여야 합니다.")
+        if float(params["roadwidth"]) <= 0 or float(params["roadheight"]) <= 0:
+            raise ValueError("도로 너비와 길이는 0보다 커야 합니다.")
+
+        metadata = {
+            "cctv": params["cctv"],
+            "startat": startat.isoformat(),
+            "endat": endat.isoformat(),
+            "roi": params["roi"],
+            "roadwidth": params["roadwidth"],
+            "roadheight": params["roadheight"],
+            "segmentsec": str(segmentsec),
+        }
+        if "confidence" in params:
+            metadata["confidence"] = params["confidence"]
+        for key in ANALYSIS_OPTIONS:
+            if key in params:
+                metadata[key] = params[key]
+
+        # recordings are scheduled by the engine at each segment start
+        segments: list[PipelineSegment] = []
+        try:
+            for seg_startat, seg_endat in split_segments(startat, endat, segmentsec):
+                record = self._record_srv.start(
+                    {
+                        "cctv": metadata["cctv"],
+                        "startat": seg_startat.isoformat(),
+                        "endat": seg_endat.isoformat(),
+                    }
+                )
+                segments.append(PipelineSegment(seg_startat, seg_endat, record.id))
+        except Exception:
+            for segment in segments:
+                self._record_srv.stop(segment.record)
+            raise
+
+        task = TaskItem(
+            id=str(uuid4()),
+            name=self.get_name(),
+            params=metadata,
+            state=TaskState.PENDING,
+            reason="녹화 시작을 기다리고 있습니다.",
+            progress=0.0,
+        )
+        self._save_segments(task, segments)
+        self._task_repo.add(task)
+
+        self._engine.submit(
+            task.id,
+            ResourceClass.CONTROL,
+            lambda ctx: self._run_task(ctx, task, segments),
+            cancel_reason="파이프라인이 요청에 의해 중단되었습니다.",
+        )
+        return task
+
+    def _save_segments(self, task: TaskItem, segments: list[PipelineSegment]):
+        # expose stage task ids in the task parameters
+        task.params["segments"] = json.dumps(
+            [
+                {
+                    "startat": s.startat.isoformat(),
+                    "record": s.record,
+                    "tracking": s.tracking,
+                    "analysis": s.analysis,
+                }
+                for s in segments
+            ]
+        )
+
+    def _stage(self, id: str | None) -> TaskItem | None:
+        if id is None:
+            return None
+        try:
+            return self._task_repo.get(id)
+        except EntityNotFound:
+            raise ValueError(f"파이프라인 단계 작업이 삭제되었습니다. id={id}")
+
+    def _check(self, stage: TaskItem | None, name: str) -> bool:
+        # True if the stage finished successfully
+        if stage is None:
+            return False
+        if stage.state in (TaskState.FAILED, TaskState.CANCELED):
+            raise ValueError(f"{name} 작업이 실패하였습니다. id={stage.id}\n{stage.reason}")
+        return stage.state == TaskState.FINISHED
+
+    def _advance(self, task: TaskItem, segment: PipelineSegment) -> bool:
+        """
+        segment의 완료된 단계 다음 단계를 시작한다. 모든 단계가 끝났으면 True를 반환한다.
+        """
+        if segment.tracking is None:
+            if not self._check(self._stage(segment.record), "녹화"):
+                return False
+            params = {"targetname": f"{segment.record}.mp4"}
+            if "confidence" in task.params:
+                params["confidence"] = task.params["confidence"]
+            segment.tracking = self._tracking_srv.start(params).id
+
+        if segment.analysis is None:
+            if not self._check(self._stage(segment.tracking), "객체 추적"):
+                return False
+            params = {
+                "trackdata": f"{segment.tracking}.csv",
+                "roi": task.params["roi"],
+                "roadwidth": task.params["roadwidth"],
+                "roadheight": task.params["roadheight"],
+            }
+            for key in ANALYSIS_OPTIONS:
+                if key in task.params:
+                    params[key] = task.params[key]
+            segment.analysis = self._analysis_srv.start(params).id
+
+        return self._check(self._stage(segment.analysis), "분석")
+
+    def _progress(self, segments: list[PipelineSegment]) -> float:
+        progress = 0.0
+        for segment in segments:
+            for id in (segment.record, segment.tracking, segment.analysis):
+                stage = self._stage(id)
+                if stage is not None:
+                    finished = stage.state == TaskState.FINISHED
+                    progress += 1.0 if finished else stage.progress
+        return progress / (3 * len(segments))
+
+    def _stop_stages(self, task: TaskItem):
+        for segment in json.loads(task.params["segments"]):
+            for srv, id in (
+                (self._record_srv, segment["record"]),
+                (self._tracking_srv, segment["tracking"]),
+                (self._analysis_srv, segment["analysis"]),
+            ):
+                if id is None:
+                    continue
+                try:
+                    srv.stop(id)
+                except EntityNotFound:
+                    pass
+
+    def _merge_flow(self, task: TaskItem, segments: list[PipelineSegment]):
+        startat = segments[0].startat
+        flows = []
+        for i, segment in enumerate(segments):
+            flow = pd.read_csv(
+                output_path(self._outputs_path, f"{segment.analysis}_flow.csv")
+            )
+            flow.insert(0, "segment", i)
+            flow["start"] += (segment.startat - startat).total_seconds()
+            flows.append(flow)
+
+        pd.concat(flows, ignore_index=True).to_csv(
+            os.path.join(self._outputs_path, f"{task.id}_flow.csv"), index=False
+        )
+
+    def _run_task(
+        self, ctx: JobContext, task: TaskItem, segments: list[PipelineSegment]
+    ):
+        try:
+            finished = 0
+            while True:
+                done = [self._advance(task, segment) for segment in segments]
+                self._save_segments(task, segments)
+                if all(done):
+                    break
+
+                if sum(done) != finished or task.state == TaskState.PENDING:
+                    finished = sum(done)
+                    ctx.set_progress(
+                        self._progress(segments),
+                        f"{len(segments)}개 구간 중 {finished}개 구간의 분석이 완료되었습니다.",
+                    )
+                else:
+                    ctx.set_progress(self._progress(segments))
+
+                if ctx.wait(self._poll_seconds):
+                    self._stop_stages(task)
+                    ctx.raise_if_canceled()
+
+            self._merge_flow(task, segments)
+            self._output_repo.save(
+                TaskOutput(
+                    name=f"{task.id}_flow.csv",
+                    type="text/csv",
+                    desc=f"{task.params['cctv']} 구간별 교통류 지표",
+                    taskid=task.id,
+                    metadata=task.params,
+                )
+            )
+
+            task.progress = 1.0
+            self._task_repo.update(
+                task.id, TaskState.FINISHED, "파이프라인이 완료되었습니다."
+            )
+
+        except TaskCancelException as e:
+            self._task_repo.update(task.id, TaskState.CANCELED, str(e))
+        except Exception as e:
+            self._stop_stages(task)
+            self._task_repo.update(task.id, TaskState.FAILED, str(e))
+
+    def stop(self, id: str):
+        task = self._task_repo.get(id)  # raises EntityNotFound
+        if self._engine.cancel(id):
+            self._stop_stages(task)
@@ -1,13 +1,13 @@
 import os
 import signal
 import subprocess
-import threading
 import time
 from datetime import datetime
 from uuid import uuid4
 
+from core.engine import FINISHED_STATES, JobContext, ResourceClass, TaskEngine
+from core.metrics import Counter, Gauge
 from core.model import (
-    EntityNotFound,
     TaskCancelException,
     TaskItem,
     TaskOutput,
@@ -16,6 +16,13 @@ from core.model import (
 )
 from core.repo import CCTVStreamRepository, TaskItemRepository, TaskOutputRepository
 from core.srv import TaskService
+from srv.output_storage import OutputStorageManager
+from srv.task_usage import TaskUsage
+
+RECORD_BITRATE = Gauge(
+    "cctv_record_bitrate_bps", "Current recording bitrate (bits/s)", ["cctv"]
+)
+RECORD_BYTES = Counter("cctv_record_bytes_total", "Bytes written by recordings")
 
 
 class CCTVRecordFFmpegTaskSrv(TaskService):
@@ -26,13 +33,19 @@ class CCTVRecordFFmpegTaskSrv(TaskService):
         cctv_stream_repo: CCTVStreamRepository,
         outputs_path: str,
         output_repo: TaskOutputRepository,
+        engine: TaskEngine,
+        storage: OutputStorageManager | None = None,
+        default_bitrate: float = 4_000_000,
     ):
 
-        self._cancel_req: dict[str, bool] = {}
+        self._engine = engine
         self._task_repo = task_repo
         self._cctv_stream_repo = cctv_stream_repo
         self._outputs_path = outputs_path
         self._output_repo = output_repo
+        # reserve bitrate x duration before recording (bits/s, used without history)
+        self._storage = storage
+        self._default_bitrate = default_bitrate
 
     def get_name(self) -> str:
         return "CCTV 녹화"
@@ -48,8 +61,31 @@ class CCTVRecordFFmpegTaskSrv(TaskService):
         return self._task_repo.get_by_name(self.get_name())
 
     def del_task(self, id: str):
+        self._engine.cancel(id)
         self._task_repo.delete(id)
         self._output_repo.delete(id)
+        if self._storage is not None:
+            self._storage.release(id)
+
+    def _reserve_storage(
+        self,
+        storage: OutputStorageManager,
+        task: TaskItem,
+        startat: datetime,
+        endat: datetime,
+    ):
+        # the highest bitrate seen in past recordings of this CCTV
+        bitrate = storage.recording_bitrate(
+            task.params["cctv"],
+            {t.id for t in self.get_tasks()},
+            self._default_bitrate,
+        )
+        seconds = (endat - max(startat, datetime.now())).total_seconds()
+        storage.reserve(
+            task.id,
+            int(bitrate * max(seconds, 0) / 8),
+            os.path.join(self._outputs_path, f"{task.id}.mp4"),
+        )
 
     def start(self, params: dict[str, str]) -> TaskItem:
         cctv = self._cctv_stream_repo.get_by_name(params["cctv"])
@@ -69,26 +105,19 @@ class CCTVRecordFFmpegTaskSrv(TaskService):
             reason="녹화 대기 중에 있습니다.",
             progress=0.0,
         )
+        if self._storage is not None:
+            # refuse before scheduling if the recording cannot fit
+            self._reserve_storage(self._storage, task, startat, endat)
         self._task_repo.add(task)
-        self._cancel_req[task.id] = False
 
-        def task_func():
-            nonlocal startat, endat, task
+        def task_func(ctx: JobContext):
             ffmpeg_stdout = None
             ffmpeg_stderr = None
 
             try:
-                # 녹화 대기
-                while True:
-                    now = datetime.now()
-                    if now >= endat:
-                        raise ValueError(f"현 시각이 녹화 종료 시각을 지났습니다.")
-                    elif now >= startat:
-                        break
-
-                    if self._cancel_req.get(task.id, False):
-                        raise TaskCancelException(f"녹화가 요청에 의해 취소되었습니다.")
-                    time.sleep(0.5)
+                # 녹화 대기는 엔진이 startat까지 작업을 예약하여 처리한다.
+                if datetime.now() >= endat:
+                    raise ValueError(f"현 시각이 녹화 종료 시각을 지났습니다.")
 
                 hls = self._cctv_stream_repo.get_hls(cctv)
                 duration = (endat - datetime.now()).seconds
@@ -119,21 +148,28 @@ class CCTVRecordFFmpegTaskSrv(TaskService):
                     stdin=subprocess.DEVNULL,
                 )
 
-                self._task_repo.update(
-                    task.id,
-                    TaskState.STARTED,
-                    "녹화 시작 시간이 되어 녹화 중에 있습니다.",
-                )
+                # recording runs in ffmpeg: account for its usage, not this thread's
+                usage = TaskUsage(ffmpeg.pid)
+                ctx.set_progress(0.0, "녹화 시작 시간이 되어 녹화 중에 있습니다.")
+                bitrate = RECORD_BITRATE.labels(cctv.name)
+                recorded_bytes = RECORD_BYTES.labels()
+                last_size, last_time = 0, time.monotonic()
                 while ffmpeg.poll() is None:
-                    task.progress = (datetime.now() - startat).seconds / (
-                        endat - startat
-                    ).seconds
-                    task.progress = min(1.0, task.progress)
+                    ctx.set_progress(
+                        (datetime.now() - startat).seconds / (endat - startat).seconds
+                    )
 
-                    if self._cancel_req.get(task.id, False):
+                    if ctx.wait(1):
                         ffmpeg.send_signal(signal.SIGTERM)
-                        raise TaskCancelException(f"녹화가 요청에 의해 취소되었습니다.")
-                    time.sleep(1)
+                        ctx.raise_if_canceled()
+
+                    # bitrate from the growth of the output file
+                    if os.path.exists(output_path):
+                        size, now = os.path.getsize(output_path), time.monotonic()
+                        bitrate.set((size - last_size) * 8 / (now - last_time))
+                        recorded_bytes.inc(size - last_size)
+                        last_size, last_time = size, now
+                    usage.sample()
 
                 # 녹화 정리
                 retcode = ffmpeg.returncode
@@ -183,6 +219,7 @@ class CCTVRecordFFmpegTaskSrv(TaskService):
                     raise Exception(f"녹화 중 오류가 발생하였습니다.")
 
                 task.progress = 1.0
+                task.stats = usage.stats()
                 self._task_repo.update(
                     task.id, TaskState.FINISHED, "녹화가 완료되었습니다."
                 )
@@ -192,17 +229,28 @@ class CCTVRecordFFmpegTaskSrv(TaskService):
             except Exception as e:
                 self._task_repo.update(task.id, TaskState.FAILED, str(e))
             finally:
+                RECORD_BITRATE.remove(cctv.name)
+                if self._storage is not None:
+                    self._storage.release(task.id)
                 if ffmpeg_stdout is not None:
                     ffmpeg_stdout.close()
                 if ffmpeg_stderr is not None:
                     ffmpeg_stderr.close()
 
-        thread = threading.Thread(target=task_func)
-        thread.start()
+        self._engine.submit(
+            task.id,
+            ResourceClass.IO,
+            task_func,
+            not_before=startat,
+            cancel_reason="녹화가 요청에 의해 취소되었습니다.",
+        )
         return task
 
     def stop(self, id: str):
-        req = self._cancel_req.get(id)
-        if req is None:
-            raise EntityNotFound(f"녹화 작업이 존재하지 않습니다. id={id}")
-        self._cancel_req[id] = True
+        self._task_repo.get(id)  # raises EntityNotFound
+        self._engine.cancel(id)
+        if self._storage is None:
+            return
+        if self._task_repo.get(id).state in FINISHED_STATES:
+            # canceled before the recording started: task_func does not run
+            self._storage.release(id)
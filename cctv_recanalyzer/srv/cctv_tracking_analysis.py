@@ -1,13 +1,15 @@
 import json
 import math
 import os
-import threading
 import traceback
+from typing import BinaryIO, Callable, Iterator
 from uuid import uuid4
 
 import cv2
 import numpy as np
 import pandas as pd
+from core.engine import JobContext, ResourceClass, TaskEngine
+from core.metrics import Histogram, StageClock
 from core.model import (
     EntityNotFound,
     TaskCancelException,
@@ -16,8 +18,51 @@ from core.model import (
     TaskParamMeta,
     TaskState,
 )
-from core.repo import TaskItemRepository, TaskOutputRepository
+from core.repo import (
+    TaskItemRepository,
+    TaskOutputRepository,
+    TaskResultCacheRepository,
+)
 from core.srv import TaskService
+from srv.job_queue import JobQueueScheduler
+from srv.output_tier import decompressed, output_path
+from srv.process_task_executor import (
+    ProcessTaskContext,
+    ProcessTaskExecutor,
+    run_in_process,
+)
+from srv.task_result_cache import make_cache_key, start_from_cache
+from srv.task_usage import (
+    PROFILE_TYPE,
+    profile_output,
+    profile_path,
+    profile_requested,
+    run_measured,
+)
+from srv.traffic_flow import TrafficFlowAccumulator
+
+# 결과 형식이나 처리 방식이 바뀌면 올려서 이전 캐시를 무효화한다.
+RESULT_VERSION = "2"
+
+INTERPOLATE_COLUMNS = ["x", "y", "perspx", "perspy"]
+RESULT_COLUMNS = [
+    "objid",
+    "frame",
+    "clsid",
+    *INTERPOLATE_COLUMNS,
+    "speed",
+    "accel",
+    "heading",
+]
+
+# 스트리밍 분석에서 이 시간(s) 이상 관측되지 않은 객체는 종료된 것으로 보고 상태를 정리한다.
+STREAM_MAX_GAP_SECONDS = 10.0
+
+ANALYSIS_STAGE_SECONDS = Histogram(
+    "cctv_analysis_stage_seconds",
+    "Duration of each analysis stage",
+    ["task", "stage"],
+)
 
 
 def find_closest_rectangle(lt, lb, rt, rb, ratio):
@@ -30,56 +75,368 @@ def find_closest_rectangle(lt, lb, rt, rb, ratio):
     return points, width, height
 
 
-def interpolate_persp_data(persp_df: pd.DataFrame) -> pd.DataFrame:
+def transform_persp_data(
+    df: pd.DataFrame, matrix: np.ndarray, roiwidth: int, roiheight: int
+) -> pd.DataFrame:
     """
-    추적된 객체에 대하여 두 프레임 사이의 거리가 1보다 큰 경우, 중간 프레임에 대하여 보간을 수행합니다.
+    추적 데이터의 (x, y) 좌표 전체를 한 번의 perspective transform으로 변환하여 perspx, perspy 열을 추가하고,
+    ROI(0 <= perspx < roiwidth, 0 <= perspy < roiheight) 범위 밖의 데이터를 제거합니다.
     """
-    # create new dataframe
-    df = pd.DataFrame(columns=["objid", "frame"])
+    if len(df) == 0:
+        return df.assign(perspx=np.float32(0), perspy=np.float32(0))
 
-    # interpolate missing frame
-    for objid in persp_df["objid"].unique():
-        temp_df: pd.DataFrame = persp_df[persp_df["objid"] == objid]
-        frames = temp_df["frame"].sort_values().values
+    src = df[["x", "y"]].to_numpy(dtype=np.float32).reshape(-1, 1, 2)
+    dst = cv2.perspectiveTransform(src, matrix).reshape(-1, 2)
+    perspx = dst[:, 0]
+    perspy = dst[:, 1]
 
-        col_frame = np.arange(frames[0], frames[-1] + 1)  # min, max + 1
-        df = pd.concat(
-            [df, pd.DataFrame({"objid": objid, "frame": col_frame})], ignore_index=True
-        )
+    mask = (perspx >= 0) & (perspx < roiwidth) & (perspy >= 0) & (perspy < roiheight)
+    return df.assign(perspx=perspx, perspy=perspy)[mask]
+
+
+def interpolate_persp_data(
+    persp_df: pd.DataFrame, columns: list[str] = INTERPOLATE_COLUMNS
+) -> pd.DataFrame:
+    """
+    추적된 객체에 대하여 두 프레임 사이의 거리가 1보다 큰 경우, 중간 프레임에 대하여 보간을 수행합니다.
+    columns 열은 선형 보간하고, clsid는 직전 값으로 채웁니다. 결과는 (objid, frame) 순으로 정렬됩니다.
+    """
+    # frame range of each object: [min, max]
+    bounds = persp_df.groupby("objid")["frame"].agg(["min", "max"])
+    lengths = (bounds["max"] - bounds["min"] + 1).to_numpy()
+    starts = np.cumsum(lengths) - lengths
+
+    # expand every object onto its full frame range
+    df = pd.DataFrame(
+        {
+            "objid": np.repeat(bounds.index.to_numpy(), lengths),
+            "frame": np.repeat(bounds["min"].to_numpy(), lengths)
+            + (np.arange(lengths.sum()) - np.repeat(starts, lengths)),
+        }
+    )
 
     # join tracking data
     df = df.join(
         persp_df.set_index(["objid", "frame"]), on=["objid", "frame"], how="left"
     )
 
-    # interpolate missing class with the same class
-    df["clsid"] = df.groupby("objid")["clsid"].ffill().bfill()
+    # 각 객체의 첫 프레임과 마지막 프레임은 항상 관측된 값이므로 결측치는 객체 내부에만 존재한다.
+    # 따라서 전체 열에 대한 ffill / linear interpolation 한 번이 객체별(groupby) 보간과 같은 결과를 낸다.
+    df["clsid"] = df["clsid"].ffill()
+    df[columns] = df[columns].interpolate(method="linear")
+
+    return df
+
+
+def grouped_rolling_mean(
+    values: np.ndarray, group_pos: np.ndarray, window: int
+) -> np.ndarray:
+    """
+    그룹 단위로 연속 정렬된 values에 대하여, 그룹 경계를 넘지 않는 이동 평균(min_periods=1)을 계산합니다.
+    group_pos는 각 행의 그룹 내 위치(0, 1, 2, ...)이며, NaN은 평균에서 제외합니다.
+    """
+    valid = ~np.isnan(values)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+
+    end = np.arange(1, len(values) + 1)
+    begin = end - np.minimum(group_pos + 1, window)
+    n = counts[end] - counts[begin]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, (sums[end] - sums[begin]) / n, np.nan)
+
+
+def calculate_speed(
+    df: pd.DataFrame,
+    fps: float,
+    meter_per_pixel: float,
+    delta_frame: int = 5,
+    smoothing: int = 0,
+) -> pd.DataFrame:
+    """
+    (objid, frame) 순으로 정렬된 데이터에 대하여 객체별 속도(speed, km/h), 가속도(accel, m/s^2),
+    진행 방향(heading, deg)을 계산합니다.
+    속도는 delta_frame 프레임 동안의 perspy 변화량으로 계산하며, smoothing > 1이면 해당 크기의 이동 평균을 적용합니다.
+    진행 방향은 도로 방향(+perspy)을 0도로 하고 +perspx 방향을 양수로 합니다.
+    객체의 프레임이 연속되지 않은 구간(ROI 재진입 등)에서는 값을 계산하지 않습니다(NaN).
+    """
+    delta_time = delta_frame / fps  # sec
+    group = df.groupby("objid", sort=False)
+
+    # rows that are exactly delta_frame frames apart within the same object
+    contiguous = group["frame"].diff(periods=delta_frame).to_numpy() == delta_frame
+    dx = group["perspx"].diff(periods=delta_frame).to_numpy(dtype=np.float64)
+    dy = group["perspy"].diff(periods=delta_frame).to_numpy(dtype=np.float64)
+    dx[~contiguous] = np.nan
+    dy[~contiguous] = np.nan
+
+    speed = dy * (meter_per_pixel / delta_time)  # m/s
+    if smoothing > 1:
+        speed = grouped_rolling_mean(speed, group.cumcount().to_numpy(), smoothing)
+
+    df = df.assign(speed=speed * 3.6)  # km/h
+    accel = df.groupby("objid", sort=False)["speed"].diff(periods=delta_frame)
+    accel[~contiguous] = np.nan
+    heading = np.degrees(np.arctan2(dx, dy))
+
+    return df.assign(accel=accel / 3.6 / delta_time, heading=heading)
 
-    # interpolate missing x, y with linear interpolation
-    df["x"] = (
-        df.groupby("objid")["x"]
-        .apply(lambda x: x.interpolate(method="linear"))
-        .reset_index(drop=True)
+
+def summarize_objects(df: pd.DataFrame, fps: float) -> pd.DataFrame:
+    """
+    객체별 요약(클래스, 첫/마지막 프레임, ROI 체류 시간(s), 평균/최대/85 백분위 속도(km/h))을 계산합니다.
+    속도 통계는 진행 방향과 무관하도록 속도의 절댓값을 사용합니다.
+    """
+    df = df.assign(_speed=df["speed"].abs())
+    group = df.groupby("objid")
+
+    summary = group.agg(
+        clsid=("clsid", "first"),
+        firstframe=("frame", "min"),
+        lastframe=("frame", "max"),
+        frames=("frame", "size"),
+        meanspeed=("_speed", "mean"),
+        maxspeed=("_speed", "max"),
     )
-    df["y"] = (
-        df.groupby("objid")["y"]
-        .apply(lambda x: x.interpolate(method="linear"))
-        .reset_index(drop=True)
+    summary["p85speed"] = group["_speed"].quantile(0.85)
+    summary["timeinroi"] = summary["frames"] / fps
+
+    return summary.reset_index()
+
+
+def read_frame_chunks(f: BinaryIO, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    프레임 순으로 기록된 추적 데이터를 약 chunk_rows 행 단위로 읽습니다.
+    한 프레임의 데이터가 두 청크로 나뉘지 않도록 각 청크의 마지막 프레임은 다음 청크로 넘깁니다.
+    """
+    pending: pd.DataFrame | None = None
+    last_frame = -1
+
+    for chunk in pd.read_csv(f, chunksize=chunk_rows):
+        if pending is not None:
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+
+        frames = chunk["frame"].to_numpy()
+        if frames[0] <= last_frame or np.any(np.diff(frames) < 0):
+            raise ValueError("스트리밍 분석은 프레임 순으로 기록된 추적 데이터만 지원합니다.")
+
+        boundary = frames == frames[-1]
+        pending = chunk[boundary]
+        if not boundary.all():
+            last_frame = frames[~boundary][-1]
+            yield chunk[~boundary]
+
+    if pending is not None:
+        yield pending
+
+
+def analyze_in_chunks(
+    f: BinaryIO,
+    matrix: np.ndarray,
+    roiwidth: int,
+    roiheight: int,
+    fps: float,
+    meter_per_pixel: float,
+    result_f,
+    summary_f,
+    flow: TrafficFlowAccumulator | None = None,
+    delta_frame: int = 5,
+    smoothing: int = 0,
+    chunk_rows: int = 500_000,
+    max_gap: int | None = None,
+    on_chunk: Callable[[], None] | None = None,
+):
+    """
+    추적 데이터를 프레임 순 청크 단위로 읽어 분석하고, 결과를 result_f / summary_f에 이어서 기록합니다.
+    각 객체의 최근 2 * delta_frame + smoothing 행을 다음 청크로 넘겨 보간과 속도 계산이 청크 경계에서 끊기지 않도록 하므로,
+    메모리 사용량은 입력 크기가 아니라 청크 크기와 동시에 관측되는 객체 수에 비례합니다.
+
+    - 분석 결과는 청크 단위로, 청크 안에서는 (objid, frame) 순으로 기록됩니다.
+    - 객체별 요약은 객체가 max_gap 프레임(기본값: STREAM_MAX_GAP_SECONDS) 동안 관측되지 않아 종료될 때 기록됩니다.
+      따라서 max_gap보다 긴 공백은 보간하지 않고 별도의 관측으로 취급합니다.
+    """
+    if max_gap is None:
+        max_gap = int(round(STREAM_MAX_GAP_SECONDS * fps))
+    history = 2 * delta_frame + max(smoothing, 1)
+
+    # carried over between chunks
+    tail: pd.DataFrame | None = None  # last `history` rows of each active object
+    emitted = pd.Series(dtype=np.int64)  # objid -> last frame written
+    active: list[pd.DataFrame] = []  # rows of active objects for the summary
+    result_header = summary_header = True
+
+    def write_summary(rows: pd.DataFrame):
+        nonlocal summary_header
+        summarize_objects(rows, fps).to_csv(
+            summary_f, header=summary_header, index=False
+        )
+        summary_header = False
+
+    for chunk in read_frame_chunks(f, chunk_rows):
+        last_frame = int(chunk["frame"].iloc[-1])
+        df = transform_persp_data(chunk, matrix, roiwidth, roiheight)
+        if tail is not None:
+            df = pd.concat([tail, df], ignore_index=True)
+
+        if len(df):
+            df = interpolate_persp_data(df)
+            df = df.astype({"clsid": np.int64, "x": np.float64, "y": np.float64})
+            df = calculate_speed(
+                df, fps, meter_per_pixel, delta_frame=delta_frame, smoothing=smoothing
+            )
+
+            # rows carried over from the previous chunk are only used as history
+            new = (df["frame"] > df["objid"].map(emitted).fillna(-1)).to_numpy()
+            df[new].to_csv(result_f, header=result_header, index=False)
+            result_header = False
+            if flow is not None:
+                flow.add(df, mask=new)
+            active.append(df.loc[new, ["objid", "frame", "clsid", "speed"]])
+
+            tail = (
+                df.groupby("objid", sort=False)
+                .tail(history)
+                .drop(columns=["speed", "accel", "heading"])
+            )
+            emitted = df.groupby("objid")["frame"].max()
+
+            # finish objects that have not been seen for a while
+            stale = emitted.index[emitted < last_frame - max_gap]
+            if len(stale):
+                tail = tail[~tail["objid"].isin(stale)]
+                emitted = emitted.drop(stale)
+                rows = pd.concat(active, ignore_index=True)
+                finished = rows["objid"].isin(stale)
+                write_summary(rows[finished])
+                active = [rows[~finished]]
+
+            # later chunks can only add rows after the last written frame of each object
+            if flow is not None:
+                flow.prune(int(emitted.min()) if len(emitted) else last_frame)
+
+        if on_chunk is not None:
+            on_chunk()
+
+    if result_header:
+        result_f.write(",".join(RESULT_COLUMNS) + "\n")
+
+    rows = (
+        pd.concat(active, ignore_index=True)
+        if active
+        else pd.DataFrame(
+            columns=["objid", "frame", "clsid", "speed"], dtype=np.float64
+        )
     )
+    if len(rows) or summary_header:
+        write_summary(rows)
+
 
-    # interpolate missing pos_x, pox_y with linear interpolation
-    df["perspx"] = (
-        df.groupby("objid")["perspx"]
-        .apply(lambda x: x.interpolate(method="linear"))
-        .reset_index(drop=True)
+def run_analysis(
+    ctx: ProcessTaskContext, outputs_path: str, taskid: str, params: dict[str, str]
+):
+    """
+    작업 프로세스에서 차량 추적 데이터 분석을 수행하여 {taskid}.csv, {taskid}_summary.csv, {taskid}_flow.csv를 저장합니다.
+    단계마다 진행률을 보고하고 취소 요청을 확인합니다(스트리밍 분석은 청크마다).
+    단계별 소요 시간(초)을 반환합니다.
+    """
+    canceled = "분석이 요청에 의해 중단되었습니다."
+    clock = StageClock()
+
+    def stage(progress: float, reason: str, name: str):
+        ctx.raise_if_canceled(canceled)
+        ctx.set_progress(progress, reason)
+        clock.stage(name)
+
+    srcpoints = json.loads(params["srcpoints"])
+    dstpoints = json.loads(params["dstpoints"])
+    roiwidth, roiheight = dstpoints[-1]  # right bottom
+    roadheight = float(params["roadheight"])
+    fps = int(params["fps"])
+    deltaframe = int(params["deltaframe"])
+    smoothing = int(params["smoothing"])
+    chunksize = int(params["chunksize"])
+
+    # calculate perspective transform matrix
+    matrix = cv2.getPerspectiveTransform(
+        np.array(srcpoints, dtype=np.float32),
+        np.array(dstpoints, dtype=np.float32),
     )
-    df["perspy"] = (
-        df.groupby("objid")["perspy"]
-        .apply(lambda x: x.interpolate(method="linear"))
-        .reset_index(drop=True)
+
+    meter_per_pixel = roadheight / roiheight  # meter/pixel
+    trackdata_path = output_path(outputs_path, params["trackdata"])
+    result_csv_path = os.path.join(outputs_path, f"{taskid}.csv")
+    summary_csv_path = os.path.join(outputs_path, f"{taskid}_summary.csv")
+    flow_csv_path = os.path.join(outputs_path, f"{taskid}_flow.csv")
+    flow = TrafficFlowAccumulator(
+        fps,
+        meter_per_pixel,
+        roiwidth,
+        road_length=roadheight,
+        bin_seconds=float(params["binsec"]),
+        line=float(params["countline"]),
+        lanes=int(params["lanes"]),
     )
 
-    return df
+    if chunksize > 0:
+        # streaming analysis: bounded memory regardless of input size
+        stage(0.0, "추적 데이터를 청크 단위로 분석하는 중입니다.", "stream")
+        total_bytes = max(1, os.path.getsize(trackdata_path))
+        with open(trackdata_path, "rb") as f, open(
+            result_csv_path, "w"
+        ) as result_f, open(summary_csv_path, "w") as summary_f:
+
+            def on_chunk():
+                ctx.raise_if_canceled(canceled)
+                ctx.set_progress(0.95 * min(1.0, f.tell() / total_bytes))
+
+            analyze_in_chunks(
+                decompressed(f),
+                matrix,
+                roiwidth,
+                roiheight,
+                fps,
+                meter_per_pixel,
+                result_f,
+                summary_f,
+                flow,
+                delta_frame=deltaframe,
+                smoothing=smoothing,
+                chunk_rows=chunksize,
+                on_chunk=on_chunk,
+            )
+    else:
+        # read tracking data
+        stage(0.0, "추적 데이터를 읽는 중입니다.", "read")
+        df = pd.read_csv(trackdata_path)
+
+        # perspective transform tracking data and filter out of range data(roi)
+        stage(0.1, "좌표를 변환하는 중입니다.", "transform")
+        df = transform_persp_data(df, matrix, roiwidth, roiheight)
+
+        # interpolate missing data
+        stage(0.2, "누락된 프레임을 보간하는 중입니다.", "interpolate")
+        df = interpolate_persp_data(df)
+
+        # calculate speed (interpolated data is sorted by objid, frame)
+        stage(0.4, "속도를 계산하는 중입니다.", "speed")
+        df = calculate_speed(
+            df, fps, meter_per_pixel, delta_frame=deltaframe, smoothing=smoothing
+        )
+
+        # save result and per-object summary
+        stage(0.6, "분석 결과를 저장하는 중입니다.", "save")
+        df.to_csv(result_csv_path, index=False)
+        summarize_objects(df, fps).to_csv(summary_csv_path, index=False)
+
+        stage(0.8, "교통류 지표를 집계하는 중입니다.", "flow")
+        flow.add(df)
+
+    # save traffic flow aggregates
+    clock.stage("flow_save")
+    flow.result().to_csv(flow_csv_path, index=False)
+    clock.stage(None)
+    ctx.set_progress(1.0)
+    return clock.durations
 
 
 class CCTVTrackingAnalysisTaskSrv(TaskService):
@@ -89,11 +446,47 @@ class CCTVTrackingAnalysisTaskSrv(TaskService):
         task_repo: TaskItemRepository,
         outputs_path: str,
         output_repo: TaskOutputRepository,
+        engine: TaskEngine,
+        render_srv: TaskService | None = None,
+        result_cache: TaskResultCacheRepository | None = None,
+        chunk_rows: int = 0,
+        executor: ProcessTaskExecutor | None = None,
+        job_queue: JobQueueScheduler | None = None,
     ):
 
+        self._delta_frame_default = 5
+        self._chunk_rows_default = chunk_rows  # 0: in-memory analysis
+        self._bin_seconds_default = 60.0
         self._task_repo = task_repo
         self._outputs_path = outputs_path
         self._output_repo = output_repo
+        self._render_srv = render_srv
+        self._result_cache = result_cache
+        self._engine = engine
+        self._executor = executor or ProcessTaskExecutor(max_workers=1)
+        self._job_queue = job_queue  # run on workers (worker.py) if set
+
+    def _cache_key(self, metadata: dict[str, str]) -> str:
+        return make_cache_key(
+            kind="analysis",
+            version=RESULT_VERSION,
+            files=[output_path(self._outputs_path, metadata["trackdata"])],
+            params={
+                key: metadata[key]
+                for key in [
+                    "srcpoints",
+                    "roadwidth",
+                    "roadheight",
+                    "deltaframe",
+                    "smoothing",
+                    "binsec",
+                    "countline",
+                    "lanes",
+                    "chunksize",
+                    "fps",
+                ]
+            },
+        )
 
     def get_name(self) -> str:
         return "차량 추적 데이터 분석"
@@ -106,12 +499,63 @@ class CCTVTrackingAnalysisTaskSrv(TaskService):
             TaskParamMeta(name="roi", desc="ROI 좌표", accept=["json"]),
             TaskParamMeta(name="roadwidth", desc="도로 너비(m)", accept=["float"]),
             TaskParamMeta(name="roadheight", desc="도로 길이(m)", accept=["float"]),
+            TaskParamMeta(
+                name="deltaframe",
+                desc="속도 계산 프레임 간격",
+                accept=["int"],
+                optional=True,
+            ),
+            TaskParamMeta(
+                name="smoothing",
+                desc="속도 이동 평균 윈도우(프레임)",
+                accept=["int"],
+                optional=True,
+            ),
+            TaskParamMeta(
+                name="binsec",
+                desc="교통류 집계 시간 간격(s)",
+                accept=["float"],
+                optional=True,
+            ),
+            TaskParamMeta(
+                name="countline",
+                desc="ROI 상단으로부터 검지선까지의 거리(m)",
+                accept=["float"],
+                optional=True,
+            ),
+            TaskParamMeta(
+                name="lanes",
+                desc="교통류 집계 차로 구간 수",
+                accept=["int"],
+                optional=True,
+            ),
+            TaskParamMeta(
+                name="chunksize",
+                desc="스트리밍 분석 청크 크기(행, 0: 전체를 메모리에서 분석)",
+                accept=["int"],
+                optional=True,
+            ),
+            TaskParamMeta(
+                name="render",
+                desc="분석 완료 후 항공뷰 영상 렌더링 여부",
+                accept=["bool"],
+                optional=True,
+            ),
+            TaskParamMeta(
+                name="profile",
+                desc="실행 프로파일(cProfile) 저장 여부",
+                accept=["bool"],
+                optional=True,
+            ),
         ]
 
     def get_tasks(self) -> list[TaskItem]:
         return self._task_repo.get_by_name(self.get_name())
 
     def del_task(self, id: str):
+        self._engine.cancel(id)
+        if self._job_queue is not None:
+            self._job_queue.cancel(id)
         self._task_repo.delete(id)
         self._output_repo.delete(id)
 
@@ -123,6 +567,25 @@ class CCTVTrackingAnalysisTaskSrv(TaskService):
         roadwidth = float(params["roadwidth"])  # meter
         roadheight = float(params["roadheight"])  # meter
 
+        # get speed calculation options
+        deltaframe = int(params.get("deltaframe", self._delta_frame_default))
+        smoothing = int(params.get("smoothing", 0))
+        if deltaframe < 1 or smoothing < 0:
+            raise ValueError("deltaframe은 1 이상, smoothing은 0 이상이어야 합니다.")
+
+        # get traffic flow aggregation options
+        binsec = float(params.get("binsec", self._bin_seconds_default))
+        countline = float(params.get("countline", roadheight / 2))  # meter
+        lanes = int(params.get("lanes", 1))
+        if binsec <= 0 or lanes < 1 or not 0 <= countline <= roadheight:
+            raise ValueError("교통류 집계 옵션이 올바르지 않습니다.")
+
+        chunksize = int(params.get("chunksize", self._chunk_rows_default))
+        if chunksize < 0:
+            raise ValueError("chunksize는 0 이상이어야 합니다.")
+
+        render = params.get("render", "false").lower() == "true"
+
         # get src points [lt, lb, rt, rb]
         roi = params["roi"]
         srcpoints: list[tuple[int, int]] = [
@@ -144,6 +607,12 @@ class CCTVTrackingAnalysisTaskSrv(TaskService):
             "dstpoints": json.dumps(dstpoints),
             "roadwidth": str(roadwidth),
             "roadheight": str(roadheight),
+            "deltaframe": str(deltaframe),
+            "smoothing": str(smoothing),
+            "binsec": str(binsec),
+            "countline": str(countline),
+            "lanes": str(lanes),
+            "chunksize": str(chunksize),
             "fps": track_metadata.get("fps", "30"),
             "targetname": track_metadata.get("targetname", "N/A"),
             "confidence": track_metadata.get("confidence", "N/A"),
@@ -151,153 +620,149 @@ class CCTVTrackingAnalysisTaskSrv(TaskService):
             "startat": track_metadata.get("startat", "N/A"),
             "endat": track_metadata.get("endat", "N/A"),
         }
+        if profile_requested(params):
+            metadata["profile"] = "true"
 
         task = TaskItem(
             id=str(uuid4()),
             name=self.get_name(),
             params=metadata,
-            state=TaskState.STARTED,
-            reason="준비가 완료되어 차량 추적 데이터 분석을 시작합니다.",
+            state=TaskState.PENDING,
+            reason="작업이 제출되었습니다.",
             progress=0.0,
         )
-        self._task_repo.add(task)
-
-        def task_func():
-            nonlocal task
-            nonlocal srcpoints, dstpoints, trackdata
-            nonlocal roiwidth, roiheight, roadwidth, roadheight
-
-            try:
-                # calculate perspective transform matrix
-                matrix = cv2.getPerspectiveTransform(
-                    np.array(srcpoints, dtype=np.float32),
-                    np.array(dstpoints, dtype=np.float32),
-                )
-
-                # read tracking data
-                df = pd.read_csv(os.path.join(self._outputs_path, trackdata))
+        if self._result_cache is not None and start_from_cache(
+            self._result_cache,
+            self._cache_key(metadata),
+            task,
+            self._task_repo,
+            self._output_repo,
+        ):
+            if render and self._render_srv is not None:
+                self._render_srv.start({"analysis": f"{task.id}.csv"})
+            return task
 
-                # perspective transform tracking data
-                df["_src"] = list(zip(df["x"], df["y"]))
-                df["_dst"] = df["_src"].apply(
-                    lambda p: cv2.perspectiveTransform(
-                        np.array([[p]], dtype=np.float32), matrix
-                    )[0][0]
-                )
-                df["perspx"] = df["_dst"].apply(lambda p: p[0])
-                df["perspy"] = df["_dst"].apply(lambda p: p[1])
-                df = df.drop(columns=["_src", "_dst"])
-
-                # filter out of range data(roi)
-                df = df[(df["perspx"] >= 0) & (df["perspx"] < roiwidth)]
-                df = df[(df["perspy"] >= 0) & (df["perspy"] < roiheight)]
-
-                # interpolate missing data
-                df = interpolate_persp_data(df)
-
-                # sort by objid, frame
-                df = df.sort_values(by=["objid", "frame"], ascending=[True, True])
-
-                # calculate speed
-                delta_frame = 5
-                fps = int(task.params["fps"])
-                delta_time = delta_frame / fps  # sec
-                meter_per_pixel = roadheight / roiheight  # meter/pixel
-                for objid in df["objid"].unique():
-                    spds: pd.Series = df[df["objid"] == objid]["perspy"]
-                    spds = spds.diff(
-                        periods=delta_frame
-                    )  # it assume that data is sorted by frame
-                    spds = (spds * (meter_per_pixel / delta_time)) * 3.6  # km/h
-                    df.loc[df["objid"] == objid, "speed"] = spds
-
-                # save result
-                result_csv_path = os.path.join(self._outputs_path, f"{task.id}.csv")
-                df.to_csv(result_csv_path, index=False)
-                self._output_repo.save(
-                    TaskOutput(
-                        name=f"{task.id}.csv",
-                        type="text/csv",
-                        desc=f"{task.params['cctv']} 객체 추적 데이터 분석 결과",
-                        taskid=task.id,
-                        metadata=task.params,
-                    )
-                )
-
-                task.progress = 0.5  # 50%
-
-                # save perspective video
-                cap = cv2.VideoCapture(
-                    os.path.join(self._outputs_path, task.params["targetname"])
-                )
-                cap_size = (roiwidth, roiheight)
-                fourcc = cv2.VideoWriter.fourcc(*"mp4v")
-                cap_out = cv2.VideoWriter(
-                    os.path.join(self._outputs_path, f"{task.id}.mp4"),
-                    fourcc,
-                    fps,
-                    cap_size,
-                )
-
-                trail_history = {}
-                frame_idx = 0
-                while cap.isOpened():
-                    ret, frame = cap.read()
-                    if ret == False:
-                        break
-
-                    # points
-                    frame_points = df[df["frame"] == frame_idx]
-                    identities = frame_points["objid"].values
-
-                    # remove tracked point from buffer if object is lost
-                    for key in list(trail_history.keys()):
-                        if key not in identities:
-                            trail_history.pop(key)
-
-                    # perspective transform
-                    persp = cv2.warpPerspective(frame, matrix, cap_size)
+        self._task_repo.add(task)
 
-                    # draw trails
-                    for _, _row in frame_points.iterrows():
-                        _id = _row["objid"]
-                        _perspx = int(_row["perspx"])
-                        _perspy = int(_row["perspy"])
+        cancel_reason = "분석이 요청에 의해 중단되었습니다."
+        if self._job_queue is not None:
+            self._job_queue.submit(
+                "analysis",
+                task,
+                cancel_reason=cancel_reason,
+                on_finished=lambda t, o: self._on_remote_finished(t, o, render),
+            )
+        else:
+            self._engine.submit(
+                task.id,
+                ResourceClass.CPU_LIGHT,
+                lambda ctx: self._run_task(ctx, task, render),
+                cancel_reason=cancel_reason,
+            )
+        return task
 
-                        trail: list = trail_history.get(_id, [])
-                        trail.append((_perspx, _perspy))
-                        trail_history[_id] = trail
+    def _outputs(self, task: TaskItem) -> list[TaskOutput]:
+        return [
+            TaskOutput(
+                name=f"{task.id}.csv",
+                type="text/csv",
+                desc=f"{task.params['cctv']} 객체 추적 데이터 분석 결과",
+                taskid=task.id,
+                metadata=task.params,
+            ),
+            TaskOutput(
+                name=f"{task.id}_summary.csv",
+                type="text/csv",
+                desc=f"{task.params['cctv']} 객체별 속도 요약",
+                taskid=task.id,
+                metadata=task.params,
+            ),
+            TaskOutput(
+                name=f"{task.id}_flow.csv",
+                type="text/csv",
+                desc=f"{task.params['cctv']} 교통류 지표(교통량, 속도, 밀도, 점유율)",
+                taskid=task.id,
+                metadata=task.params,
+            ),
+        ]
 
-                        # draw trail
-                        for i in range(1, len(trail)):
-                            cv2.line(persp, trail[i - 1], trail[i], (0, 255, 0), 1)
+    def _remove_partial_outputs(self, task: TaskItem):
+        paths = [os.path.join(self._outputs_path, o.name) for o in self._outputs(task)]
+        prof_path = profile_path(self._outputs_path, task)
+        if prof_path is not None:
+            paths.append(prof_path)
 
-                    cap_out.write(persp)
-                    frame_idx += 1
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
 
-                cap.release()
-                cap_out.release()
+    def _on_remote_finished(
+        self, task: TaskItem, outputs: list[TaskOutput], render: bool
+    ):
+        if self._result_cache is not None:
+            self._result_cache.put(
+                self._cache_key(task.params),
+                [output for output in outputs if output.type != PROFILE_TYPE],
+            )
+        if render and self._render_srv is not None:
+            self._render_srv.start({"analysis": f"{task.id}.csv"})
+
+    def run_task(self, ctx: JobContext, task: TaskItem):
+        """
+        분석 작업을 실행한다. 작업자(worker.py)도 이 함수로 대기열의 작업을 실행한다.
+        (캐시 등록과 렌더링 예약은 완료 후 API 노드에서 처리한다.)
+        """
+        self._run_task(ctx, task, render=False)
+
+    def _run_task(self, ctx: JobContext, task: TaskItem, render: bool):
+        prof_path = profile_path(self._outputs_path, task)
+        try:
+            durations, stats = run_in_process(
+                ctx,
+                self._executor,
+                run_measured,
+                prof_path,
+                run_analysis,
+                self._outputs_path,
+                task.id,
+                task.params,
+            )
+            for name, seconds in durations.items():
+                ANALYSIS_STAGE_SECONDS.labels("analysis", name).observe(seconds)
+            self._task_repo.get(task.id)  # deleted while running
+
+            outputs = self._outputs(task)
+            for output in outputs:
+                self._output_repo.save(output)
+
+            if self._result_cache is not None:
+                self._result_cache.put(self._cache_key(task.params), outputs)
+            if prof_path is not None and os.path.exists(prof_path):
                 self._output_repo.save(
-                    TaskOutput(
-                        name=f"{task.id}.mp4",
-                        type="video/mp4",
-                        desc=f"{task.params['cctv']} 항공뷰 객체 추적 영상",
-                        taskid=task.id,
-                        metadata=task.params,
-                    )
-                )
-
-                self._task_repo.update(
-                    task.id, TaskState.FINISHED, "분석이 완료되었습니다."
+                    profile_output(task, f"{task.params['cctv']} 객체 추적 데이터 분석")
                 )
 
-            except Exception as e:
-                self._task_repo.update(
-                    task.id, TaskState.FAILED, traceback.format_exc()
-                )
-
-        threading.Thread(target=task_func).start()
-        return task
+            task.progress = 1.0
+            task.stats = stats
+            self._task_repo.update(task.id, TaskState.FINISHED, "분석이 완료되었습니다.")
+
+            # schedule aerial video rendering on request
+            if render and self._render_srv is not None:
+                self._render_srv.start({"analysis": f"{task.id}.csv"})
+
+        except EntityNotFound:
+            self._remove_partial_outputs(task)
+        except TaskCancelException as e:
+            self._remove_partial_outputs(task)
+            self._task_repo.update(task.id, TaskState.CANCELED, str(e))
+        except Exception as e:
+            self._remove_partial_outputs(task)
+            self._task_repo.update(
+                task.id, TaskState.FAILED, "".join(traceback.format_exception(e))
+            )
 
     def stop(self, id: str):
-        pass
+        self._task_repo.get(id)  # raises EntityNotFound
+        self._engine.cancel(id)
+        if self._job_queue is not None:
+            self._job_queue.cancel(id)
@@ -0,0 +1,356 @@
+import json
+import os
+import traceback
+from uuid import uuid4
+
+import cv2
+import numpy as np
+import pandas as pd
+from core.engine import JobContext, ResourceClass, TaskEngine
+from core.metrics import StageClock
+from core.model import (
+    EntityNotFound,
+    TaskCancelException,
+    TaskItem,
+    TaskOutput,
+    TaskParamMeta,
+    TaskState,
+)
+from core.repo import TaskItemRepository, TaskOutputRepository
+from core.srv import TaskService
+from srv.cctv_tracking_analysis import (
+    ANALYSIS_STAGE_SECONDS,
+    calculate_speed,
+    find_closest_rectangle,
+    interpolate_persp_data,
+    summarize_objects,
+    transform_persp_data,
+)
+from srv.job_queue import JobQueueScheduler
+from srv.output_tier import output_path
+from srv.process_task_executor import (
+    ProcessTaskContext,
+    ProcessTaskExecutor,
+    run_in_process,
+)
+from srv.task_usage import (
+    profile_output,
+    profile_path,
+    profile_requested,
+    run_measured,
+)
+
+
+def parse_roi_configs(rois: str) -> list[dict]:
+    """
+    ROI 설정 목록(json)을 해석한다.
+    형식: [{"roi": [[x, y] * 4 (lt, lb, rt, rb)], "roadwidth": float, "roadheight": float}, ...]
+    """
+    items = json.loads(rois)
+    if not isinstance(items, list):
+        raise ValueError("ROI 설정은 목록이어야 합니다.")
+
+    configs = []
+    for i, item in enumerate(items):
+        try:
+            srcpoints = [(int(x), int(y)) for x, y in item["roi"]]
+            roadwidth = float(item["roadwidth"])
+            roadheight = float(item["roadheight"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"ROI 설정 형식이 올바르지 않습니다. index={i}")
+        if len(srcpoints) != 4:
+            raise ValueError(f"ROI 좌표는 4개여야 합니다. index={i}")
+        if roadwidth <= 0 or roadheight <= 0:
+            raise ValueError(f"도로 너비와 길이는 0보다 커야 합니다. index={i}")
+
+        dstpoints, roiwidth, roiheight = find_closest_rectangle(
+            *srcpoints, ratio=roadheight / roadwidth
+        )
+        configs.append(
+            {
+                "srcpoints": srcpoints,
+                "dstpoints": dstpoints,
+                "roiwidth": roiwidth,
+                "roiheight": roiheight,
+                "roadwidth": roadwidth,
+                "roadheight": roadheight,
+            }
+        )
+
+    if not configs:
+        raise ValueError("ROI 설정이 비어 있습니다.")
+    return configs
+
+
+def run_batch_analysis(
+    ctx: ProcessTaskContext, outputs_path: str, taskid: str, params: dict[str, str]
+):
+    """
+    작업 프로세스에서 다중 ROI 분석을 수행하여 ROI마다 {taskid}_roi{i}.csv, {taskid}_roi{i}_summary.csv를 저장합니다.
+    ROI마다 진행률을 보고하고 취소 요청을 확인합니다. 단계별 소요 시간(초)을 반환합니다.
+    """
+    canceled = "분석이 요청에 의해 중단되었습니다."
+    configs = parse_roi_configs(params["rois"])
+    fps = int(params["fps"])
+    deltaframe = int(params["deltaframe"])
+    smoothing = int(params["smoothing"])
+    clock = StageClock()
+
+    # read tracking data and interpolate missing frames in image space (once)
+    ctx.set_progress(0.0, "추적 데이터를 읽고 보간하는 중입니다.")
+    clock.stage("read")
+    df = pd.read_csv(output_path(outputs_path, params["trackdata"]))
+    df = interpolate_persp_data(df, columns=["x", "y"])
+
+    for i, config in enumerate(configs):
+        ctx.raise_if_canceled(canceled)
+        ctx.set_progress(
+            (i + 1) / (len(configs) + 1),
+            f"ROI {i + 1}/{len(configs)}을 분석하는 중입니다.",
+        )
+        clock.stage("roi")
+
+        matrix = cv2.getPerspectiveTransform(
+            np.array(config["srcpoints"], dtype=np.float32),
+            np.array(config["dstpoints"], dtype=np.float32),
+        )
+        roi_df = transform_persp_data(
+            df, matrix, config["roiwidth"], config["roiheight"]
+        )
+        roi_df = calculate_speed(
+            roi_df,
+            fps,
+            config["roadheight"] / config["roiheight"],
+            delta_frame=deltaframe,
+            smoothing=smoothing,
+        )
+
+        roi_df.to_csv(
+            os.path.join(outputs_path, f"{taskid}_roi{i}.csv"), index=False
+        )
+        summarize_objects(roi_df, fps).to_csv(
+            os.path.join(outputs_path, f"{taskid}_roi{i}_summary.csv"), index=False
+        )
+
+    clock.stage(None)
+    ctx.set_progress(1.0)
+    return clock.durations
+
+
+class CCTVTrackingBatchAnalysisTaskSrv(TaskService):
+    """
+    하나의 추적 데이터에 대하여 여러 ROI 설정으로 분석을 수행한다.
+    추적 데이터는 한 번만 읽어 이미지 좌표계에서 보간하고, ROI마다 perspective transform과 속도 계산만 수행한다.
+    """
+
+    def __init__(
+        self,
+        task_repo: TaskItemRepository,
+        outputs_path: str,
+        output_repo: TaskOutputRepository,
+        engine: TaskEngine,
+        executor: ProcessTaskExecutor | None = None,
+        job_queue: JobQueueScheduler | None = None,
+    ):
+
+        self._delta_frame_default = 5
+        self._task_repo = task_repo
+        self._outputs_path = outputs_path
+        self._output_repo = output_repo
+        self._engine = engine
+        self._executor = executor or ProcessTaskExecutor(max_workers=1)
+        self._job_queue = job_queue  # run on workers (worker.py) if set
+
+    def get_name(self) -> str:
+        return "차량 추적 데이터 다중 ROI 분석"
+
+    def get_params(self) -> list[TaskParamMeta]:
+        return [
+            TaskParamMeta(
+                name="trackdata", desc="추적 데이터(csv)", accept=["text/detection"]
+            ),
+            TaskParamMeta(
+                name="rois",
+                desc="ROI 설정 목록 [{roi, roadwidth, roadheight}, ...]",
+                accept=["json"],
+            ),
+            TaskParamMeta(
+                name="deltaframe",
+                desc="속도 계산 프레임 간격",
+                accept=["int"],
+                optional=True,
+            ),
+            TaskParamMeta(
+                name="smoothing",
+                desc="속도 이동 평균 윈도우(프레임)",
+                accept=["int"],
+                optional=True,
+            ),
+            TaskParamMeta(
+                name="profile",
+                desc="실행 프로파일(cProfile) 저장 여부",
+                accept=["bool"],
+                optional=True,
+            ),
+        ]
+
+    def get_tasks(self) -> list[TaskItem]:
+        return self._task_repo.get_by_name(self.get_name())
+
+    def del_task(self, id: str):
+        self._engine.cancel(id)
+        if self._job_queue is not None:
+            self._job_queue.cancel(id)
+        self._task_repo.delete(id)
+        self._output_repo.delete(id)
+
+    def start(self, params: dict[str, str]) -> TaskItem:
+        trackdata = params["trackdata"]
+        configs = parse_roi_configs(params["rois"])
+
+        deltaframe = int(params.get("deltaframe", self._delta_frame_default))
+        smoothing = int(params.get("smoothing", 0))
+        if deltaframe < 1 or smoothing < 0:
+            raise ValueError("deltaframe은 1 이상, smoothing은 0 이상이어야 합니다.")
+
+        # get csv(input) metadata
+        track_metadata = self._output_repo.get_by_name(trackdata).metadata
+
+        # determine output metadata
+        metadata = {
+            "trackdata": trackdata,
+            "rois": json.dumps(
+                [
+                    {
+                        "roi": c["srcpoints"],
+                        "roadwidth": c["roadwidth"],
+                        "roadheight": c["roadheight"],
+                    }
+                    for c in configs
+                ]
+            ),
+            "deltaframe": str(deltaframe),
+            "smoothing": str(smoothing),
+            "fps": track_metadata.get("fps", "30"),
+            "targetname": track_metadata.get("targetname", "N/A"),
+            "confidence": track_metadata.get("confidence", "N/A"),
+            "cctv": track_metadata.get("cctv", "N/A"),
+            "startat": track_metadata.get("startat", "N/A"),
+            "endat": track_metadata.get("endat", "N/A"),
+        }
+        if profile_requested(params):
+            metadata["profile"] = "true"
+
+        task = TaskItem(
+            id=str(uuid4()),
+            name=self.get_name(),
+            params=metadata,
+            state=TaskState.PENDING,
+            reason="작업이 제출되었습니다.",
+            progress=0.0,
+        )
+        self._task_repo.add(task)
+
+        cancel_reason = "분석이 요청에 의해 중단되었습니다."
+        if self._job_queue is not None:
+            self._job_queue.submit("batch_analysis", task, cancel_reason=cancel_reason)
+        else:
+            self._engine.submit(
+                task.id,
+                ResourceClass.CPU_LIGHT,
+                lambda ctx: self.run_task(ctx, task),
+                cancel_reason=cancel_reason,
+            )
+        return task
+
+    def _outputs(self, task: TaskItem) -> list[TaskOutput]:
+        outputs: list[TaskOutput] = []
+        for i, config in enumerate(parse_roi_configs(task.params["rois"])):
+            # per-roi metadata (compatible with single analysis output)
+            roi_metadata = {
+                **task.params,
+                "roiindex": str(i),
+                "srcpoints": json.dumps(config["srcpoints"]),
+                "dstpoints": json.dumps(config["dstpoints"]),
+                "roadwidth": str(config["roadwidth"]),
+                "roadheight": str(config["roadheight"]),
+            }
+            del roi_metadata["rois"]
+
+            outputs.append(
+                TaskOutput(
+                    name=f"{task.id}_roi{i}.csv",
+                    type="text/csv",
+                    desc=f"{task.params['cctv']} ROI {i} 객체 추적 데이터 분석 결과",
+                    taskid=task.id,
+                    metadata=roi_metadata,
+                )
+            )
+            outputs.append(
+                TaskOutput(
+                    name=f"{task.id}_roi{i}_summary.csv",
+                    type="text/csv",
+                    desc=f"{task.params['cctv']} ROI {i} 객체별 속도 요약",
+                    taskid=task.id,
+                    metadata=roi_metadata,
+                )
+            )
+        return outputs
+
+    def _remove_partial_outputs(self, task: TaskItem):
+        paths = [os.path.join(self._outputs_path, o.name) for o in self._outputs(task)]
+        prof_path = profile_path(self._outputs_path, task)
+        if prof_path is not None:
+            paths.append(prof_path)
+
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def run_task(self, ctx: JobContext, task: TaskItem):
+        """
+        다중 ROI 분석 작업을 실행한다. 작업자(worker.py)도 이 함수로 대기열의 작업을 실행한다.
+        """
+        prof_path = profile_path(self._outputs_path, task)
+        try:
+            durations, stats = run_in_process(
+                ctx,
+                self._executor,
+                run_measured,
+                prof_path,
+                run_batch_analysis,
+                self._outputs_path,
+                task.id,
+                task.params,
+            )
+            for name, seconds in durations.items():
+                ANALYSIS_STAGE_SECONDS.labels("batch_analysis", name).observe(seconds)
+            self._task_repo.get(task.id)  # deleted while running
+
+            for output in self._outputs(task):
+                self._output_repo.save(output)
+            if prof_path is not None and os.path.exists(prof_path):
+                self._output_repo.save(
+                    profile_output(task, f"{task.params['cctv']} 다중 ROI 분석")
+                )
+
+            task.progress = 1.0
+            task.stats = stats
+            self._task_repo.update(task.id, TaskState.FINISHED, "분석이 완료되었습니다.")
+
+        except EntityNotFound:
+            self._remove_partial_outputs(task)
+        except TaskCancelException as e:
+            self._remove_partial_outputs(task)
+            self._task_repo.update(task.id, TaskState.CANCELED, str(e))
+        except Exception as e:
+            self._remove_partial_outputs(task)
+            self._task_repo.update(
+                task.id, TaskState.FAILED, "".join(traceback.format_exception(e))
+            )
+
+    def stop(self, id: str):
+        self._task_repo.get(id)  # raises EntityNotFound
+        self._engine.cancel(id)
+        if self._job_queue is not None:
+            self._job_queue.cancel(id)
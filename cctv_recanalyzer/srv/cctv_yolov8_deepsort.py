@@ -1,24 +1,64 @@
 import os
-import threading
 from dataclasses import dataclass
-from queue import Queue
 from uuid import uuid4
 
 import cv2
 import pandas as pd
+from core.engine import JobContext, ResourceClass, TaskEngine
+from core.metrics import Counter, Histogram, StageTimer
 from core.model import (
-    EntityNotFound,
     TaskCancelException,
     TaskItem,
     TaskOutput,
     TaskParamMeta,
     TaskState,
 )
-from core.repo import TaskItemRepository, TaskOutputRepository
+from core.repo import (
+    TaskItemRepository,
+    TaskOutputRepository,
+    TaskResultCacheRepository,
+)
 from core.srv import TaskService
-from deep_sort_realtime.deep_sort.track import Track
-from deep_sort_realtime.deepsort_tracker import DeepSort
-from ultralytics import YOLO
+from srv.job_queue import JobQueueScheduler
+from srv.task_result_cache import (
+    file_digest,
+    make_cache_key,
+    prefetch_digest,
+    start_from_cache,
+)
+from srv.task_usage import (
+    PROFILE_TYPE,
+    TaskUsage,
+    profile_output,
+    profile_path,
+    profile_requested,
+    start_profiler,
+    stop_profiler,
+)
+from srv.video_frame_source import open_frame_source
+
+# 결과 형식이나 처리 방식이 바뀌면 올려서 이전 캐시를 무효화한다.
+RESULT_VERSION = "1"
+
+# per-frame stage timings are sampled every FRAME_TIMING_EVERY frames
+FRAME_TIMING_EVERY = 10
+DECODE, INFERENCE, TRACKER, ENCODE = range(4)
+TRACKING_FRAME_SECONDS = Histogram(
+    "cctv_tracking_frame_seconds",
+    "Per-frame time of each tracking stage (sampled)",
+    ["stage"],
+)
+TRACKING_FRAMES = Counter("cctv_tracking_frames_total", "Frames processed by tracking")
+
+
+def load_tracking_modules():
+    """
+    객체 추적에 필요한 ultralytics(torch), deep_sort_realtime 모듈을 불러온다.
+    불러오는 데 수 초가 걸리므로 모듈을 import할 때가 아니라 처음 객체 추적을 실행할 때 불러오며,
+    미리 불러 두려면(warm-up) 이 함수를 호출한다.
+    """
+    import deep_sort_realtime.deepsort_tracker  # noqa: F401
+    import ultralytics  # noqa: F401
 
 
 @dataclass
@@ -38,58 +78,63 @@ class YOLOv8DeepSORTTackingTaskSrv(TaskService):
         model_path: str,
         outputs_path: str,
         output_repo: TaskOutputRepository,
+        engine: TaskEngine,
+        decode_backend: str = "opencv",
+        result_cache: TaskResultCacheRepository | None = None,
+        job_queue: JobQueueScheduler | None = None,
     ):
 
         self._confidence_threshold_default = 0.6
-        self._cancel_req: dict[str, bool] = {}
-        self._task_queue = Queue()  # Queue to manage task execution
+        self._engine = engine
+        self._job_queue = job_queue  # run on workers (worker.py) if set
 
         self._task_repo = task_repo
         self._model_path = model_path
         self._outputs_path = outputs_path
         self._output_repo = output_repo
-
-        # Start worker thread
-        self._worker_thread = threading.Thread(target=self._task_worker)
-        self._worker_thread.start()
-
-    def _task_worker(self):
-        while True:
-            task = self._task_queue.get()  # Blocks until a task is available
-            if task:
-                self._run_task(task)
-                self._task_queue.task_done()
-
-    def _run_task(self, task: TaskItem):
-        if self._cancel_req.get(task.id, False):
-            self._task_repo.update(
-                task.id, TaskState.CANCELED, "객체 추적이 취소되었습니다."
-            )
-            return
-
+        self._decode_backend = decode_backend
+        self._result_cache = result_cache
+        if result_cache is not None and os.path.exists(model_path):
+            # the model digest is part of every cache key
+            prefetch_digest(model_path)
+
+    def run_task(self, ctx: JobContext, task: TaskItem):
+        """
+        객체 추적 작업을 실행한다. 작업자(worker.py)도 이 함수로 대기열의 작업을 실행한다.
+        """
         confidence = float(task.params["confidence"])
         targetname = task.params["targetname"]
         fps = int(task.params["fps"])
-        cap = None
+        source = None
         cap_out = None
+        usage = TaskUsage()
+        prof_path = profile_path(self._outputs_path, task)
+        profiler = None
+        # per task, tracking tasks may run concurrently
+        video_out_tmp = os.path.join(self._outputs_path, f"{task.id}.tmp.mp4")
 
         try:
+            # heavy modules are imported on first use (see load_tracking_modules)
+            from deep_sort_realtime.deep_sort.track import Track
+            from deep_sort_realtime.deepsort_tracker import DeepSort
+            from ultralytics import YOLO
+
             model = YOLO(model=self._model_path)
             tracker = DeepSort(
                 max_iou_distance=0.3, max_age=20, n_init=2, max_cosine_distance=0.2
             )
 
-            cap = cv2.VideoCapture(os.path.join(self._outputs_path, targetname))
-            if not cap.isOpened():
-                raise Exception("Error opening video file")
+            source = open_frame_source(
+                os.path.join(self._outputs_path, targetname),
+                backend=self._decode_backend,
+            )
 
-            frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            frame_total_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            frame_width = source.width
+            frame_height = source.height
+            frame_total_count = max(1, source.frame_count)
             frame_num = 0
             fourcc = cv2.VideoWriter.fourcc(*"mp4v")
 
-            video_out_tmp = "/tmp/cctv-yolov8-deepsort.mp4"
             cap_out = cv2.VideoWriter(
                 video_out_tmp, fourcc, fps, (frame_width, frame_height)
             )
@@ -97,22 +142,27 @@ class YOLOv8DeepSORTTackingTaskSrv(TaskService):
             results_path = os.path.join(self._outputs_path, f"{task.id}.csv")
             results: list[Detection] = []
 
-            self._task_repo.update(
-                task.id, TaskState.STARTED, "준비가 완료되어 객체 추적을 시작합니다."
-            )
+            ctx.set_progress(0.0, "준비가 완료되어 객체 추적을 시작합니다.")
 
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                if self._cancel_req.get(task.id, False):
-                    raise TaskCancelException("객체 추적이 요청에 의해 중단되었습니다.")
+            timer = StageTimer(
+                TRACKING_FRAME_SECONDS,
+                ["decode", "inference", "tracker", "encode"],
+                every=FRAME_TIMING_EVERY,
+            )
+            frames = TRACKING_FRAMES.labels()
+            profiler = start_profiler(prof_path)
+            timer.start()
+            for frame in source:
+                timer.lap(DECODE)
+                ctx.raise_if_canceled()
 
                 # https://docs.ultralytics.com/modes/predict/
                 detection = model.predict(
                     source=[frame], conf=confidence, verbose=False
                 )[0]
+                timer.lap(INFERENCE)
                 if detection.boxes is None:
+                    timer.start()
                     continue
 
                 # for update deepsort tracker
@@ -132,6 +182,7 @@ class YOLOv8DeepSORTTackingTaskSrv(TaskService):
                     )
 
                 tracks: list[Track] = tracker.update_tracks(raw_detections, frame=frame)
+                timer.lap(TRACKER)
                 for track in tracks:
                     if not track.is_confirmed():
                         continue
@@ -166,7 +217,11 @@ class YOLOv8DeepSORTTackingTaskSrv(TaskService):
 
                 frame_num += 1
                 cap_out.write(frame)
-                task.progress = frame_num / frame_total_count
+                timer.lap(ENCODE)
+                frames.inc()
+                ctx.set_progress(frame_num / frame_total_count)
+                timer.start()
+            stop_profiler(profiler, prof_path)
 
             # save results
             df = pd.DataFrame([vars(result) for result in results])
@@ -181,26 +236,36 @@ class YOLOv8DeepSORTTackingTaskSrv(TaskService):
                 raise Exception("There was an error converting the video file.")
 
             # save outputs
-            self._output_repo.save(
+            outputs = [
                 TaskOutput(
                     name=f"{task.id}.csv",
                     type="text/csv",
                     desc=f"{task.params['cctv']} 객체 추적 결과",
                     taskid=task.id,
                     metadata=task.params,
-                )
-            )
-            self._output_repo.save(
+                ),
                 TaskOutput(
                     name=f"{task.id}.mp4",
                     type="video/mp4",
                     desc=f"{task.params['cctv']} 객체 추적 영상",
                     taskid=task.id,
                     metadata=task.params,
+                ),
+            ]
+            for output in outputs:
+                self._output_repo.save(output)
+
+            if self._result_cache is not None:
+                self._result_cache.put(
+                    self._cache_key(targetname, task.params["confidence"]), outputs
+                )
+            if prof_path is not None and os.path.exists(prof_path):
+                self._output_repo.save(
+                    profile_output(task, f"{task.params['cctv']} 객체 추적")
                 )
-            )
 
             task.progress = 1.0
+            task.stats = usage.stats(frames=frame_num)
             # update task state
             self._task_repo.update(
                 task.id, TaskState.FINISHED, "객체 추적이 완료되었습니다."
@@ -212,10 +277,33 @@ class YOLOv8DeepSORTTackingTaskSrv(TaskService):
             self._task_repo.update(task.id, TaskState.FAILED, str(e))
 
         finally:
-            if cap is not None and cap.isOpened():
-                cap.release()
+            if profiler is not None:
+                profiler.disable()
+            if source is not None:
+                source.release()
             if cap_out is not None and cap_out.isOpened():
                 cap_out.release()
+            if os.path.exists(video_out_tmp):
+                os.remove(video_out_tmp)
+
+    def _on_remote_finished(self, task: TaskItem, outputs: list[TaskOutput]):
+        if self._result_cache is not None:
+            self._result_cache.put(
+                self._cache_key(task.params["targetname"], task.params["confidence"]),
+                [output for output in outputs if output.type != PROFILE_TYPE],
+            )
+
+    def _cache_key(self, targetname: str, confidence: str) -> str:
+        model_version = self._model_path
+        if os.path.exists(self._model_path):
+            model_version = file_digest(self._model_path)
+
+        return make_cache_key(
+            kind="tracking",
+            version=f"{RESULT_VERSION}:{model_version}",
+            files=[os.path.join(self._outputs_path, targetname)],
+            params={"confidence": confidence},
+        )
 
     def get_name(self) -> str:
         return "CCTV 객체 추적 (YOLOv8 + DeepSORT)"
@@ -228,12 +316,21 @@ class YOLOv8DeepSORTTackingTaskSrv(TaskService):
             TaskParamMeta(
                 name="confidence", desc="신뢰도 임계값", accept=["float"], optional=True
             ),
+            TaskParamMeta(
+                name="profile",
+                desc="실행 프로파일(cProfile) 저장 여부",
+                accept=["bool"],
+                optional=True,
+            ),
         ]
 
     def get_tasks(self) -> list[TaskItem]:
         return self._task_repo.get_by_name(self.get_name())
 
     def del_task(self, id: str):
+        self._engine.cancel(id)
+        if self._job_queue is not None:
+            self._job_queue.cancel(id)
         self._task_repo.delete(id)
         self._output_repo.delete(id)
 
@@ -256,6 +353,8 @@ class YOLOv8DeepSORTTackingTaskSrv(TaskService):
             "startat": target_metadata.get("startat", "N/A"),
             "endat": target_metadata.get("endat", "N/A"),
         }
+        if profile_requested(params):
+            metadata["profile"] = "true"
 
         task = TaskItem(
             id=str(uuid4()),
@@ -265,17 +364,36 @@ class YOLOv8DeepSORTTackingTaskSrv(TaskService):
             reason="작업이 제출되었습니다.",
             progress=0.0,
         )
+        if self._result_cache is not None and start_from_cache(
+            self._result_cache,
+            self._cache_key(targetname, metadata["confidence"]),
+            task,
+            self._task_repo,
+            self._output_repo,
+        ):
+            return task
+
         self._task_repo.add(task)
-        self._cancel_req[task.id] = False
-        self._task_queue.put(task)
+        cancel_reason = "객체 추적이 요청에 의해 중단되었습니다."
+        if self._job_queue is not None:
+            self._job_queue.submit(
+                "tracking",
+                task,
+                cancel_reason=cancel_reason,
+                on_finished=self._on_remote_finished,
+            )
+        else:
+            self._engine.submit(
+                task.id,
+                ResourceClass.CPU_HEAVY,
+                lambda ctx: self.run_task(ctx, task),
+                cancel_reason=cancel_reason,
+            )
 
         return task
 
     def stop(self, id: str):
-        req = self._cancel_req.get(id)
-        if req is None:
-            raise EntityNotFound(f"녹화 작업이 존재하지 않습니다.")
-        self._cancel_req[id] = True
-        self._task_repo.update(
-            id, TaskState.PENDING, "객체 추적 중지 요청이 접수되었습니다."
-        )
+        self._task_repo.get(id)  # raises EntityNotFound
+        self._engine.cancel(id)
+        if self._job_queue is not None:
+            self._job_queue.cancel(id)
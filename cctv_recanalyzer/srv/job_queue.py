@@ -0,0 +1,339 @@
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Callable
+
+from core.engine import FINISHED_STATES, JobContext, ResourceClass, TaskEngine
+from core.model import EntityNotFound, QueuedJob, TaskItem, TaskOutput, TaskState
+from core.repo import JobQueueRepository, TaskItemRepository, TaskOutputRepository
+
+
+class JobQueueScheduler:
+    """
+    API 노드에서 작업을 작업 대기열에 넣고, 작업자(worker.py)가 대기열에 보고한 진행률, 상태, 결과를
+    poll_seconds마다 읽어 작업 저장소와 결과 저장소에 반영한다. API 노드는 작업을 직접 실행하지 않는다.
+    종료된 작업은 반영한 뒤 대기열에서 지운다. on_finished 콜백은 이 프로세스에서 제출한 작업에만 호출된다.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueueRepository,
+        task_repo: TaskItemRepository,
+        output_repo: TaskOutputRepository,
+        poll_seconds: float = 1.0,
+    ):
+        self._lock = threading.RLock()
+        self._queue = queue
+        self._task_repo = task_repo
+        self._output_repo = output_repo
+        self._poll_seconds = poll_seconds
+        self._version = 0
+        self._on_finished: dict[
+            str, Callable[[TaskItem, list[TaskOutput]], None]
+        ] = {}
+
+        self._poller = threading.Thread(target=self._poll, daemon=True)
+        self._poller.start()
+
+    def submit(
+        self,
+        kind: str,
+        task: TaskItem,
+        priority: int = 0,
+        cancel_reason: str = "작업이 요청에 의해 취소되었습니다.",
+        on_finished: Callable[[TaskItem, list[TaskOutput]], None] | None = None,
+    ):
+        """
+        task를 kind 종류의 작업으로 대기열에 넣는다. 작업이 완료되면 on_finished(task, outputs)를 호출한다.
+        """
+        if on_finished is not None:
+            with self._lock:
+                self._on_finished[task.id] = on_finished
+
+        self._queue.enqueue(
+            QueuedJob(
+                id=task.id,
+                kind=kind,
+                name=task.name,
+                params=task.params,
+                priority=priority,
+                cancelreason=cancel_reason,
+                reason=task.reason,
+            )
+        )
+
+    def cancel(self, id: str) -> bool:
+        """
+        대기 중인 작업은 바로 취소하고, 실행 중인 작업은 작업자에게 취소를 요청한다.
+        대기열에 없는 작업이면 False를 반환한다.
+        """
+        if not self._queue.cancel(id):
+            return False
+
+        self.sync()
+        return True
+
+    def sync(self):
+        """
+        임대 기간이 지난 작업을 다시 대기열에 넣고, 마지막으로 확인한 뒤 변경된 작업을 저장소에 반영한다.
+        """
+        with self._lock:
+            self._queue.requeue_expired()
+            for job in self._queue.get_updated(self._version):
+                self._version = job.version
+                self._apply(job)
+
+    def _apply(self, job: QueuedJob):
+        try:
+            task = self._task_repo.get(job.id)
+        except EntityNotFound:
+            # the task was deleted: stop the worker, then drop the job
+            if job.state in FINISHED_STATES:
+                self._queue.delete(job.id)
+            else:
+                self._queue.cancel(job.id)
+            return
+
+        # outputs are registered once, before the task is marked finished
+        if job.state == TaskState.FINISHED and task.state != TaskState.FINISHED:
+            for output in job.outputs:
+                self._output_repo.save(output)
+
+        task.progress = job.progress
+        task.stats = job.stats
+        if (task.state, task.reason) != (job.state, job.reason):
+            self._task_repo.update(job.id, job.state, job.reason)
+
+        if job.state in FINISHED_STATES:
+            on_finished = self._on_finished.pop(job.id, None)
+            if on_finished is not None and job.state == TaskState.FINISHED:
+                on_finished(task, job.outputs)
+            self._queue.delete(job.id)
+
+    def _poll(self):
+        while True:
+            try:
+                self.sync()
+            except Exception:
+                traceback.print_exc()
+            time.sleep(self._poll_seconds)
+
+
+class QueuedTaskItemRepo(TaskItemRepository):
+    """
+    작업자가 임대한 작업을 보관하고, 상태 변경을 작업 대기열에 보고하는 작업 저장소.
+    작업자에서 실행되는 작업 서비스는 이 저장소를 통해 API 노드의 작업 저장소에 상태를 전달한다.
+    종료 상태로 갱신되거나 임대를 잃은 작업은 저장소에서 제거한다.
+    """
+
+    def __init__(self, queue: JobQueueRepository, worker: str, lease_seconds: float):
+        self._lock = threading.Lock()
+        self._queue = queue
+        self._worker = worker
+        self._lease_seconds = lease_seconds
+        self._tasks: dict[str, TaskItem] = {}
+
+    def add(self, task: TaskItem):
+        with self._lock:
+            self._tasks[task.id] = task
+            return task
+
+    def get(self, id: str) -> TaskItem:
+        with self._lock:
+            if id not in self._tasks:
+                raise EntityNotFound("작업을 찾을 수 없습니다.")
+            return self._tasks[id]
+
+    def get_by_name(self, name: str) -> list[TaskItem]:
+        with self._lock:
+            return [task for task in self._tasks.values() if task.name == name]
+
+    def get_running(self) -> list[TaskItem]:
+        with self._lock:
+            return list(self._tasks.values())
+
+    def update(self, id: str, state: TaskState, reason: str) -> TaskItem:
+        task = self.get(id)
+        task.state = state
+        task.reason = reason
+        self.report(task)
+        if state in FINISHED_STATES:
+            self.delete(id)
+        return task
+
+    def report(self, task: TaskItem) -> QueuedJob | None:
+        """
+        작업의 상태와 진행률을 대기열에 보고하고 임대 기간을 연장한다. 임대를 잃었으면 작업을 제거하고 None을 반환한다.
+        """
+        job = self._queue.update(
+            task.id,
+            self._worker,
+            task.state,
+            task.reason,
+            task.progress,
+            self._lease_seconds,
+            task.stats or None,
+        )
+        if job is None:
+            self.delete(task.id)
+        return job
+
+    def delete(self, id: str):
+        with self._lock:
+            self._tasks.pop(id, None)
+
+
+class QueuedTaskOutputRepo(TaskOutputRepository):
+    """
+    작업자에서 저장한 결과를 작업 대기열에 보고하는 결과 저장소.
+    보고된 결과는 작업이 완료되면 API 노드가 결과 저장소에 등록한다. (결과 파일은 공유 볼륨에 직접 저장한다.)
+    작업자에서는 임대 중인 작업의 결과만 조회할 수 있다.
+    """
+
+    def __init__(self, queue: JobQueueRepository, worker: str):
+        self._queue = queue
+        self._worker = worker
+        self._save_listeners: list[Callable[[TaskOutput], None]] = []
+
+    def save(self, output: TaskOutput):
+        if not self._queue.add_output(output.taskid, self._worker, output):
+            raise EntityNotFound("작업의 임대가 만료되었거나 작업이 삭제되었습니다.")
+
+        for listener in self._save_listeners:
+            listener(output)
+
+    def get_by_taskid(self, taskid: str) -> list[TaskOutput]:
+        try:
+            return self._queue.get(taskid).outputs
+        except EntityNotFound:
+            return []
+
+    def get_by_name(self, name: str) -> TaskOutput:
+        raise ValueError(f"결과가 존재하지 않습니다: {name}")
+
+    def get_all(self) -> list[TaskOutput]:
+        return []
+
+    def delete(self, taskid: str):
+        pass
+
+    def add_save_listener(self, listener: Callable[[TaskOutput], None]):
+        self._save_listeners.append(listener)
+
+    def set_pinned(self, name: str, pinned: bool) -> TaskOutput:
+        raise ValueError(f"결과가 존재하지 않습니다: {name}")
+
+    def update(self, output: TaskOutput):
+        raise ValueError(f"결과가 존재하지 않습니다: {output.name}")
+
+
+@dataclass
+class JobRunner:
+    """
+    작업자가 kind 종류의 작업을 실행하는 방법. run(ctx, task)는 작업 서비스의 run_task이다.
+    """
+
+    resource: ResourceClass
+    run: Callable[[JobContext, TaskItem], None]
+
+
+class JobWorker:
+    """
+    작업 대기열에서 runners에 등록된 종류의 작업을 임대하여 TaskEngine으로 실행하는 작업자.
+    엔진의 자원 종류별 동시 실행 수에 여유가 있을 때만 임대하며, 실행 중인 작업의 진행률을 heartbeat_seconds마다
+    보고하여 임대 기간을 연장한다. 임대를 잃거나(응답이 늦어 다른 작업자에게 넘어감, 작업 삭제) 취소가 요청되면
+    실행 중인 작업을 취소한다. 작업자가 비정상 종료되면 임대 기간이 지난 뒤 다른 작업자가 작업을 다시 실행한다.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueueRepository,
+        engine: TaskEngine,
+        task_repo: QueuedTaskItemRepo,
+        runners: dict[str, JobRunner],
+        worker: str,
+        lease_seconds: float = 60.0,
+        heartbeat_seconds: float = 10.0,
+        poll_seconds: float = 1.0,
+    ):
+        if heartbeat_seconds >= lease_seconds:
+            raise ValueError("heartbeat 주기는 임대 기간보다 짧아야 합니다.")
+
+        self._queue = queue
+        self._engine = engine
+        self._task_repo = task_repo
+        self._runners = runners
+        self._worker = worker
+        self._lease_seconds = lease_seconds
+        self._heartbeat_seconds = heartbeat_seconds
+        self._poll_seconds = poll_seconds
+
+    def _free_kinds(self) -> list[str]:
+        stats = self._engine.stats()
+        kinds = []
+        for kind, runner in self._runners.items():
+            s = stats[runner.resource.value]
+            if s["running"] + s["queued"] < s["limit"]:
+                kinds.append(kind)
+        return kinds
+
+    def lease(self) -> QueuedJob | None:
+        """
+        실행할 수 있는 작업 하나를 임대하여 엔진에 제출한다. 임대한 작업이 없으면 None을 반환한다.
+        """
+        job = self._queue.lease(self._worker, self._free_kinds(), self._lease_seconds)
+        if job is None:
+            return None
+
+        task = TaskItem(
+            id=job.id,
+            name=job.name,
+            params=job.params,
+            state=TaskState.STARTED,
+            reason=job.reason,
+            progress=job.progress,
+        )
+        self._task_repo.add(task)
+
+        runner = self._runners[job.kind]
+        try:
+            self._engine.submit(
+                job.id,
+                runner.resource,
+                lambda ctx: self._run(ctx, runner, task),
+                priority=job.priority,
+                cancel_reason=job.cancelreason,
+            )
+        except ValueError:
+            # the previous (lost) run is still stopping: let this lease expire
+            self._task_repo.delete(job.id)
+        return job
+
+    def _run(self, ctx: JobContext, runner: JobRunner, task: TaskItem):
+        runner.run(ctx, task)
+        if task.state not in FINISHED_STATES:
+            raise RuntimeError("작업이 완료 상태를 보고하지 않고 종료되었습니다.")
+
+    def heartbeat(self):
+        """
+        실행 중인 작업의 진행률을 보고한다. 임대를 잃었거나 취소가 요청된 작업은 취소한다.
+        """
+        for task in self._task_repo.get_running():
+            job = self._task_repo.report(task)
+            if job is None or job.canceled:
+                self._engine.cancel(task.id)
+
+    def run(self, stop: threading.Event):
+        """
+        stop이 설정될 때까지 작업을 임대하여 실행한다.
+        실행 중이던 작업은 반납하지 않으므로, 임대 기간이 지나면 다른 작업자가 다시 실행한다.
+        """
+        next_heartbeat = time.monotonic()
+        while not stop.is_set():
+            if time.monotonic() >= next_heartbeat:
+                self.heartbeat()
+                next_heartbeat = time.monotonic() + self._heartbeat_seconds
+
+            if self.lease() is None:
+                stop.wait(self._poll_seconds)
@@ -0,0 +1,256 @@
+import gzip
+import os
+import zlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterator, Mapping
+
+from srv.output_tier import GZIP_SUFFIX
+from starlette.responses import FileResponse, Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+# 압축하여 전송할 결과 형식
+COMPRESSIBLE_TYPES = ("text/", "application/json")
+CHUNK_SIZE = 256 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Range 헤더에서 단일 바이트 범위 (start, end) (end 포함)를 해석합니다.
+    해석할 수 없거나 범위가 여러 개이면 None을 반환하여 전체를 전송하게 하고,
+    파일 범위를 벗어나면 RangeNotSatisfiable을 발생시킵니다.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":
+            # suffix range: last n bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def file_etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # weak comparison (If-None-Match)
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def _not_modified(
+    request_headers: Mapping[str, str], etags: list[str], mtime: float
+) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return any(_etag_matches(if_none_match, etag) for etag in etags)
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _if_range_matches(if_range: str, etag: str, last_modified: str) -> bool:
+    # strong comparison; weak etags never match
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag
+    return if_range == last_modified
+
+
+def iter_file(path: str, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def iter_gzip_file(path: str) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+    yield compressor.flush()
+
+
+def iter_gunzip_file(path: str) -> Iterator[bytes]:
+    with gzip.open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            yield chunk
+
+
+class HeadResponse(Response):
+    """
+    본문 없이 헤더(Content-Length 포함)만 전송하는 응답 (HEAD 요청)
+    """
+
+    def __init__(
+        self, status_code: int, headers: Mapping[str, str], media_type: str
+    ):
+        super().__init__(
+            status_code=status_code, headers=headers, media_type=media_type
+        )
+        if "content-length" not in {key.lower() for key in headers}:
+            # unknown length (compressed on the fly)
+            del self.headers["content-length"]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        await send({"type": "http.response.body", "body": b""})
+
+
+def gzip_stored_response(
+    path: str, media_type: str, method: str, request_headers: Mapping[str, str]
+) -> Response:
+    """
+    gzip으로 압축 보관된 결과 파일(path)을 전송합니다. Accept-Encoding에 gzip이 있으면 압축된 파일을 그대로,
+    없으면 압축을 풀어서 전송합니다. Range 요청은 지원하지 않습니다.
+    """
+    stat = os.stat(path)
+    etag = file_etag(stat)
+    identity_etag = f'{etag[:-1]}-identity"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request_headers, [etag, identity_etag], stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    if "gzip" in request_headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        if method == "HEAD":
+            headers["Content-Length"] = str(stat.st_size)
+            return HeadResponse(200, headers, media_type)
+        return FileResponse(
+            path, headers=headers, media_type=media_type, stat_result=stat
+        )
+
+    headers["ETag"] = identity_etag
+    if method == "HEAD":
+        return HeadResponse(200, headers, media_type)
+    return StreamingResponse(
+        iter_gunzip_file(path), headers=headers, media_type=media_type
+    )
+
+
+def output_file_response(
+    path: str,
+    media_type: str,
+    method: str,
+    request_headers: Mapping[str, str],
+    accel_redirect: str | None = None,
+) -> Response:
+    """
+    결과 파일을 조건부 요청(If-None-Match/If-Modified-Since), Range/If-Range, gzip(텍스트 결과)을 지원하여 전송합니다.
+    accel_redirect가 주어지면 파일 전송을 X-Accel-Redirect로 nginx에 넘겨 sendfile로 처리하게 합니다.
+    """
+    if not os.path.exists(path) and os.path.exists(path + GZIP_SUFFIX):
+        # compressed storage tier (srv/output_tier.py)
+        return gzip_stored_response(
+            path + GZIP_SUFFIX, media_type, method, request_headers
+        )
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise ValueError(f"결과 파일이 존재하지 않습니다: {os.path.basename(path)}")
+
+    etag = file_etag(stat)
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "no-cache",
+    }
+    compressible = media_type.startswith(COMPRESSIBLE_TYPES)
+    if compressible:
+        headers["Vary"] = "Accept-Encoding"
+
+    # the compressed representation has its own validator
+    gzip_etag = f'{etag[:-1]}-gzip"'
+    if _not_modified(request_headers, [etag, gzip_etag], stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    if accel_redirect is not None:
+        # nginx handles range, conditional requests and sendfile
+        headers["X-Accel-Redirect"] = accel_redirect
+        return Response(headers=headers, media_type=media_type)
+
+    byte_range = None
+    range_header = request_headers.get("range")
+    if range_header is not None:
+        if_range = request_headers.get("if-range")
+        if if_range is None or _if_range_matches(if_range, etag, last_modified):
+            try:
+                byte_range = parse_range(range_header, stat.st_size)
+            except RangeNotSatisfiable:
+                return Response(
+                    status_code=416,
+                    headers={**headers, "Content-Range": f"bytes */{stat.st_size}"},
+                )
+
+    if byte_range is not None:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        headers["Content-Length"] = str(end - start + 1)
+        if method == "HEAD":
+            return HeadResponse(206, headers, media_type)
+        return StreamingResponse(
+            iter_file(path, start, end - start + 1),
+            status_code=206,
+            headers=headers,
+            media_type=media_type,
+        )
+
+    if compressible and "gzip" in request_headers.get("accept-encoding", ""):
+        headers["ETag"] = gzip_etag
+        headers["Content-Encoding"] = "gzip"
+        del headers["Accept-Ranges"]
+        if method == "HEAD":
+            return HeadResponse(200, headers, media_type)
+        return StreamingResponse(
+            iter_gzip_file(path), headers=headers, media_type=media_type
+        )
+
+    # full file: pathsend (zero-copy) when the server supports it
+    return FileResponse(path, headers=headers, media_type=media_type, stat_result=stat)
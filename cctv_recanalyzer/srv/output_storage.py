@@ -0,0 +1,257 @@
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Callable
+
+from core.engine import FINISHED_STATES
+from core.metrics import Counter
+from core.model import TaskItem, TaskOutput
+from core.repo import TaskOutputRepository
+
+STORAGE_EVICTIONS = Counter(
+    "cctv_storage_evictions_total",
+    "Tasks whose outputs were deleted by the storage manager",
+    ["reason"],
+)
+
+EVICTION_POLICIES = ("lru", "age")
+
+
+class OutputStorageManager:
+    """
+    결과 파일(outputs_path)의 저장 용량을 관리한다.
+    사용량은 결과 저장소에 기록된 파일 크기(TaskOutput.size)로 계산하므로 디렉터리를 탐색하지 않는다.
+    사용량이 quota_bytes를 넘거나 디스크 여유 공간이 min_free_bytes보다 작아지면 결과를 작업 단위로 삭제하며,
+    policy가 lru이면 가장 오래 사용되지 않은(touch) 작업부터, age이면 가장 오래된 작업부터 삭제한다.
+    max_age_seconds가 지난 작업의 결과는 용량과 관계없이 삭제한다. (0: 제한 없음)
+    고정(pinned)된 결과가 있는 작업, 진행 중인 작업과 그 입력 파일은 삭제하지 않는다.
+    녹화처럼 결과 크기를 미리 알 수 있는 작업은 reserve로 공간을 예약하고, 확보할 수 없으면 시작 전에 거부한다.
+    """
+
+    def __init__(
+        self,
+        outputs_path: str,
+        output_repo: TaskOutputRepository,
+        get_tasks: Callable[[], list[TaskItem]],
+        quota_bytes: int = 0,
+        min_free_bytes: int = 0,
+        max_age_seconds: float = 0,
+        policy: str = "lru",
+    ):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"지원하지 않는 삭제 정책입니다: {policy}")
+
+        self._lock = threading.Lock()
+        self._outputs_path = outputs_path
+        self._output_repo = output_repo
+        self._get_tasks = get_tasks
+        self._quota_bytes = quota_bytes
+        self._min_free_bytes = min_free_bytes
+        self._max_age_seconds = max_age_seconds
+        self._policy = policy
+
+        # output name -> last access (unix timestamp), not persisted
+        self._lastused: dict[str, float] = {}
+        # taskid -> (reserved bytes, path of the file being written)
+        self._reserved: dict[str, tuple[int, str | None]] = {}
+
+    def on_output_saved(self, output: TaskOutput):
+        self.touch(output.name)
+        self.enforce()
+
+    def touch(self, name: str):
+        """
+        결과 파일이 사용(조회, 전송)되었음을 기록한다. (lru 정책)
+        """
+        with self._lock:
+            self._lastused[name] = time.time()
+
+    def _free_bytes(self) -> int:
+        return shutil.disk_usage(self._outputs_path).free
+
+    def _reservations(self, outputs: list[TaskOutput]) -> tuple[int, int]:
+        # (reserved bytes not written yet, written bytes not saved as an output yet)
+        names = {output.name for output in outputs}
+        pending = unsaved = 0
+        for nbytes, path in self._reserved.values():
+            written = 0
+            if path is not None and os.path.exists(path):
+                written = os.path.getsize(path)
+                if os.path.basename(path) not in names:
+                    unsaved += written
+            pending += max(nbytes - written, 0)
+        return pending, unsaved
+
+    def _shortage(self, outputs: list[TaskOutput], needed: int) -> tuple[int, int]:
+        # bytes to delete so that `needed` more bytes fit in the disk and the quota
+        # (written bytes are already missing from the free space of the disk)
+        pending, unsaved = self._reservations(outputs)
+        disk = self._min_free_bytes - (self._free_bytes() - pending - needed)
+        quota = 0
+        if self._quota_bytes > 0:
+            used = sum(output.size for output in outputs) + unsaved
+            quota = used + pending + needed - self._quota_bytes
+        return disk, quota
+
+    def _freeable(self, output: TaskOutput) -> int:
+        # bytes released on the disk by deleting the output; nothing if the file is
+        # also hard-linked elsewhere (the result cache)
+        try:
+            if os.stat(os.path.join(self._outputs_path, output.name)).st_nlink > 1:
+                return 0
+        except FileNotFoundError:
+            pass
+        return output.size
+
+    def in_use(self) -> set[str]:
+        """
+        진행 중인 작업의 id와 그 작업이 참조하는 결과 이름(입력 파일) 목록.
+        """
+        names: set[str] = set()
+        for task in self._get_tasks():
+            if task.state not in FINISHED_STATES:
+                names.add(task.id)
+                for value in task.params.values():
+                    names.update(value.split(","))
+        return names
+
+    def last_used(self, output: TaskOutput) -> float:
+        """
+        결과가 마지막으로 사용된 시각(unix timestamp). 사용 기록이 없으면 생성 시각이다.
+        """
+        return max(output.createdat.timestamp(), self._lastused.get(output.name, 0.0))
+
+    def _candidates(
+        self, outputs: list[TaskOutput]
+    ) -> list[tuple[float, str, int, int]]:
+        # (last used or created, taskid, bytes, freeable bytes) of deletable tasks,
+        # oldest first
+        protected = self.in_use()
+        groups: dict[str, tuple[float, int, int]] = {}
+        pinned: set[str] = set()
+        for output in outputs:
+            if output.pinned or output.name in protected:
+                pinned.add(output.taskid)
+            used = output.createdat.timestamp()
+            if self._policy == "lru":
+                used = self.last_used(output)
+            last, size, freeable = groups.get(output.taskid, (0.0, 0, 0))
+            groups[output.taskid] = (
+                max(last, used),
+                size + output.size,
+                freeable + self._freeable(output),
+            )
+
+        return sorted(
+            (last, taskid, size, freeable)
+            for taskid, (last, size, freeable) in groups.items()
+            if taskid not in pinned and taskid not in protected
+        )
+
+    def _evict(self, taskid: str, reason: str):
+        self._output_repo.delete(taskid)
+        STORAGE_EVICTIONS.labels(reason).inc()
+
+    def _enforce(self, needed: int) -> int:
+        outputs = self._output_repo.get_all()
+        candidates = self._candidates(outputs)
+
+        if self._max_age_seconds > 0:
+            # ages are compared by creation time whatever the policy
+            created: dict[str, float] = {}
+            for output in outputs:
+                created[output.taskid] = max(
+                    created.get(output.taskid, 0.0), output.createdat.timestamp()
+                )
+            deadline = time.time() - self._max_age_seconds
+            expired = {c[1] for c in candidates if created[c[1]] < deadline}
+            for taskid in expired:
+                self._evict(taskid, "age")
+            candidates = [c for c in candidates if c[1] not in expired]
+            outputs = [output for output in outputs if output.taskid not in expired]
+
+        disk, quota = self._shortage(outputs, needed)
+        for _, taskid, _, freeable in candidates:
+            if disk <= 0 and quota <= 0:
+                break
+            if quota <= 0 and freeable == 0:
+                # deleting it frees nothing on the disk
+                continue
+            self._evict(taskid, "quota")
+            # the free space is measured again instead of assuming the size was freed
+            outputs = [output for output in outputs if output.taskid != taskid]
+            disk, quota = self._shortage(outputs, needed)
+        return max(disk, quota)
+
+    def enforce(self):
+        """
+        보관 기간이 지난 결과와 용량 한도를 넘는 결과를 삭제한다.
+        """
+        with self._lock:
+            self._enforce(0)
+
+    def reserve(self, taskid: str, nbytes: int, path: str | None = None):
+        """
+        taskid 작업이 만들 결과를 위해 nbytes를 예약한다. 필요하면 오래된 결과를 삭제하며,
+        그래도 공간이 부족하면 ValueError를 발생시킨다. 작업이 끝나면 release를 호출해야 한다.
+        path는 작업이 기록하는 파일로, 이미 기록된 크기만큼은 예약에서 제외하고 계산한다.
+        """
+        with self._lock:
+            shortage = self._enforce(nbytes)
+            if shortage > 0:
+                raise ValueError(
+                    f"저장 공간이 부족합니다. (필요: {nbytes} bytes, 부족: {shortage} bytes)"
+                )
+            self._reserved[taskid] = (nbytes, path)
+
+    def release(self, taskid: str):
+        with self._lock:
+            self._reserved.pop(taskid, None)
+
+    def usage(self) -> dict:
+        """
+        전체 사용량과 CCTV별, 작업 종류별 사용량(bytes)을 반환한다.
+        """
+        tasks = {task.id: task.name for task in self._get_tasks()}
+        outputs = self._output_repo.get_all()
+        by_cctv: dict[str, int] = {}
+        by_task: dict[str, int] = {}
+        for output in outputs:
+            cctv = output.metadata.get("cctv", "N/A")
+            by_cctv[cctv] = by_cctv.get(cctv, 0) + output.size
+            name = tasks.get(output.taskid, "N/A")
+            by_task[name] = by_task.get(name, 0) + output.size
+
+        with self._lock:
+            reserved = sum(nbytes for nbytes, _ in self._reserved.values())
+        return {
+            "used_bytes": sum(output.size for output in outputs),
+            "pinned_bytes": sum(output.size for output in outputs if output.pinned),
+            "reserved_bytes": reserved,
+            "quota_bytes": self._quota_bytes,
+            "free_bytes": self._free_bytes(),
+            "by_cctv": by_cctv,
+            "by_task": by_task,
+        }
+
+    def recording_bitrate(self, cctv: str, taskids: set[str], default: float) -> float:
+        """
+        taskids 녹화 작업이 저장한 cctv 영상의 크기와 녹화 시간으로 계산한 최대 비트레이트(bits/s).
+        녹화 기록이 없으면 default를 반환한다.
+        """
+        bitrates = []
+        for output in self._output_repo.get_all():
+            if output.taskid not in taskids or output.metadata.get("cctv") != cctv:
+                continue
+            try:
+                seconds = (
+                    datetime.fromisoformat(output.metadata["endat"])
+                    - datetime.fromisoformat(output.metadata["startat"])
+                ).total_seconds()
+            except (KeyError, ValueError):
+                continue
+            if output.type == "video/mp4" and seconds > 0 and output.size > 0:
+                bitrates.append(output.size * 8 / seconds)
+        return max(bitrates, default=default)
@@ -0,0 +1,192 @@
+import gzip
+import os
+import shutil
+import subprocess
+import threading
+import time
+from dataclasses import replace
+from typing import BinaryIO
+
+from core.metrics import Counter
+from core.model import TaskOutput
+from core.repo import TaskOutputRepository
+from srv.output_storage import OutputStorageManager
+
+# TaskOutput.metadata[TIER_KEY]: storage tier of a finished output (absent: original)
+TIER_KEY = "tier"
+TIER_TRANSCODED = "transcoded"  # video re-encoded in place at a lower bitrate
+TIER_GZIP = "gzip"  # stored as <name>.gz
+
+GZIP_SUFFIX = ".gz"
+TEXT_TYPES = ("text/", "application/json")
+
+OUTPUT_TIERING = Counter(
+    "cctv_output_tiering_total",
+    "Outputs moved to a colder storage tier",
+    ["tier", "result"],
+)
+
+
+def output_path(outputs_path: str, name: str) -> str:
+    """
+    name 결과 파일의 경로. gzip으로 압축 보관된 결과이면 <name>.gz 경로를 반환한다.
+    pandas.read_csv는 확장자(.gz)로 압축을 인식하므로 그대로 읽을 수 있다.
+    """
+    path = os.path.join(outputs_path, name)
+    if not os.path.exists(path) and os.path.exists(path + GZIP_SUFFIX):
+        return path + GZIP_SUFFIX
+    return path
+
+
+def decompressed(f: BinaryIO) -> BinaryIO:
+    """
+    열린 파일 f가 압축 보관(.gz)된 파일이면 압축을 풀어 읽는 파일 객체를 반환한다.
+    진행률은 f.tell()(압축된 파일 기준)로 계산할 수 있다.
+    """
+    if f.name.endswith(GZIP_SUFFIX):
+        return gzip.GzipFile(fileobj=f, mode="rb")  # type: ignore
+    return f
+
+
+def compress_file(path: str) -> str:
+    """
+    path를 <path>.gz로 압축하고 원본을 삭제한다. 압축된 파일의 경로를 반환한다.
+    """
+    gz_path = path + GZIP_SUFFIX
+    tmp = f"{gz_path}.tmp"
+    try:
+        with open(path, "rb") as src, gzip.open(tmp, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp, gz_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    os.remove(path)
+    return gz_path
+
+
+def transcode_video(path: str, crf: int) -> bool:
+    """
+    path 영상을 x264(crf)로 다시 인코딩하여 교체한다. 추적 결과, ROI, 호모그래피가
+    원본 영상의 픽셀 좌표를 사용하므로 해상도는 바꾸지 않는다.
+    다시 인코딩한 영상이 더 크면 원본을 유지하고 False를 반환한다.
+    """
+    tmp = f"{path}.tmp.mp4"
+    try:
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-y",
+                "-v",
+                "error",
+                "-i",
+                path,
+                "-c:v",
+                "libx264",
+                "-preset",
+                "veryfast",
+                "-crf",
+                str(crf),
+                "-c:a",
+                "copy",
+                "-movflags",
+                "+faststart",
+                tmp,
+            ],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            check=True,
+        )
+        if os.path.getsize(tmp) >= os.path.getsize(path):
+            return False
+        os.replace(tmp, path)
+        return True
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class OutputTieringJob:
+    """
+    사용되지 않은 지 오래된 결과를 더 작은 형태로 바꾸어 보관하는 백그라운드 작업.
+    video_idle_seconds 동안 사용되지 않은 영상(video/mp4)은 같은 이름으로 다시 인코딩하고(transcoded),
+    text_idle_seconds 동안 사용되지 않은 텍스트 결과(csv 등)는 <name>.gz로 압축한다(gzip). (0: 사용 안 함)
+    결과를 읽는 쪽은 output_path, decompressed로 압축 여부와 관계없이 읽을 수 있으며,
+    진행 중인 작업의 결과와 입력 파일은 바꾸지 않는다.
+    """
+
+    def __init__(
+        self,
+        outputs_path: str,
+        output_repo: TaskOutputRepository,
+        storage: OutputStorageManager,
+        video_idle_seconds: float = 0,
+        text_idle_seconds: float = 0,
+        video_crf: int = 28,
+        interval: float = 3600,
+    ):
+        self._outputs_path = outputs_path
+        self._output_repo = output_repo
+        self._storage = storage
+        self._video_idle_seconds = video_idle_seconds
+        self._text_idle_seconds = text_idle_seconds
+        self._video_crf = video_crf
+        self._interval = interval
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self.run_once()
+
+    def _tier_of(self, output: TaskOutput, now: float) -> str | None:
+        idle = now - self._storage.last_used(output)
+        if output.type == "video/mp4":
+            if 0 < self._video_idle_seconds <= idle:
+                return TIER_TRANSCODED
+        elif output.type.startswith(TEXT_TYPES):
+            if 0 < self._text_idle_seconds <= idle:
+                return TIER_GZIP
+        return None
+
+    def run_once(self) -> list[str]:
+        """
+        옮길 때가 된 결과를 모두 옮기고, 옮긴 결과의 이름 목록을 반환한다.
+        """
+        now = time.time()
+        in_use = self._storage.in_use()
+        moved = []
+        for output in self._output_repo.get_all():
+            if TIER_KEY in output.metadata or {output.name, output.taskid} & in_use:
+                continue
+            tier = self._tier_of(output, now)
+            if tier is None:
+                continue
+
+            path = os.path.join(self._outputs_path, output.name)
+            try:
+                if tier == TIER_TRANSCODED:
+                    transcode_video(path, self._video_crf)
+                else:
+                    path = compress_file(path)
+            except (OSError, subprocess.CalledProcessError):
+                # retried on the next run
+                OUTPUT_TIERING.labels(tier, "failed").inc()
+                continue
+
+            # recorded even if transcoding did not make it smaller, not to retry
+            self._output_repo.update(
+                replace(
+                    output,
+                    size=os.path.getsize(path),
+                    metadata={**output.metadata, TIER_KEY: tier},
+                )
+            )
+            OUTPUT_TIERING.labels(tier, "moved").inc()
+            moved.append(output.name)
+        return moved
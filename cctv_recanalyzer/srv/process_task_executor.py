@@ -0,0 +1,160 @@
+import multiprocessing
+import threading
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from core.engine import JobContext
+from core.model import TaskCancelException
+
+
+class ProcessTaskContext:
+    """
+    작업 프로세스에서 진행률(0~1)과 상태 메시지를 보고하고, 취소 요청을 확인한다.
+    """
+
+    def __init__(self, taskid: str, progress_queue, cancel_event):
+        self.taskid = taskid
+        self._progress_queue = progress_queue
+        self._cancel_event = cancel_event
+        self._last_progress = -1.0
+
+    def set_progress(self, progress: float, reason: str | None = None):
+        # report at most every 1% unless a message is attached
+        if reason is None and progress - self._last_progress < 0.01:
+            return
+        self._last_progress = progress
+        self._progress_queue.put((self.taskid, progress, reason))
+
+    def is_canceled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def raise_if_canceled(self, message: str):
+        if self._cancel_event.is_set():
+            raise TaskCancelException(message)
+
+
+class ProcessTaskExecutor:
+    """
+    CPU를 많이 사용하는 작업을 최대 max_workers개의 프로세스에서 실행한다.
+    작업 함수는 첫 번째 인자로 ProcessTaskContext를 받으며, 모듈 최상위에 정의되어 있어야 한다(spawn).
+    진행률 보고는 별도 스레드에서 submit에 전달한 on_progress(progress, reason)로 전달된다.
+    프로세스 풀은 처음 작업을 제출할 때 만든다.
+    """
+
+    def __init__(self, max_workers: int):
+        if max_workers < 1:
+            raise ValueError("max_workers는 1 이상이어야 합니다.")
+
+        self._lock = threading.Lock()
+        self._max_workers = max_workers
+        self._mp_context = multiprocessing.get_context("spawn")
+        self._manager = None
+        self._progress_queue = None
+        self._pool: ProcessPoolExecutor | None = None
+        self._drain_thread: threading.Thread | None = None
+
+        # taskid -> (future, cancel event, on_progress)
+        self._tasks: dict[str, tuple[Future, Any, Callable]] = {}
+
+    def _start(self):
+        self._manager = self._mp_context.Manager()
+        self._progress_queue = self._manager.Queue()
+        self._pool = ProcessPoolExecutor(
+            self._max_workers, mp_context=self._mp_context
+        )
+        self._drain_thread = threading.Thread(
+            target=self._drain_progress, daemon=True
+        )
+        self._drain_thread.start()
+
+    def _drain_progress(self):
+        while True:
+            item = self._progress_queue.get()  # type: ignore
+            if item is None:
+                return
+            taskid, progress, reason = item
+            with self._lock:
+                if progress is None:
+                    # every report of the finished task has been delivered
+                    self._tasks.pop(taskid, None)
+                    continue
+                entry = self._tasks.get(taskid)
+            if entry is not None:
+                entry[2](progress, reason)
+
+    def submit(
+        self,
+        taskid: str,
+        fn: Callable[..., Any],
+        *args,
+        on_progress: Callable[[float, str | None], None],
+    ) -> Future:
+        with self._lock:
+            if self._pool is None:
+                self._start()
+
+            cancel_event = self._manager.Event()  # type: ignore
+            context = ProcessTaskContext(taskid, self._progress_queue, cancel_event)
+            try:
+                future = self._pool.submit(fn, context, *args)  # type: ignore
+            except BrokenProcessPool:
+                # a worker died (e.g. killed by OOM); replace the pool
+                self._pool = ProcessPoolExecutor(
+                    self._max_workers, mp_context=self._mp_context
+                )
+                future = self._pool.submit(fn, context, *args)
+            self._tasks[taskid] = (future, cancel_event, on_progress)
+
+        def forget(_: Future):
+            # queued behind the task's own progress reports
+            self._progress_queue.put((taskid, None, None))  # type: ignore
+
+        future.add_done_callback(forget)
+        return future
+
+    def cancel(self, taskid: str) -> bool:
+        """
+        대기 중인 작업은 바로 취소하고, 실행 중인 작업에는 취소를 요청한다. 작업이 없으면 False를 반환한다.
+        """
+        with self._lock:
+            entry = self._tasks.get(taskid)
+        if entry is None:
+            return False
+
+        future, cancel_event, _ = entry
+        if not future.cancel():
+            cancel_event.set()
+        return True
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is None:
+            return
+
+        # the drain thread takes the lock, so wait for the pool outside of it
+        pool.shutdown(wait=True, cancel_futures=True)
+        self._progress_queue.put(None)  # type: ignore
+        self._drain_thread.join()  # type: ignore
+        self._manager.shutdown()  # type: ignore
+
+
+def run_in_process(
+    ctx: JobContext, executor: ProcessTaskExecutor, fn: Callable[..., Any], *args
+) -> Any:
+    """
+    fn을 작업 프로세스에서 실행하고 결과를 기다린다.
+    작업 프로세스의 진행률 보고는 ctx로 전달하고, ctx에 취소가 요청되면 작업 프로세스에 취소를 요청한다.
+    """
+    future = executor.submit(ctx.taskid, fn, *args, on_progress=ctx.set_progress)
+    while not future.done():
+        if ctx.wait(0.2):
+            executor.cancel(ctx.taskid)
+            break
+
+    try:
+        return future.result()
+    except CancelledError:
+        ctx.raise_if_canceled()
+        raise TaskCancelException()
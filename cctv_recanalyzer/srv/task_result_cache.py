@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from core.model import TaskItem, TaskOutput, TaskState
+from core.repo import TaskItemRepository, TaskOutputRepository, TaskResultCacheRepository
+
+_digest_lock = threading.Lock()
+# (device, inode, size, mtime) -> sha256; hard links of a file share the entry
+_digest_memo: dict[tuple[int, int, int, int], str] = {}
+_digest_pending: dict[tuple[int, int, int, int], Future] = {}
+_digest_prefetcher = ThreadPoolExecutor(max_workers=1)
+
+
+def _digest_key(path: str) -> tuple[int, int, int, int]:
+    stat = os.stat(path)
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _compute_digest(path: str, memo_key: tuple[int, int, int, int]) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _digest_lock:
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+def file_digest(path: str) -> str:
+    """
+    파일 내용 전체의 sha256을 반환한다. 같은 파일(하드 링크 포함)의 크기와 수정 시각이 같으면 이전 계산 결과를 재사용하고,
+    prefetch_digest로 계산 중이면 그 결과를 기다린다.
+    """
+    memo_key = _digest_key(path)
+    with _digest_lock:
+        digest = _digest_memo.get(memo_key)
+        pending = _digest_pending.get(memo_key)
+    if digest is not None:
+        return digest
+    if pending is not None:
+        return pending.result()
+    return _compute_digest(path, memo_key)
+
+
+def _prefetch(path: str, memo_key: tuple[int, int, int, int]) -> str:
+    try:
+        return _compute_digest(path, memo_key)
+    finally:
+        with _digest_lock:
+            _digest_pending.pop(memo_key, None)
+
+
+def prefetch_digest(path: str) -> Future | None:
+    """
+    path의 sha256을 백그라운드에서 미리 계산한다. 작업 요청 시 캐시 키를 만들 때 수 GB의 영상을 읽지 않도록 한다.
+    이미 계산되어 있으면 None을 반환한다.
+    """
+    memo_key = _digest_key(path)
+    with _digest_lock:
+        if memo_key in _digest_memo:
+            return None
+        future = _digest_pending.get(memo_key)
+        if future is None:
+            future = _digest_prefetcher.submit(_prefetch, path, memo_key)
+            _digest_pending[memo_key] = future
+        return future
+
+
+def prefetch_output_digest(outputs_path: str, output: TaskOutput):
+    """
+    다른 작업의 입력이 되는 결과(영상, csv)가 저장되면 sha256을 미리 계산한다. (결과 저장 리스너)
+    """
+    if output.type.startswith("video/") or output.type == "text/csv":
+        try:
+            prefetch_digest(os.path.join(outputs_path, output.name))
+        except FileNotFoundError:
+            pass
+
+
+def make_cache_key(
+    kind: str, version: str, files: list[str], params: dict[str, str]
+) -> str:
+    """
+    작업 종류, 코드/모델 버전, 입력 파일 내용, 파라미터로 캐시 키를 만든다.
+    """
+    payload = {
+        "kind": kind,
+        "version": version,
+        "files": [file_digest(path) for path in files],
+        "params": params,
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def start_from_cache(
+    cache: TaskResultCacheRepository,
+    key: str,
+    task: TaskItem,
+    task_repo: TaskItemRepository,
+    output_repo: TaskOutputRepository,
+) -> bool:
+    """
+    캐시에 결과가 있으면 task를 완료 상태로 등록하고 결과 파일을 task의 출력으로 저장한다.
+    """
+    outputs = cache.restore(key, task.id)
+    if outputs is None:
+        return False
+
+    task.state = TaskState.FINISHED
+    task.reason = "동일한 입력의 결과를 재사용하였습니다."
+    task.progress = 1.0
+    task_repo.add(task)
+    for output in outputs:
+        output_repo.save(output)
+    return True
@@ -0,0 +1,167 @@
+import cProfile
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from core.model import TaskItem, TaskOutput
+
+PROFILE_TYPE = "application/x-cprofile"
+
+
+def read_process_usage(pid: int | str = "self") -> dict[str, float]:
+    """
+    프로세스의 누적 CPU 시간(s), 최대 RSS(bytes), read/write 호출로 읽고 쓴 바이트를 /proc에서 읽는다.
+    읽을 수 없는 항목(리눅스가 아니거나 권한이 없는 경우)은 결과에서 빠진다.
+    """
+    proc = f"/proc/{pid}"
+    usage: dict[str, float] = {}
+    try:
+        with open(f"{proc}/stat") as f:
+            # fields after the command name: state, ppid, ..., utime(11), stime(12)
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        usage["cpu_seconds"] = (int(fields[11]) + int(fields[12])) / ticks
+    except (OSError, IndexError, ValueError):
+        pass
+
+    try:
+        with open(f"{proc}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    usage["peak_rss_bytes"] = int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open(f"{proc}/io") as f:
+            io = dict(line.split(": ") for line in f.read().splitlines())
+        usage["read_bytes"] = int(io["rchar"])
+        usage["write_bytes"] = int(io["wchar"])
+    except (OSError, KeyError, ValueError):
+        pass
+
+    return usage
+
+
+class TaskUsage:
+    """
+    작업 하나의 자원 사용량(TaskItem.stats)을 잰다. 작업을 시작할 때 만들고 끝날 때 stats()를 호출한다.
+    CPU 시간과 읽고 쓴 바이트는 프로세스 전체의 증가량이므로, 같은 프로세스에서 동시에 실행된 작업의 사용량이 섞일 수 있다.
+    최대 RSS는 프로세스의 최댓값이며, reset_peak이면 시작할 때 초기화한다. (작업을 하나씩 실행하는 프로세스에서만 사용)
+    외부 프로세스(pid)는 종료되면 /proc에서 읽을 수 없으므로, 실행 중에 sample()을 호출해 둔 마지막 값을 사용한다.
+    """
+
+    def __init__(self, pid: int | str = "self", reset_peak: bool = False):
+        if reset_peak:
+            try:
+                # "5" resets the peak RSS (VmHWM) of the process
+                with open(f"/proc/{pid}/clear_refs", "w") as f:
+                    f.write("5")
+            except OSError:
+                pass
+
+        self._pid = pid
+        self._start = time.monotonic()
+        self._first = read_process_usage(pid)
+        self._last = self._first
+
+    def sample(self):
+        usage = read_process_usage(self._pid)
+        if usage:
+            self._last = usage
+
+    def stats(self, frames: int | None = None) -> dict[str, float]:
+        """
+        시작 이후의 실행 시간(wall_seconds)과 자원 사용량을 반환한다.
+        frames가 주어지면 처리한 프레임 수와 초당 프레임 수(frames_per_second)를 함께 반환한다.
+        """
+        self.sample()
+        wall = time.monotonic() - self._start
+        stats = {"wall_seconds": round(wall, 3)}
+        for key, value in self._last.items():
+            if key == "peak_rss_bytes":
+                stats[key] = value
+            else:
+                stats[key] = round(value - self._first.get(key, 0), 3)
+
+        if frames is not None:
+            stats["frames"] = frames
+            stats["frames_per_second"] = round(frames / wall, 3) if wall > 0 else 0.0
+        return stats
+
+
+def profile_requested(params: dict[str, str]) -> bool:
+    return params.get("profile", "false").lower() == "true"
+
+
+def profile_path(outputs_path: str, task: TaskItem) -> str | None:
+    """
+    프로파일링을 요청한 작업(profile=true)이면 프로파일 결과 파일 경로를, 아니면 None을 반환한다.
+    """
+    if not profile_requested(task.params):
+        return None
+    return os.path.join(outputs_path, f"{task.id}.prof")
+
+
+def profile_output(task: TaskItem, desc: str) -> TaskOutput:
+    return TaskOutput(
+        name=f"{task.id}.prof",
+        type=PROFILE_TYPE,
+        desc=f"{desc} 프로파일 (cProfile, python -m pstats 또는 snakeviz로 열람)",
+        taskid=task.id,
+        metadata=task.params,
+    )
+
+
+def start_profiler(path: str | None) -> cProfile.Profile | None:
+    """
+    path가 주어지면 현재 스레드의 실행을 cProfile로 측정하기 시작한다.
+    다른 프로파일러가 이미 동작 중이면 측정하지 않고 None을 반환한다.
+    """
+    if path is None:
+        return None
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return None
+    return profiler
+
+
+def stop_profiler(profiler: cProfile.Profile | None, path: str | None):
+    """
+    측정을 마치고 결과(pstats)를 path에 저장한다.
+    """
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+@contextmanager
+def profiled(path: str | None) -> Iterator[None]:
+    """
+    path가 주어지면 블록을 cProfile로 실행하고, 블록이 예외 없이 끝나면 결과(pstats)를 path에 저장한다.
+    cProfile은 블록을 실행하는 스레드만 측정한다.
+    """
+    profiler = start_profiler(path)
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+    stop_profiler(profiler, path)
+
+
+def run_measured(
+    ctx, path: str | None, fn: Callable[..., Any], *args
+) -> tuple[Any, dict[str, float]]:
+    """
+    작업 프로세스(run_in_process)에서 fn(ctx, *args)를 실행하고 (반환값, 자원 사용량)을 반환한다.
+    path가 주어지면 실행을 프로파일링하여 path에 저장한다.
+    """
+    usage = TaskUsage(reset_peak=True)
+    with profiled(path):
+        result = fn(ctx, *args)
+    return result, usage.stats()
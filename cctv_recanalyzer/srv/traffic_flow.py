@@ -0,0 +1,259 @@
+import numpy as np
+import pandas as pd
+
+PARTIAL_COLUMNS = [
+    "volume",
+    "speedsum",
+    "speedcount",
+    "invspeedsum",
+    "invspeedcount",
+    "presence",
+    "occupied",
+]
+
+
+def flow_rows(
+    df: pd.DataFrame,
+    roiwidth: int,
+    bin_frames: int,
+    line_px: float,
+    zone_px: float,
+    lanes: int = 1,
+) -> pd.DataFrame:
+    """
+    (objid, frame) 순으로 정렬되고 속도가 계산된 데이터의 각 행에 대하여 (bin, lane)과 검지선 통과 여부(crossed),
+    통과 시 지점 속도(spot, km/h)와 그 역수(inv), 검지선 주변 zone_px 구간 안에 있는지 여부(inzone)를 계산합니다.
+    """
+    frame = df["frame"].to_numpy()
+    perspy = df["perspy"].to_numpy(dtype=np.float64)
+    perspx = df["perspx"].to_numpy(dtype=np.float64)
+    speed = np.abs(df["speed"].to_numpy(dtype=np.float64))
+
+    lane = np.clip((perspx * lanes / roiwidth).astype(np.int64), 0, lanes - 1)
+
+    # detect line crossing between consecutive frames of the same object
+    group = df.groupby("objid", sort=False)
+    prev_y = group["perspy"].shift(1).to_numpy(dtype=np.float64)
+    contiguous = group["frame"].diff(1).to_numpy() == 1
+    crossed = contiguous & ((prev_y < line_px) != (perspy < line_px))
+
+    spot = np.where(crossed & ~np.isnan(speed), speed, np.nan)
+    inv = np.where(spot > 0, 1.0 / np.where(spot > 0, spot, 1.0), np.nan)
+
+    return pd.DataFrame(
+        {
+            "bin": frame // bin_frames,
+            "lane": lane,
+            "frame": frame,
+            "crossed": crossed,
+            "spot": spot,
+            "inv": inv,
+            "inzone": np.abs(perspy - line_px) <= zone_px / 2,
+        }
+    )
+
+
+def partials_from_rows(rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    flow_rows 결과를 (bin, lane)별 부분합으로 집계합니다.
+    """
+    partials = rows.groupby(["bin", "lane"]).agg(
+        volume=("crossed", "sum"),
+        speedsum=("spot", "sum"),
+        speedcount=("spot", "count"),
+        invspeedsum=("inv", "sum"),
+        invspeedcount=("inv", "count"),
+        presence=("frame", "size"),
+    )
+
+    occupied = (
+        rows.loc[rows["inzone"], ["bin", "lane", "frame"]]
+        .drop_duplicates()
+        .groupby(["bin", "lane"])
+        .size()
+    )
+    partials["occupied"] = occupied.reindex(partials.index, fill_value=0)
+
+    return partials[PARTIAL_COLUMNS]
+
+
+def flow_partials(
+    df: pd.DataFrame,
+    roiwidth: int,
+    bin_frames: int,
+    line_px: float,
+    zone_px: float,
+    lanes: int = 1,
+) -> pd.DataFrame:
+    """
+    (objid, frame) 순으로 정렬되고 속도가 계산된 데이터로부터 (bin, lane)별 교통류 부분합을 계산합니다.
+    부분합은 더하기만으로 합칠 수 있으므로, 데이터를 나누어 계산한 결과를 합산한 뒤 finalize_flow로 지표를 구합니다.
+    단, occupied는 같은 프레임이 두 부분에 나뉘어 있지 않아야 정확합니다.
+
+    - volume: perspy = line_px 인 가상 검지선을 통과한 차량 수
+    - speedsum, speedcount / invspeedsum, invspeedcount: 통과 차량 지점 속도(km/h)의 합 / 역수의 합
+    - presence: ROI 내 차량이 관측된 (객체, 프레임) 수
+    - occupied: 검지선 주변 zone_px 구간에 차량이 있었던 프레임 수
+    """
+    return partials_from_rows(
+        flow_rows(df, roiwidth, bin_frames, line_px, zone_px, lanes)
+    )
+
+
+def merge_flow_partials(parts: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    flow_partials 결과들을 (bin, lane) 기준으로 합산합니다.
+    """
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        return pd.DataFrame(
+            columns=PARTIAL_COLUMNS,
+            index=pd.MultiIndex.from_tuples([], names=["bin", "lane"]),
+        )
+    return pd.concat(parts).groupby(level=["bin", "lane"]).sum()
+
+
+def finalize_flow(
+    partials: pd.DataFrame,
+    fps: float,
+    bin_frames: int,
+    total_frames: int,
+    road_length: float,
+    lanes: int = 1,
+) -> pd.DataFrame:
+    """
+    부분합으로부터 (bin, lane)별 교통류 지표를 계산합니다.
+
+    - start: 구간 시작 시각(s), volume: 통과 대수, flow: 교통량(veh/h)
+    - tms: 시간 평균 속도(km/h, 지점 속도의 산술 평균), sms: 공간 평균 속도(km/h, 지점 속도의 조화 평균)
+    - density: 밀도(veh/km, road_length(m) 기준), occupancy: 점유율(0~1)
+    """
+    nbins = max(1, -(-total_frames // bin_frames))
+    index = pd.MultiIndex.from_product(
+        [np.arange(nbins), np.arange(lanes)], names=["bin", "lane"]
+    )
+    partials = partials.reindex(index, fill_value=0).astype(np.float64)
+
+    bins = index.get_level_values("bin").to_numpy()
+    frames = np.clip(total_frames - bins * bin_frames, 1, bin_frames)
+    seconds = frames / fps
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        flow = pd.DataFrame(
+            {
+                "start": bins * bin_frames / fps,
+                "volume": partials["volume"].to_numpy().astype(np.int64),
+                "flow": partials["volume"].to_numpy() * 3600 / seconds,
+                "tms": partials["speedsum"].to_numpy()
+                / partials["speedcount"].to_numpy(),
+                "sms": partials["invspeedcount"].to_numpy()
+                / partials["invspeedsum"].to_numpy(),
+                "density": partials["presence"].to_numpy()
+                / frames
+                / (road_length / 1000),
+                "occupancy": partials["occupied"].to_numpy() / frames,
+            },
+            index=index,
+        )
+
+    return flow.reset_index()
+
+
+class TrafficFlowAccumulator:
+    """
+    데이터를 나누어 입력받으면서 교통류 부분합을 누적하고, result()로 최종 지표를 계산합니다.
+    line은 ROI 상단으로부터 검지선까지의 거리(m, 기본값: 도로 길이의 절반), zone은 점유율 검지 구간의 길이(m)입니다.
+    """
+
+    def __init__(
+        self,
+        fps: float,
+        meter_per_pixel: float,
+        roiwidth: int,
+        road_length: float,
+        bin_seconds: float = 60,
+        line: float | None = None,
+        zone: float = 5.0,
+        lanes: int = 1,
+    ):
+        if line is None:
+            line = road_length / 2
+
+        self._fps = fps
+        self._roiwidth = roiwidth
+        self._road_length = road_length
+        self._lanes = lanes
+        self._bin_frames = max(1, int(round(bin_seconds * fps)))
+        self._line_px = line / meter_per_pixel
+        self._zone_px = zone / meter_per_pixel
+
+        self._partials: list[pd.DataFrame] = []
+        self._occupied = pd.DataFrame({"lane": [], "frame": []}, dtype=np.int64)
+        self._total_frames = 1
+
+    def add(self, df: pd.DataFrame, mask: np.ndarray | None = None):
+        """
+        mask가 주어지면 mask가 참인 행만 집계하고, 나머지 행은 검지선 통과 판정을 위한 이전 위치로만 사용합니다.
+        이전에 입력된 프레임의 행이 다시 들어와도(청크 경계의 보간 등) 점유 프레임은 한 번만 셉니다.
+        """
+        rows = flow_rows(
+            df,
+            self._roiwidth,
+            self._bin_frames,
+            self._line_px,
+            self._zone_px,
+            self._lanes,
+        )
+        if mask is not None:
+            rows = rows[mask]
+
+        # count each occupied (lane, frame) only once across calls
+        keys = pd.MultiIndex.from_arrays([rows["lane"], rows["frame"]])
+        seen = keys.isin(pd.MultiIndex.from_frame(self._occupied))
+        rows = rows.assign(inzone=rows["inzone"].to_numpy() & ~seen)
+        occupied = rows.loc[rows["inzone"], ["lane", "frame"]].drop_duplicates()
+        self._occupied = pd.concat([self._occupied, occupied], ignore_index=True)
+
+        # keep partials compact: bins x lanes rows
+        part = partials_from_rows(rows)
+        self._partials = [merge_flow_partials([*self._partials, part])]
+
+        if len(rows):
+            self._total_frames = max(self._total_frames, int(rows["frame"].max()) + 1)
+
+    def prune(self, frame: int):
+        """
+        frame 이전 프레임의 행은 더 이상 입력되지 않음을 알려, 점유 프레임 기록을 정리합니다.
+        """
+        self._occupied = self._occupied[self._occupied["frame"] >= frame]
+
+    def result(self) -> pd.DataFrame:
+        return finalize_flow(
+            merge_flow_partials(self._partials),
+            self._fps,
+            self._bin_frames,
+            self._total_frames,
+            self._road_length,
+            self._lanes,
+        )
+
+
+def aggregate_traffic_flow(
+    df: pd.DataFrame,
+    fps: float,
+    meter_per_pixel: float,
+    roiwidth: int,
+    road_length: float,
+    bin_seconds: float = 60,
+    line: float | None = None,
+    zone: float = 5.0,
+    lanes: int = 1,
+) -> pd.DataFrame:
+    """
+    분석 데이터로부터 시간 구간(bin_seconds)별, 차로 구간(perspx를 lanes개로 균등 분할)별 교통류 지표를 계산합니다.
+    """
+    accumulator = TrafficFlowAccumulator(
+        fps, meter_per_pixel, roiwidth, road_length, bin_seconds, line, zone, lanes
+    )
+    accumulator.add(df)
+    return accumulator.result()
@@ -0,0 +1,204 @@
+import json
+import os
+import shutil
+import threading
+from uuid import uuid4
+
+import numpy as np
+import pandas as pd
+from srv.output_tier import output_path
+
+# 인덱스 형식이 바뀌면 올려서 이전 인덱스를 다시 만든다.
+INDEX_VERSION = 1
+
+
+class TrajectoryIndex:
+    """
+    추적/분석 결과 csv를 (objid, frame) 순으로 정렬하여 열마다 .npy 파일로 저장한 인덱스.
+    모든 열은 memory-map으로 열리므로, 조회는 반환하는 행이 있는 페이지만 읽는다.
+
+    - objids / objoffsets: objid별 행 범위 [objoffsets[i], objoffsets[i + 1])
+    - frames / frameorder: 프레임 순으로 정렬한 frame 값과 그 행 번호 (frame 범위 -> 행 목록)
+    - maxspeed: objid별 최대 속도(km/h, 절댓값) (speed 열이 있는 경우)
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.columns: list[str] = self.meta["columns"]
+        self._data = {col: load(f"col_{col}") for col in self.columns}
+        self._objids = load("objids")
+        self._objoffsets = load("objoffsets")
+        self._frames = load("frames")
+        self._frameorder = load("frameorder")
+        self._maxspeed = load("maxspeed") if self.meta["speed"] else None
+
+    @staticmethod
+    def build(csv_path: str, path: str):
+        """
+        csv_path의 데이터로 path에 인덱스를 만든다. 다른 이름으로 만든 뒤 교체하므로 만드는 도중에도 이전 인덱스를 읽을 수 있다.
+        """
+        stat = os.stat(csv_path)
+        df = pd.read_csv(csv_path)
+        if not {"objid", "frame"} <= set(df.columns):
+            raise ValueError(f"objid, frame 열이 없는 데이터입니다: {csv_path}")
+
+        order = np.lexsort((df["frame"].to_numpy(), df["objid"].to_numpy()))
+        objid = df["objid"].to_numpy()[order]
+        frame = df["frame"].to_numpy()[order]
+        objids, starts = np.unique(objid, return_index=True)
+        objoffsets = np.append(starts, len(objid))
+        frameorder = np.argsort(frame, kind="stable")
+
+        tmp = f"{path}.{uuid4().hex}.tmp"
+        os.makedirs(tmp)
+
+        def save(name: str, arr: np.ndarray):
+            np.save(os.path.join(tmp, f"{name}.npy"), arr)
+
+        for col in df.columns:
+            values = df[col].to_numpy()[order]
+            if values.dtype == object:
+                # fixed-width strings can be memory-mapped (object arrays cannot)
+                values = values.astype(str)
+            save(f"col_{col}", values)
+        save("objids", objids)
+        save("objoffsets", objoffsets)
+        save("frames", frame[frameorder])
+        save("frameorder", frameorder)
+
+        speed = "speed" in df.columns
+        if speed and len(objids):
+            abs_speed = np.abs(df["speed"].to_numpy(dtype=np.float64)[order])
+            abs_speed = np.where(np.isnan(abs_speed), -np.inf, abs_speed)
+            maxspeed = np.maximum.reduceat(abs_speed, starts)
+            save("maxspeed", np.where(np.isinf(maxspeed), np.nan, maxspeed))
+        elif speed:
+            save("maxspeed", np.empty(0, dtype=np.float64))
+
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            meta = {
+                "version": INDEX_VERSION,
+                "size": stat.st_size,
+                "mtime": stat.st_mtime_ns,
+                "rows": len(df),
+                "columns": df.columns.tolist(),
+                "speed": speed,
+            }
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+
+    def is_valid_for(self, csv_path: str) -> bool:
+        stat = os.stat(csv_path)
+        return (
+            self.meta["version"] == INDEX_VERSION
+            and self.meta["size"] == stat.st_size
+            and self.meta["mtime"] == stat.st_mtime_ns
+        )
+
+    def _rows(self, rows: np.ndarray | slice) -> pd.DataFrame:
+        return pd.DataFrame({col: self._data[col][rows] for col in self.columns})
+
+    def by_objid(self, objid: int) -> pd.DataFrame:
+        """
+        objid 객체의 궤적을 frame 순으로 반환한다.
+        """
+        i = np.searchsorted(self._objids, objid)
+        if i == len(self._objids) or self._objids[i] != objid:
+            return self._rows(slice(0, 0))
+        return self._rows(slice(self._objoffsets[i], self._objoffsets[i + 1]))
+
+    def by_frame(self, start: int, end: int, limit: int | None = None) -> pd.DataFrame:
+        """
+        start <= frame < end 인 모든 객체의 데이터를 (frame, objid) 순으로 반환한다.
+        """
+        lo, hi = np.searchsorted(self._frames, [start, end])
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        # gather rows in storage order so each page is touched once
+        rows = np.sort(self._frameorder[lo:hi])
+        df = self._rows(rows)
+        return df.sort_values(["frame", "objid"], kind="stable", ignore_index=True)
+
+    def objects(self, minspeed: float | None = None) -> pd.DataFrame:
+        """
+        객체 목록(objid, 첫/마지막 프레임, 행 수, 최대 속도)을 반환한다. minspeed가 주어지면 최대 속도가 그 이상인 객체만 반환한다.
+        """
+        starts = np.asarray(self._objoffsets[:-1])
+        ends = np.asarray(self._objoffsets[1:])
+        frame = self._data["frame"]
+        objects = pd.DataFrame(
+            {
+                "objid": np.asarray(self._objids),
+                "firstframe": frame[starts],
+                "lastframe": frame[ends - 1],
+                "rows": ends - starts,
+            }
+        )
+        if self._maxspeed is not None:
+            objects["maxspeed"] = np.asarray(self._maxspeed)
+        if minspeed is not None:
+            if self._maxspeed is None:
+                raise ValueError("속도(speed) 열이 없는 데이터입니다.")
+            objects = objects[objects["maxspeed"] >= minspeed]
+        return objects.reset_index(drop=True)
+
+
+class TrajectoryIndexStore:
+    """
+    <outputs_path>/.index/<name>/ 에 결과 파일별 TrajectoryIndex를 보관한다.
+    인덱스는 처음 조회할 때 만들고, 원본 파일의 크기나 수정 시각이 바뀌면 다시 만든다.
+    """
+
+    def __init__(self, outputs_path: str):
+        self._lock = threading.Lock()
+        self._name_locks: dict[str, threading.Lock] = {}
+        self._outputs_path = outputs_path
+        self._index_path = os.path.join(outputs_path, ".index")
+        self._indexes: dict[str, TrajectoryIndex] = {}
+
+        os.makedirs(self._index_path, exist_ok=True)
+        self.purge()
+
+    def purge(self):
+        """
+        원본 파일이 삭제된 인덱스를 제거한다.
+        """
+        for name in os.listdir(self._index_path):
+            if not os.path.exists(output_path(self._outputs_path, name)):
+                shutil.rmtree(os.path.join(self._index_path, name), ignore_errors=True)
+
+    def get(self, name: str) -> TrajectoryIndex:
+        csv_path = output_path(self._outputs_path, name)
+        index_path = os.path.join(self._index_path, name)
+        if not os.path.exists(csv_path):
+            raise ValueError(f"결과 파일이 존재하지 않습니다: {name}")
+
+        with self._lock:
+            name_lock = self._name_locks.setdefault(name, threading.Lock())
+
+        # build at most once per name, without blocking queries on other outputs
+        with name_lock:
+            index = self._indexes.get(name)
+            if index is not None and index.is_valid_for(csv_path):
+                return index
+
+            try:
+                index = TrajectoryIndex(index_path)
+                if not index.is_valid_for(csv_path):
+                    index = None
+            except (FileNotFoundError, KeyError, json.JSONDecodeError):
+                index = None
+
+            if index is None:
+                TrajectoryIndex.build(csv_path, index_path)
+                index = TrajectoryIndex(index_path)
+
+            self._indexes[name] = index
+            return index
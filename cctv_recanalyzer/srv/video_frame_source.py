@@ -0,0 +1,259 @@
+import json
+import subprocess
+from abc import ABC, abstractmethod
+from fractions import Fraction
+
+import cv2
+import numpy as np
+
+
+class FrameSource(ABC):
+    """
+    영상의 프레임을 순차적으로 읽어오는 추상 클래스.
+    read()가 반환하는 배열은 미리 할당된 내부 버퍼를 재사용하므로, 다음 read() 호출 전까지만 유효하다.
+    size가 주어지면 디코딩 단계에서 (width, height) 크기로 축소한다.
+    """
+
+    def __init__(self, path: str, size: tuple[int, int] | None = None):
+        self._path = path
+        self._size = size
+        self._buffer: np.ndarray | None = None
+
+        self.src_width = 0
+        self.src_height = 0
+        self.fps = 0.0
+        self.frame_count = 0
+
+    @property
+    def width(self) -> int:
+        return self._size[0] if self._size else self.src_width
+
+    @property
+    def height(self) -> int:
+        return self._size[1] if self._size else self.src_height
+
+    def _alloc_buffer(self):
+        self._buffer = np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+    @abstractmethod
+    def read(self) -> np.ndarray | None:
+        pass
+
+    @abstractmethod
+    def release(self):
+        pass
+
+    def __iter__(self):
+        while True:
+            frame = self.read()
+            if frame is None:
+                break
+            yield frame
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+class OpenCVFrameSource(FrameSource):
+    """
+    cv2.VideoCapture 기반 프레임 소스. 디코딩 결과를 내부 버퍼에 직접 기록한다.
+    """
+
+    def __init__(
+        self, path: str, size: tuple[int, int] | None = None, threads: int = 0
+    ):
+        super().__init__(path, size)
+        # OpenCV 4.6+ FFmpeg 백엔드는 디코딩 스레드 수를 지정할 수 있다.
+        # 디코더가 열릴 때 적용되므로 set()이 아니라 열기 매개변수로 전달해야 한다.
+        if threads > 0 and hasattr(cv2, "CAP_PROP_N_THREADS"):
+            self._cap = cv2.VideoCapture(
+                path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_N_THREADS, threads]
+            )
+        else:
+            self._cap = cv2.VideoCapture(path)
+        if not self._cap.isOpened():
+            raise ValueError(f"Cannot open video file: {path}")
+
+        self.src_width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.src_height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = float(self._cap.get(cv2.CAP_PROP_FPS))
+        self.frame_count = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        self._alloc_buffer()
+        self._decoded: np.ndarray | None = None
+        if self._size:
+            self._decoded = np.empty(
+                (self.src_height, self.src_width, 3), dtype=np.uint8
+            )
+
+    def read(self) -> np.ndarray | None:
+        if self._size is None:
+            ret, frame = self._cap.read(self._buffer)
+            return frame if ret else None
+
+        ret, frame = self._cap.read(self._decoded)
+        if not ret:
+            return None
+        return cv2.resize(
+            frame, self._size, dst=self._buffer, interpolation=cv2.INTER_AREA
+        )
+
+    def release(self):
+        self._cap.release()
+
+
+class PyAVFrameSource(FrameSource):
+    """
+    PyAV(libav) 기반 프레임 소스. 프레임/슬라이스 단위 멀티스레드 디코딩을 사용하며,
+    축소 및 BGR 변환은 swscale에서 한 번에 수행한다. swscale 컨텍스트는 프레임마다 새로 만들지 않고 재사용한다.
+    """
+
+    def __init__(
+        self, path: str, size: tuple[int, int] | None = None, threads: int = 0
+    ):
+        import av
+        from av.video.reformatter import VideoReformatter
+
+        super().__init__(path, size)
+        self._container = av.open(path)
+        self._stream = self._container.streams.video[0]
+        self._stream.thread_type = "AUTO"
+        self._stream.thread_count = threads
+
+        ctx = self._stream.codec_context
+        self.src_width = ctx.width
+        self.src_height = ctx.height
+        rate = self._stream.average_rate or self._stream.guessed_rate
+        self.fps = float(rate) if rate else 0.0
+        self.frame_count = self._stream.frames
+
+        self._alloc_buffer()
+        self._reformatter = VideoReformatter()
+        self._frames = self._container.decode(self._stream)
+
+    def read(self) -> np.ndarray | None:
+        frame = next(self._frames, None)
+        if frame is None:
+            return None
+
+        frame = self._reformatter.reformat(
+            frame, width=self.width, height=self.height, format="bgr24"
+        )
+        plane = frame.planes[0]
+        # line_size에는 정렬을 위한 padding이 포함될 수 있다.
+        rows = np.frombuffer(plane, dtype=np.uint8).reshape(
+            self.height, plane.line_size
+        )
+        np.copyto(
+            self._buffer,
+            rows[:, : self.width * 3].reshape(self.height, self.width, 3),
+        )
+        return self._buffer
+
+    def release(self):
+        self._container.close()
+
+
+def probe_video(path: str) -> dict[str, str]:
+    """
+    ffprobe를 이용하여 첫 번째 비디오 스트림의 width, height, avg_frame_rate, nb_frames를 반환한다.
+    """
+    out = subprocess.run(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-select_streams",
+            "v:0",
+            "-show_entries",
+            "stream=width,height,avg_frame_rate,nb_frames",
+            "-of",
+            "json",
+            path,
+        ],
+        capture_output=True,
+        check=True,
+    )
+    streams = json.loads(out.stdout)["streams"]
+    if not streams:
+        raise ValueError(f"Cannot find video stream: {path}")
+    return streams[0]
+
+
+class FFmpegPipeFrameSource(FrameSource):
+    """
+    ffmpeg 프로세스의 rawvideo(bgr24) 출력을 파이프로 읽는 프레임 소스.
+    디코딩과 축소는 별도 프로세스에서 멀티스레드로 수행되고, 파이프 데이터는 내부 버퍼에 바로 기록된다.
+    """
+
+    def __init__(
+        self, path: str, size: tuple[int, int] | None = None, threads: int = 0
+    ):
+        super().__init__(path, size)
+        info = probe_video(path)
+        self.src_width = int(info["width"])
+        self.src_height = int(info["height"])
+        rate = info.get("avg_frame_rate", "0/1")
+        self.fps = float(Fraction(rate)) if rate != "0/0" else 0.0
+        self.frame_count = int(info.get("nb_frames", 0) or 0)
+
+        self._alloc_buffer()
+        self._view = memoryview(self._buffer).cast("B")  # type: ignore
+
+        command = ["ffmpeg", "-v", "error", "-threads", str(threads), "-i", path]
+        if self._size:
+            command += ["-vf", f"scale={self.width}:{self.height}:flags=area"]
+        command += ["-f", "rawvideo", "-pix_fmt", "bgr24", "-"]
+
+        self._proc = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stdin=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            bufsize=self._buffer.nbytes,
+        )
+
+    def read(self) -> np.ndarray | None:
+        stdout = self._proc.stdout
+        assert stdout is not None
+
+        filled = 0
+        total = len(self._view)
+        while filled < total:
+            n = stdout.readinto(self._view[filled:])  # type: ignore
+            if not n:
+                return None
+            filled += n
+        return self._buffer
+
+    def release(self):
+        if self._proc.poll() is None:
+            self._proc.kill()
+        self._proc.wait()
+        if self._proc.stdout is not None:
+            self._proc.stdout.close()
+
+
+FRAME_SOURCE_BACKENDS: dict[str, type[FrameSource]] = {
+    "opencv": OpenCVFrameSource,
+    "pyav": PyAVFrameSource,
+    "ffmpeg": FFmpegPipeFrameSource,
+}
+
+
+def open_frame_source(
+    path: str,
+    backend: str = "opencv",
+    size: tuple[int, int] | None = None,
+    threads: int = 0,
+) -> FrameSource:
+    """
+    backend 이름(opencv, pyav, ffmpeg)에 해당하는 프레임 소스를 연다. threads=0이면 자동으로 결정한다.
+    """
+    source_cls = FRAME_SOURCE_BACKENDS.get(backend)
+    if source_cls is None:
+        raise ValueError(f"Unknown video decode backend: {backend}")
+    return source_cls(path, size=size, threads=threads)  # type: ignore
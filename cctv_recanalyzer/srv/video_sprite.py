@@ -0,0 +1,357 @@
+import json
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator
+from uuid import uuid4
+
+import cv2
+import numpy as np
+from core.model import EntityNotFound, TaskOutput
+
+SPRITE_VERSION = 1
+SHEET_PATTERN = re.compile(r"sheet\d+\.jpg")
+
+
+def iter_interval_frames(
+    path: str, interval: float, width: int
+) -> Iterator[tuple[float, np.ndarray]]:
+    """
+    영상을 처음부터 한 번 순차 디코딩하면서 interval(초) 간격의 프레임을 (시각, 너비 width로 축소한 BGR 이미지)로 반환합니다.
+    선택되지 않은 프레임은 변환하지 않습니다.
+    """
+    try:
+        import av
+    except ImportError:
+        av = None
+
+    if av is None:
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video file: {path}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        try:
+            index, next_time = 0, 0.0
+            while cap.grab():
+                time = index / fps
+                index += 1
+                if time + 1e-6 < next_time:
+                    continue
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                height = max(1, round(frame.shape[0] * width / frame.shape[1]))
+                yield time, cv2.resize(
+                    frame, (width, height), interpolation=cv2.INTER_AREA
+                )
+                next_time += interval
+        finally:
+            cap.release()
+        return
+
+    try:
+        container = av.open(path)
+    except av.error.FFmpegError as e:
+        raise ValueError(f"Cannot open video file: {path}") from e
+
+    with container:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        height = max(
+            1, round(stream.codec_context.height * width / stream.codec_context.width)
+        )
+        start = None
+        next_time = 0.0
+        for frame in container.decode(stream):
+            if frame.time is None:
+                continue
+            if start is None:
+                start = frame.time
+            time = frame.time - start
+            if time + 1e-6 < next_time:
+                continue
+            # scale in swscale, only for the selected frames
+            image = frame.reformat(width=width, height=height, format="bgr24")
+            yield time, image.to_ndarray()
+            next_time += interval
+
+
+def build_sprite(
+    video_path: str,
+    path: str,
+    interval: float = 2.0,
+    width: int = 160,
+    columns: int = 10,
+    rows: int = 10,
+    source: str = "",
+) -> dict:
+    """
+    영상의 interval(초) 간격 프레임을 columns x rows 타일의 sheet{k}.jpg로 묶고,
+    타일 위치를 담은 index.json과 index.vtt(WebVTT, #xywh=)를 path 디렉토리에 저장합니다.
+    """
+    sheets: list[str] = []
+    tiles: list[np.ndarray] = []
+    count = 0
+    duration = 0.0
+    tile_height = 0
+
+    os.makedirs(path, exist_ok=True)
+
+    def write_sheet():
+        # the last sheet keeps only the used rows, padded with black tiles
+        used_rows = -(-len(tiles) // columns)
+        cells = tiles + [np.zeros_like(tiles[0])] * (used_rows * columns - len(tiles))
+        sheet = np.vstack(
+            [
+                np.hstack(cells[r * columns : (r + 1) * columns])
+                for r in range(used_rows)
+            ]
+        )
+        name = f"sheet{len(sheets)}.jpg"
+        ret, jpeg = cv2.imencode(".jpg", sheet, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        if not ret:
+            raise RuntimeError("Cannot encode sprite sheet to jpeg")
+        with open(os.path.join(path, name), "wb") as f:
+            f.write(jpeg.tobytes())
+        sheets.append(name)
+        tiles.clear()
+
+    for time, image in iter_interval_frames(video_path, interval, width):
+        tile_height = image.shape[0]
+        tiles.append(image)
+        count += 1
+        duration = time + interval
+        if len(tiles) == columns * rows:
+            write_sheet()
+    if tiles:
+        write_sheet()
+    if count == 0:
+        raise RuntimeError(f"Cannot read video frame: {video_path}")
+
+    index = {
+        "version": SPRITE_VERSION,
+        "source": source,
+        "interval": interval,
+        "width": width,
+        "height": tile_height,
+        "columns": columns,
+        "rows": rows,
+        "count": count,
+        "duration": duration,
+        "sheets": sheets,
+    }
+    with open(os.path.join(path, "index.json"), "w") as f:
+        json.dump(index, f)
+    with open(os.path.join(path, "index.vtt"), "w") as f:
+        f.write(sprite_vtt(index))
+    return index
+
+
+def _vtt_time(seconds: float) -> str:
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+
+
+def tile_rect(index: dict, i: int) -> tuple[str, int, int, int, int]:
+    """
+    i번째 타일의 (sheet 이름, x, y, w, h)를 반환합니다.
+    """
+    per_sheet = index["columns"] * index["rows"]
+    sheet, cell = divmod(i, per_sheet)
+    row, column = divmod(cell, index["columns"])
+    w, h = index["width"], index["height"]
+    return index["sheets"][sheet], column * w, row * h, w, h
+
+
+def sprite_vtt(index: dict) -> str:
+    lines = ["WEBVTT", ""]
+    for i in range(index["count"]):
+        start = i * index["interval"]
+        end = min((i + 1) * index["interval"], index["duration"])
+        sheet, x, y, w, h = tile_rect(index, i)
+        lines.append(f"{_vtt_time(start)} --> {_vtt_time(end)}")
+        lines.append(f"{sheet}#xywh={x},{y},{w},{h}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+class VideoSpriteStore:
+    """
+    영상 결과의 스크러빙용 스프라이트 시트를 <outputs_path>/.sprite/<name>/ 에 보관한다.
+    결과가 저장될 때(on_output_saved) 백그라운드에서 영상을 한 번 순차 디코딩하여 만들고,
+    조회 시에는 영상을 열지 않고 시트 이미지에서 타일을 잘라 반환한다.
+    """
+
+    def __init__(
+        self,
+        outputs_path: str,
+        interval: float = 2.0,
+        width: int = 160,
+        columns: int = 10,
+        rows: int = 10,
+        max_cached_sheets: int = 8,
+    ):
+        self._lock = threading.Lock()
+        self._outputs_path = outputs_path
+        self._sprite_path = os.path.join(outputs_path, ".sprite")
+        self._interval = interval
+        self._width = width
+        self._columns = columns
+        self._rows = rows
+        self._max_cached_sheets = max_cached_sheets
+
+        # name -> index (validated against the source video)
+        self._indexes: dict[str, dict] = {}
+        # (name, sheet) -> decoded sheet image (LRU order)
+        self._sheets: OrderedDict[tuple[str, str], np.ndarray] = OrderedDict()
+        # name -> pending generation
+        self._pending: dict[str, Future] = {}
+        self._generator = ThreadPoolExecutor(max_workers=1)
+
+        os.makedirs(self._sprite_path, exist_ok=True)
+        self.purge()
+
+    def purge(self):
+        """
+        원본 영상이 삭제된 스프라이트를 제거한다.
+        """
+        for name in os.listdir(self._sprite_path):
+            if not os.path.exists(os.path.join(self._outputs_path, name)):
+                shutil.rmtree(os.path.join(self._sprite_path, name), ignore_errors=True)
+
+    def on_output_saved(self, output: TaskOutput):
+        if output.type.startswith("video/"):
+            self.schedule(output.name)
+
+    def schedule(self, name: str) -> Future:
+        """
+        name 영상의 스프라이트 생성을 백그라운드 작업으로 예약한다. 이미 예약되어 있으면 그 작업을 반환한다.
+        """
+        with self._lock:
+            future = self._pending.get(name)
+            if future is None:
+                future = self._generator.submit(self._generate, name)
+                self._pending[name] = future
+            return future
+
+    def _generate(self, name: str):
+        try:
+            self.generate(name)
+        finally:
+            with self._lock:
+                self._pending.pop(name, None)
+
+    def _source_tag(self, name: str) -> str:
+        try:
+            stat = os.stat(os.path.join(self._outputs_path, name))
+        except FileNotFoundError:
+            raise ValueError(f"결과 파일이 존재하지 않습니다: {name}")
+        return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+    def generate(self, name: str) -> dict:
+        """
+        name 영상의 스프라이트 시트와 인덱스를 만든다.
+        """
+        source_tag = self._source_tag(name)
+
+        # build into a temporary directory and swap
+        path = os.path.join(self._sprite_path, name)
+        tmp = f"{path}.{uuid4().hex}.tmp"
+        try:
+            index = build_sprite(
+                os.path.join(self._outputs_path, name),
+                tmp,
+                interval=self._interval,
+                width=self._width,
+                columns=self._columns,
+                rows=self._rows,
+                source=source_tag,
+            )
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+        with self._lock:
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp, path)
+            self._indexes[name] = index
+            for key in [key for key in self._sheets if key[0] == name]:
+                del self._sheets[key]
+        return index
+
+    def get_index(self, name: str) -> dict:
+        """
+        name 영상의 스프라이트 인덱스를 반환한다.
+        아직 만들어지지 않았거나 영상이 바뀌었으면 생성을 예약하고 EntityNotFound를 발생시킨다.
+        """
+        source_tag = self._source_tag(name)
+        with self._lock:
+            index = self._indexes.get(name)
+        if index is None or index["source"] != source_tag:
+            try:
+                with open(os.path.join(self._sprite_path, name, "index.json")) as f:
+                    index = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                index = None
+
+            if (
+                index is None
+                or index.get("version") != SPRITE_VERSION
+                or index.get("source") != source_tag
+            ):
+                self.schedule(name)
+                raise EntityNotFound(f"미리보기 스프라이트를 생성하는 중입니다: {name}")
+            with self._lock:
+                self._indexes[name] = index
+        return index
+
+    def get_vtt(self, name: str) -> str:
+        return sprite_vtt(self.get_index(name))
+
+    def get_sheet(self, name: str, sheet: str) -> tuple[bytes, str]:
+        """
+        시트 이미지(jpeg)와 ETag를 반환한다.
+        """
+        index = self.get_index(name)
+        if not SHEET_PATTERN.fullmatch(sheet) or sheet not in index["sheets"]:
+            raise EntityNotFound(f"스프라이트 시트가 존재하지 않습니다: {sheet}")
+        with open(os.path.join(self._sprite_path, name, sheet), "rb") as f:
+            return f.read(), f'"{index["source"]}-{sheet}"'
+
+    def _decoded_sheet(self, name: str, sheet: str) -> np.ndarray:
+        key = (name, sheet)
+        with self._lock:
+            image = self._sheets.get(key)
+            if image is not None:
+                self._sheets.move_to_end(key)
+                return image
+
+        image = cv2.imread(os.path.join(self._sprite_path, name, sheet))
+        if image is None:
+            raise RuntimeError(f"Cannot read sprite sheet: {name}/{sheet}")
+
+        with self._lock:
+            self._sheets[key] = image
+            while len(self._sheets) > self._max_cached_sheets:
+                self._sheets.popitem(last=False)
+        return image
+
+    def get_tile(self, name: str, time: float) -> tuple[bytes, str]:
+        """
+        time(초) 시각의 타일 이미지(jpeg)와 ETag를 반환한다. 영상은 열지 않는다.
+        """
+        index = self.get_index(name)
+        i = min(max(int(time // index["interval"]), 0), index["count"] - 1)
+        sheet, x, y, w, h = tile_rect(index, i)
+
+        tile = self._decoded_sheet(name, sheet)[y : y + h, x : x + w]
+        ret, jpeg = cv2.imencode(".jpg", tile)
+        if not ret:
+            raise RuntimeError("Cannot encode sprite tile to jpeg")
+        return jpeg.tobytes(), f'"{index["source"]}-{i}"'
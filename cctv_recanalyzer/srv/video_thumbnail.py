@@ -0,0 +1,212 @@
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+import cv2
+import numpy as np
+from core.model import TaskOutput
+
+# 미리보기 이미지 너비(px). 0은 원본 크기이다.
+THUMBNAIL_WIDTHS = (160, 320, 640, 0)
+
+
+def read_keyframe(path: str, position: float = 0.1) -> np.ndarray:
+    """
+    영상 길이의 position(0~1) 지점 직전의 키프레임을 BGR 이미지로 반환합니다.
+    키프레임으로 seek하므로 이전 키프레임부터 디코딩하지 않으며, 같은 영상에 대해 항상 같은 프레임을 반환합니다.
+    """
+    try:
+        import av
+    except ImportError:
+        av = None
+
+    if av is None:
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video file: {path}")
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(total_frames * position))
+        ret, frame = cap.read()
+        cap.release()
+        if not ret:
+            raise RuntimeError(f"Cannot read video frame: {path}")
+        return frame
+
+    try:
+        container = av.open(path)
+    except av.error.FFmpegError as e:
+        raise ValueError(f"Cannot open video file: {path}") from e
+
+    with container:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        if container.duration:
+            # container.duration is in microseconds (av.time_base)
+            target = container.duration * position / 1_000_000
+            container.seek(
+                int(target / stream.time_base),
+                stream=stream,
+                backward=True,
+                any_frame=False,
+            )
+        for frame in container.decode(stream):
+            return frame.to_ndarray(format="bgr24")
+
+    raise RuntimeError(f"Cannot read video frame: {path}")
+
+
+def encode_thumbnails(
+    image: np.ndarray, widths: tuple[int, ...] = THUMBNAIL_WIDTHS
+) -> dict[int, bytes]:
+    """
+    이미지를 너비별로 축소하여 jpeg로 인코딩합니다. 원본보다 큰 너비는 원본 크기로 인코딩합니다.
+    """
+    height, width = image.shape[:2]
+    thumbnails: dict[int, bytes] = {}
+    for w in widths:
+        if w <= 0 or w >= width:
+            resized = image
+        else:
+            size = (w, max(1, round(height * w / width)))
+            resized = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        ret, jpeg = cv2.imencode(".jpg", resized)
+        if not ret:
+            raise RuntimeError("Cannot encode video frame to jpeg")
+        thumbnails[w] = jpeg.tobytes()
+    return thumbnails
+
+
+class VideoThumbnailStore:
+    """
+    영상 결과의 미리보기 이미지를 <outputs_path>/.thumb/<name>/<width>.jpg 에 보관한다.
+    결과가 저장될 때(on_output_saved) 백그라운드에서 미리 만들고, 조회 시에는 메모리 LRU를 먼저 확인한다.
+    ETag는 원본 영상의 크기와 수정 시각으로 만들므로, 영상이 바뀌면 미리보기도 다시 만든다.
+    """
+
+    def __init__(
+        self,
+        outputs_path: str,
+        widths: tuple[int, ...] = THUMBNAIL_WIDTHS,
+        max_memory_bytes: int = 64 * 1024**2,
+    ):
+        self._lock = threading.Lock()
+        self._outputs_path = outputs_path
+        self._thumb_path = os.path.join(outputs_path, ".thumb")
+        # ascending, original size (0) last
+        self._widths = tuple(sorted(w for w in widths if w > 0)) + (
+            (0,) if 0 in widths else ()
+        )
+        self._max_memory_bytes = max_memory_bytes
+
+        # (name, width) -> (etag, jpeg) (LRU order)
+        self._memory: OrderedDict[tuple[str, int], tuple[str, bytes]] = OrderedDict()
+        self._memory_bytes = 0
+        self._generator = ThreadPoolExecutor(max_workers=1)
+
+        os.makedirs(self._thumb_path, exist_ok=True)
+        self.purge()
+
+    def purge(self):
+        """
+        원본 영상이 삭제된 미리보기 이미지를 제거한다.
+        """
+        for name in os.listdir(self._thumb_path):
+            if not os.path.exists(os.path.join(self._outputs_path, name)):
+                shutil.rmtree(os.path.join(self._thumb_path, name), ignore_errors=True)
+
+    def on_output_saved(self, output: TaskOutput):
+        if output.type.startswith("video/"):
+            self._generator.submit(self._generate_quietly, output.name)
+
+    def _generate_quietly(self, name: str):
+        try:
+            self.generate(name)
+        except Exception:
+            # generated again on the first request
+            pass
+
+    def _source_tag(self, name: str) -> str:
+        try:
+            stat = os.stat(os.path.join(self._outputs_path, name))
+        except FileNotFoundError:
+            raise ValueError(f"결과 파일이 존재하지 않습니다: {name}")
+        return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+    def _width(self, width: int) -> int:
+        # smallest stored width that is not smaller than the request
+        if width > 0:
+            for w in self._widths:
+                if w >= width:
+                    return w
+        return self._widths[-1]
+
+    def generate(self, name: str):
+        """
+        name 영상의 미리보기 이미지를 모든 너비에 대해 만든다.
+        """
+        source_tag = self._source_tag(name)
+        thumbnails = encode_thumbnails(
+            read_keyframe(os.path.join(self._outputs_path, name)), self._widths
+        )
+
+        # write into a temporary directory and swap
+        path = os.path.join(self._thumb_path, name)
+        tmp = f"{path}.{uuid4().hex}.tmp"
+        os.makedirs(tmp)
+        for w, jpeg in thumbnails.items():
+            with open(os.path.join(tmp, f"{w}.jpg"), "wb") as f:
+                f.write(jpeg)
+        with open(os.path.join(tmp, "source"), "w") as f:
+            f.write(source_tag)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+
+    def _read(self, name: str, width: int, source_tag: str) -> bytes | None:
+        path = os.path.join(self._thumb_path, name)
+        try:
+            with open(os.path.join(path, "source"), "r") as f:
+                if f.read() != source_tag:
+                    return None
+            with open(os.path.join(path, f"{width}.jpg"), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def get(self, name: str, width: int = 0) -> tuple[bytes, str]:
+        """
+        너비가 width 이상인 가장 작은 미리보기 이미지(jpeg)와 ETag를 반환한다. width가 0이면 원본 크기이다.
+        """
+        width = self._width(width)
+        source_tag = self._source_tag(name)
+        etag = f'"{source_tag}-{width}"'
+        key = (name, width)
+
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None and cached[0] == etag:
+                self._memory.move_to_end(key)
+                return cached[1], etag
+
+        jpeg = self._read(name, width, source_tag)
+        if jpeg is None:
+            self.generate(name)
+            jpeg = self._read(name, width, source_tag)
+            if jpeg is None:
+                raise RuntimeError(f"Cannot create video preview: {name}")
+
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old[1])
+            self._memory[key] = (etag, jpeg)
+            self._memory_bytes += len(jpeg)
+            while (
+                len(self._memory) > 1 and self._memory_bytes > self._max_memory_bytes
+            ):
+                _, (_, evicted) = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+        return jpeg, etag
@@ -0,0 +1,145 @@
+"""
+testing TaskEngine in engine.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.append("..")
+from core.engine import JobContext, ResourceClass, TaskEngine
+from core.model import TaskItem, TaskState
+from repo.task_item_file import TaskItemJsonRepo
+
+
+class TaskEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self.repo = TaskItemJsonRepo(os.path.join(self._dir, "tasks.json"))
+        self.engine = TaskEngine(
+            self.repo,
+            {
+                ResourceClass.CPU_HEAVY: 1,
+                ResourceClass.CPU_LIGHT: 2,
+                ResourceClass.CONTROL: 2,
+            },
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _add_task(self, id: str) -> TaskItem:
+        task = TaskItem(id, "test", {}, TaskState.PENDING, "", 0.0)
+        self.repo.add(task)
+        return task
+
+    def _wait_state(self, task: TaskItem, state: TaskState):
+        deadline = time.monotonic() + 10
+        while task.state != state and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(task.state, state, task.reason)
+
+    def test_limit_and_priority(self):
+        release = threading.Event()
+        order: list[str] = []
+        running = []
+        max_running = 0
+
+        def job(ctx: JobContext):
+            nonlocal max_running
+            running.append(ctx.taskid)
+            max_running = max(max_running, len(running))
+            release.wait(10)
+            order.append(ctx.taskid)
+            running.remove(ctx.taskid)
+            self.repo.update(ctx.taskid, TaskState.FINISHED, "done")
+
+        tasks = [self._add_task(id) for id in ["first", "low", "high"]]
+        self.engine.submit("first", ResourceClass.CPU_HEAVY, job)
+        time.sleep(0.05)
+        self.engine.submit("low", ResourceClass.CPU_HEAVY, job, priority=-1)
+        self.engine.submit("high", ResourceClass.CPU_HEAVY, job, priority=1)
+        self.assertEqual(self.engine.stats()["cpu_heavy"]["queued"], 2)
+
+        release.set()
+        for task in tasks:
+            self._wait_state(task, TaskState.FINISHED)
+        self.assertEqual(order, ["first", "high", "low"])
+        self.assertEqual(max_running, 1)
+
+    def test_cancel(self):
+        started = threading.Event()
+
+        def job(ctx: JobContext):
+            ctx.set_progress(0.5, "running")
+            started.set()
+            while not ctx.wait(0.01):
+                pass
+            ctx.raise_if_canceled()
+
+        running = self._add_task("running")
+        queued = self._add_task("queued")
+        self.engine.submit("running", ResourceClass.CPU_HEAVY, job)
+        self.engine.submit(
+            "queued", ResourceClass.CPU_HEAVY, job, cancel_reason="queued canceled"
+        )
+        self.assertTrue(started.wait(10))
+        self.assertEqual((running.state, running.progress), (TaskState.STARTED, 0.5))
+
+        self.assertTrue(self.engine.cancel("queued"))
+        self.assertEqual(queued.state, TaskState.CANCELED)
+        self.assertEqual(queued.reason, "queued canceled")
+
+        self.assertTrue(self.engine.cancel("running"))
+        self._wait_state(running, TaskState.CANCELED)
+        self.assertFalse(self.engine.cancel("unknown"))
+
+    def test_io_unbounded(self):
+        # recordings start when due, however many are running
+        release = threading.Event()
+        started = threading.Semaphore(0)
+
+        def job(ctx: JobContext):
+            started.release()
+            release.wait(10)
+            self.repo.update(ctx.taskid, TaskState.FINISHED, "done")
+
+        tasks = [self._add_task(f"record{i}") for i in range(20)]
+        for task in tasks:
+            self.engine.submit(task.id, ResourceClass.IO, job)
+        for _ in tasks:
+            self.assertTrue(started.acquire(timeout=10))
+        self.assertEqual(self.engine.stats()["io"]["running"], 20)
+        self.assertEqual(self.engine.stats()["io"]["limit"], 0)
+
+        release.set()
+        for task in tasks:
+            self._wait_state(task, TaskState.FINISHED)
+
+    def test_not_before_and_failure(self):
+        def job(ctx: JobContext):
+            raise RuntimeError("job failed")
+
+        task = self._add_task("scheduled")
+        submitted = time.time()
+        self.engine.submit(
+            "scheduled",
+            ResourceClass.IO,
+            job,
+            not_before=datetime.now() + timedelta(seconds=0.3),
+        )
+        self.assertEqual(self.engine.stats()["io"]["scheduled"], 1)
+
+        self._wait_state(task, TaskState.FAILED)
+        self.assertGreaterEqual(time.time() - submitted, 0.25)
+        self.assertIn("job failed", task.reason)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+testing metrics.py
+"""
+
+import sys
+import threading
+import unittest
+
+sys.path.append("..")
+from core.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    StageClock,
+    StageTimer,
+    timed_lock,
+)
+
+
+class MetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_gauge(self):
+        counter = Counter("frames_total", "frames", registry=self.registry)
+        counter.inc()
+        counter.inc(2)
+        gauge = Gauge("bitrate", "bitrate", ["cctv"], registry=self.registry)
+        gauge.labels('a"b').set(1.5)
+        gauge.labels("c").set(2)
+        gauge.remove("c")
+        tasks = Gauge(
+            "tasks",
+            "tasks",
+            ["service", "state"],
+            registry=self.registry,
+            collect=lambda: {("record", "active"): 3},
+        )
+        tasks.labels("ignored", "active").set(10)
+
+        text = self.registry.render()
+        self.assertIn("# TYPE frames_total counter\nframes_total 3.0\n", text)
+        self.assertIn('bitrate{cctv="a\\"b"} 1.5', text)
+        self.assertNotIn('cctv="c"', text)
+        self.assertIn('tasks{service="record",state="active"} 3.0', text)
+        self.assertNotIn("ignored", text)
+
+        with self.assertRaises(ValueError):
+            Counter("frames_total", "frames", registry=self.registry)
+        with self.assertRaises(ValueError):
+            gauge.labels()
+
+    def test_histogram(self):
+        histogram = Histogram(
+            "latency", "latency", ["op"], registry=self.registry, buckets=(0.1, 1.0)
+        )
+        child = histogram.labels("get")
+        for value in [0.05, 0.1, 0.5, 5.0]:
+            child.observe(value)
+        self.assertEqual(child.buckets(), [(0.1, 2), (1.0, 3), (float("inf"), 4)])
+
+        text = self.registry.render()
+        self.assertIn('latency_bucket{op="get",le="0.1"} 2', text)
+        self.assertIn('latency_bucket{op="get",le="+Inf"} 4', text)
+        self.assertIn('latency_sum{op="get"} 5.65', text)
+        self.assertIn('latency_count{op="get"} 4', text)
+
+    def test_stage_timer(self):
+        histogram = Histogram("stage", "stage", ["stage"], registry=self.registry)
+        timer = StageTimer(histogram, ["decode", "inference"], every=5)
+        for _ in range(20):
+            timer.start()
+            timer.lap(0)
+            timer.lap(1)
+        self.assertEqual(histogram.labels("decode").count, 4)
+        self.assertEqual(histogram.labels("inference").count, 4)
+
+    def test_stage_clock(self):
+        clock = StageClock()
+        clock.stage("read")
+        clock.stage("save")
+        clock.stage("read")
+        clock.stage(None)
+        self.assertEqual(list(clock.durations), ["read", "save"])
+        self.assertTrue(all(d >= 0 for d in clock.durations.values()))
+
+    def test_timed_lock(self):
+        histogram = Histogram("wait", "wait", registry=self.registry)
+        lock = threading.Lock()
+        with timed_lock(lock, histogram.labels()):
+            self.assertTrue(lock.locked())
+        self.assertFalse(lock.locked())
+        self.assertEqual(histogram.labels().count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
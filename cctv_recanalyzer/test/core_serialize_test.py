@@ -0,0 +1,87 @@
+"""
+testing dumps in serialize.py and the cached list payload of TaskOutputFileRepo
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from pydantic import TypeAdapter
+
+sys.path.append("..")
+import core.serialize
+from core.model import CCTVStream, TaskItem, TaskOutput, TaskState
+from core.serialize import dumps, loads
+from repo.task_output_file import TaskOutputFileRepo
+
+TASKS = [
+    TaskItem(
+        id="task",
+        name="추적",
+        params={"cctv": "서울"},
+        state=TaskState.FINISHED,
+        reason="완료",
+        progress=1.0,
+        createdat=datetime(2024, 6, 12, 10, 0, 0, 123456),
+        stats={"wall_seconds": 1.5},
+    ),
+    TaskItem("pending", "추적", {}, TaskState.PENDING, "", 0.0, datetime(2024, 6, 12)),
+]
+OUTPUTS = [TaskOutput("task.csv", "text/csv", "결과", "task", {"fps": "30"})]
+STREAMS = [CCTVStream("cctv", 127.1, 37.5)]
+
+
+class SerializeTest(unittest.TestCase):
+
+    def test_same_as_pydantic(self):
+        # list endpoints bypass pydantic, the payload must stay the same
+        for items, model in [
+            (TASKS, list[TaskItem]),
+            (OUTPUTS, list[TaskOutput]),
+            (STREAMS, list[CCTVStream]),
+        ]:
+            expected = json.loads(TypeAdapter(model).dump_json(items))
+            self.assertEqual(loads(dumps(items)), expected)
+
+    def test_fallback(self):
+        expected = dumps(TASKS + OUTPUTS + STREAMS)
+        with mock.patch.object(core.serialize, "orjson", None):
+            self.assertEqual(dumps(TASKS + OUTPUTS + STREAMS), expected)
+            self.assertEqual(loads(expected), json.loads(expected))
+
+
+class TaskOutputFileRepoPayloadTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self.json_path = os.path.join(self._dir, "outputs.json")
+        self.repo = TaskOutputFileRepo(self.json_path, self._dir)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_invalidated_on_change(self):
+        self.assertEqual(loads(self.repo.get_all_json()), [])
+
+        self.repo.save(OUTPUTS[0])
+        self.repo.save(TaskOutput("other.csv", "text/csv", "", "other", {}))
+        names = [output["name"] for output in loads(self.repo.get_all_json())]
+        self.assertEqual(names, ["task.csv", "other.csv"])
+
+        self.repo.delete("task")
+        names = [output["name"] for output in loads(self.repo.get_all_json())]
+        self.assertEqual(names, ["other.csv"])
+
+        # persisted in the same format and loaded again
+        reloaded = TaskOutputFileRepo(self.json_path, self._dir)
+        self.assertEqual(reloaded.get_all(), self.repo.get_all())
+        self.assertEqual(reloaded.get_all_json(), self.repo.get_all_json())
+
+
+if __name__ == "__main__":
+    unittest.main()
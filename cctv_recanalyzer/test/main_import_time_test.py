@@ -0,0 +1,61 @@
+"""
+testing the import time of main.py (API startup)
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# modules that take seconds to import; loaded on first tracking use only
+HEAVY_MODULES = ["torch", "ultralytics", "deep_sort_realtime"]
+
+# generous budget for slow CI machines, override with MAIN_IMPORT_BUDGET_SECONDS
+IMPORT_BUDGET_SECONDS = float(os.getenv("MAIN_IMPORT_BUDGET_SECONDS", "5.0"))
+
+SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+print(",".join(name for name in sys.argv[1:] if name in sys.modules))
+"""
+
+
+class MainImportTimeTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_import_time(self):
+        env = {
+            **os.environ,
+            "JSON_DB_STORAGE": self._dir,
+            "TASK_OUTPUT_PATH": os.path.join(self._dir, "output"),
+            "ITS_API_KEY": "test",
+            "YOLO_MODEL_PATH": os.path.join(self._dir, "yolov8l.pt"),
+            "JOB_QUEUE_PATH": "",
+            "PRELOAD_TRACKING_MODULES": "false",
+        }
+        result = subprocess.run(
+            [sys.executable, "-c", SCRIPT, *HEAVY_MODULES],
+            cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."),
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        elapsed, loaded = result.stdout.splitlines()[-2:]
+        self.assertEqual(loaded, "", f"imported at startup: {loaded}")
+        self.assertLess(float(elapsed), IMPORT_BUDGET_SECONDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
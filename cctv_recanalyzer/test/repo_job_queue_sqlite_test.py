@@ -0,0 +1,109 @@
+"""
+testing JobQueueSQLiteRepo in job_queue_sqlite.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append("..")
+from core.model import QueuedJob, TaskOutput, TaskState
+from repo.job_queue_sqlite import JobQueueSQLiteRepo
+
+
+class JobQueueSQLiteRepoTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self.path = os.path.join(self._dir, "jobs.db")
+        self.queue = JobQueueSQLiteRepo(self.path, max_attempts=2)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _enqueue(self, id: str, kind: str = "tracking", priority: int = 0):
+        self.queue.enqueue(QueuedJob(id, kind, "test", {"p": id}, priority=priority))
+
+    def test_lease_order_and_exclusive(self):
+        self._enqueue("first")
+        self._enqueue("analysis", kind="analysis")
+        self._enqueue("high", priority=1)
+        with self.assertRaises(ValueError):
+            self._enqueue("first")
+
+        # another connection (process) sees the same queue
+        other = JobQueueSQLiteRepo(self.path)
+        job = other.lease("w1", ["tracking"], 10)
+        assert job is not None
+        self.assertEqual((job.id, job.state), ("high", TaskState.STARTED))
+        self.assertEqual((job.worker, job.attempts), ("w1", 1))
+        job = self.queue.lease("w2", ["tracking"], 10)
+        self.assertEqual(job.id, "first")  # type: ignore
+        self.assertIsNone(self.queue.lease("w2", ["tracking"], 10))
+        job = self.queue.lease("w2", ["analysis"], 10)
+        self.assertEqual(job.params, {"p": "analysis"})  # type: ignore
+
+        # only the lease owner can report
+        self.assertIsNone(
+            self.queue.update("high", "w2", TaskState.STARTED, "", 0.5, 10)
+        )
+        output = TaskOutput("high.csv", "text/csv", "desc", "high", {"cctv": "a"})
+        self.assertTrue(self.queue.add_output("high", "w1", output))
+        stats = {"wall_seconds": 1.5}
+        job = self.queue.update(
+            "high", "w1", TaskState.FINISHED, "done", 1.0, 10, stats
+        )
+        assert job is not None
+        self.assertEqual((job.state, job.leaseuntil), (TaskState.FINISHED, None))
+        self.assertEqual(job.outputs[0].metadata, {"cctv": "a"})
+        self.assertEqual(job.stats, stats)
+
+        versions = [job.version for job in self.queue.get_updated(0)]
+        self.assertEqual(versions, sorted(versions))
+        self.assertEqual(self.queue.get_updated(versions[-1]), [])
+
+    def test_lease_expiry(self):
+        self._enqueue("job")
+        self.queue.lease("w1", ["tracking"], 0.1)
+        self.queue.update("job", "w1", TaskState.STARTED, "running", 0.5, 0.1)
+        time.sleep(0.2)
+
+        # requeued once, then failed after max_attempts
+        self.assertEqual(self.queue.requeue_expired(), ["job"])
+        job = self.queue.get("job")
+        self.assertEqual((job.state, job.progress), (TaskState.PENDING, 0.0))
+        self.assertIsNone(job.worker)
+        self.assertIn("w1", job.reason)
+
+        job = self.queue.lease("w2", ["tracking"], 0.1)
+        self.assertEqual(job.attempts, 2)  # type: ignore
+        time.sleep(0.2)
+        self.assertIsNone(self.queue.lease("w3", ["tracking"], 0.1))
+        self.assertEqual(self.queue.get("job").state, TaskState.FAILED)
+        self.assertIsNone(
+            self.queue.update("job", "w2", TaskState.STARTED, "late", 0.5, 0.1)
+        )
+
+    def test_cancel(self):
+        self._enqueue("running")
+        self._enqueue("pending")
+        self.queue.lease("w1", ["tracking"], 10)
+
+        self.assertTrue(self.queue.cancel("running"))
+        job = self.queue.update("running", "w1", TaskState.STARTED, "", 0.1, 10)
+        self.assertTrue(job.canceled)  # type: ignore
+
+        self.assertTrue(self.queue.cancel("pending"))
+        self.assertEqual(self.queue.get("pending").state, TaskState.CANCELED)
+        self.assertFalse(self.queue.cancel("pending"))
+        self.assertIsNone(self.queue.lease("w2", ["tracking"], 10))
+
+        self.queue.delete("pending")
+        self.assertFalse(self.queue.cancel("pending"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+testing TaskResultCacheFileRepo in task_result_cache_file.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append("..")
+from core.model import TaskOutput
+from repo.task_result_cache_file import TaskResultCacheFileRepo
+
+
+class TaskResultCacheFileRepoTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self.repo = TaskResultCacheFileRepo(
+            os.path.join(self._dir, "cache.json"), self._dir, max_bytes=250
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _create_output(self, taskid: str, size: int) -> TaskOutput:
+        with open(os.path.join(self._dir, f"{taskid}.csv"), "wb") as f:
+            f.write(b"x" * size)
+        return TaskOutput(
+            name=f"{taskid}.csv", type="text/csv", desc="", taskid=taskid, metadata={}
+        )
+
+    def test_restore(self):
+        self.assertIsNone(self.repo.restore("key", "new-task"))
+
+        self.repo.put("key", [self._create_output("old-task", 100)])
+        outputs = self.repo.restore("key", "new-task")
+        self.assertIsNotNone(outputs)
+        self.assertEqual(outputs[0].name, "new-task.csv")  # type: ignore
+        self.assertEqual(outputs[0].taskid, "new-task")  # type: ignore
+        self.assertTrue(os.path.exists(os.path.join(self._dir, "new-task.csv")))
+
+        # 원본 결과가 삭제되어도 캐시는 유지된다.
+        os.remove(os.path.join(self._dir, "old-task.csv"))
+        self.assertIsNotNone(self.repo.restore("key", "another-task"))
+
+        stats = self.repo.stats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_lru_eviction(self):
+        self.repo.put("a", [self._create_output("task-a", 100)])
+        self.repo.put("b", [self._create_output("task-b", 100)])
+        self.repo.restore("a", "task-a2")  # a is now most recently used
+        self.repo.put("c", [self._create_output("task-c", 100)])
+
+        self.assertIsNone(self.repo.restore("b", "task-b2"))
+        self.assertIsNotNone(self.repo.restore("a", "task-a3"))
+        self.assertIsNotNone(self.repo.restore("c", "task-c2"))
+        self.assertEqual(self.repo.stats()["evictions"], 1)
+        self.assertLessEqual(self.repo.stats()["bytes"], 250)
+
+    def test_persistence(self):
+        self.repo.put("key", [self._create_output("task", 10)])
+        repo = TaskResultCacheFileRepo(
+            os.path.join(self._dir, "cache.json"), self._dir, max_bytes=250
+        )
+        self.assertIsNotNone(repo.restore("key", "new-task"))
+
+
+if __name__ == "__main__":
+    unittest.main()
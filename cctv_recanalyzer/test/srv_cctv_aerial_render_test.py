@@ -0,0 +1,357 @@
+"""
+testing render_aerial_video and CCTVAerialRenderTaskSrv in cctv_aerial_render.py
+(rendering split out of CCTVTrackingAnalysisTaskSrv)
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from unittest import mock
+
+sys.path.append("..")
+
+import unittest
+
+import cv2
+import numpy as np
+import pandas as pd
+import srv.video_frame_source
+from core.engine import ResourceClass, TaskEngine
+from core.model import TaskItem, TaskOutput, TaskState
+from repo.task_item_file import TaskItemJsonRepo
+from repo.task_output_file import TaskOutputFileRepo
+from srv.cctv_aerial_render import CCTVAerialRenderTaskSrv, render_aerial_video
+from srv.cctv_tracking_analysis import CCTVTrackingAnalysisTaskSrv
+from srv.output_tier import GZIP_SUFFIX, compress_file
+from srv.process_task_executor import ProcessTaskExecutor
+from srv.video_frame_source import FrameSource, OpenCVFrameSource
+
+GREEN = (0, 255, 0)
+
+
+class ListFrameSource(FrameSource):
+    """
+    미리 만든 프레임 목록을 순서대로 반환하는 프레임 소스
+    """
+
+    def __init__(self, frames: list[np.ndarray]):
+        super().__init__("")
+        self._frames = iter(frames)
+        self.src_height, self.src_width = frames[0].shape[:2]
+        self.frame_count = len(frames)
+
+    def read(self) -> np.ndarray | None:
+        return next(self._frames, None)
+
+    def release(self):
+        pass
+
+
+class ListWriter:
+    """
+    기록된 프레임을 복사하여 보관하는 cv2.VideoWriter 대용
+    """
+
+    def __init__(self):
+        self.frames: list[np.ndarray] = []
+
+    def write(self, frame: np.ndarray):
+        self.frames.append(frame.copy())
+
+
+def legacy_render_aerial_video(
+    frames: list[np.ndarray],
+    df: pd.DataFrame,
+    matrix: np.ndarray,
+    size: tuple[int, int],
+) -> list[np.ndarray]:
+    """
+    프레임마다 전체 데이터를 검색하고 iterrows / cv2.line으로 궤적을 그리던 이전 구현 (회귀 테스트 기준)
+    """
+    width, height = size
+    persp = np.empty((height, width, 3), dtype=np.uint8)
+    trail_history = {}
+    written = []
+    for frame_idx, frame in enumerate(frames):
+        frame_points = df[df["frame"] == frame_idx]
+        identities = frame_points["objid"].values
+
+        for key in list(trail_history.keys()):
+            if key not in identities:
+                trail_history.pop(key)
+
+        cv2.warpPerspective(frame, matrix, size, dst=persp)
+
+        for _, _row in frame_points.iterrows():
+            _id = _row["objid"]
+            _perspx = int(_row["perspx"])
+            _perspy = int(_row["perspy"])
+
+            trail: list = trail_history.get(_id, [])
+            trail.append((_perspx, _perspy))
+            trail_history[_id] = trail
+
+            for i in range(1, len(trail)):
+                cv2.line(persp, trail[i - 1], trail[i], GREEN, 1)
+
+        written.append(persp.copy())
+    return written
+
+
+def make_frames(count: int, size: tuple[int, int], seed: int = 0) -> list[np.ndarray]:
+    rng = np.random.default_rng(seed)
+    return [
+        rng.integers(0, 200, (size[1], size[0], 3), dtype=np.uint8)
+        for _ in range(count)
+    ]
+
+
+def make_tracks(count: int, size: tuple[int, int], seed: int = 0) -> pd.DataFrame:
+    """
+    객체들이 서로 다른 구간에 나타나 이동하는 분석 결과(perspx, perspy)를 생성한다.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for objid in range(1, 9):
+        first = int(rng.integers(0, count - 5))
+        last = int(rng.integers(first + 2, count))
+        x, y = rng.uniform(0, size[0]), rng.uniform(0, size[1])
+        vx, vy = rng.uniform(-4, 4, 2)
+        for frame in range(first, last):
+            # some objects disappear for a while (lost, then tracked again)
+            if objid % 3 == 0 and frame == (first + last) // 2:
+                continue
+            rows.append(
+                {
+                    "frame": frame,
+                    "objid": objid,
+                    "perspx": float(np.clip(x + vx * (frame - first), 0, size[0] - 1)),
+                    "perspy": float(np.clip(y + vy * (frame - first), 0, size[1] - 1)),
+                }
+            )
+    return pd.DataFrame(rows).sample(frac=1, random_state=seed)
+
+
+class RenderAerialVideoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.src_size = (160, 120)
+        self.size = (120, 160)
+        srcpoints = np.array([[40, 10], [0, 119], [120, 10], [159, 119]])
+        dstpoints = np.array([[0, 0], [0, 160], [120, 0], [120, 160]])
+        self.matrix = cv2.getPerspectiveTransform(
+            srcpoints.astype(np.float32), dstpoints.astype(np.float32)
+        )
+
+    def _render(self, frames, df, trail_length: int, matrix=None) -> list[np.ndarray]:
+        writer = ListWriter()
+        render_aerial_video(
+            ListFrameSource(frames),
+            writer,  # type: ignore
+            df,
+            self.matrix if matrix is None else matrix,
+            self.size,
+            trail_length,
+        )
+        return writer.frames
+
+    def test_same_as_legacy(self):
+        for seed in range(3):
+            frames = make_frames(40, self.src_size, seed)
+            df = make_tracks(40, self.size, seed)
+            expected = legacy_render_aerial_video(frames, df, self.matrix, self.size)
+            # a trail longer than the clip is never trimmed
+            actual = self._render(frames, df, trail_length=len(frames) + 1)
+            self.assertEqual(len(actual), len(expected))
+            for i, (a, e) in enumerate(zip(actual, expected)):
+                np.testing.assert_array_equal(a, e, err_msg=f"frame {i}")
+
+    def test_trail_length(self):
+        # one object moving right by 5px a frame over black frames
+        frames = [np.zeros((160, 120, 3), dtype=np.uint8) for _ in range(20)]
+        df = pd.DataFrame(
+            {"frame": range(20), "objid": 1, "perspx": 5.0, "perspy": range(0, 160, 8)}
+        )
+        identity = np.eye(3)
+        actual = self._render(frames, df, trail_length=5, matrix=identity)
+
+        drawn = np.argwhere((actual[-1] == GREEN).all(axis=2))
+        # only the last 5 points (frames 15..19: y = 120..152) are connected
+        self.assertEqual((drawn[:, 0].min(), drawn[:, 0].max()), (120, 152))
+        self.assertTrue((drawn[:, 1] == 5).all())
+
+    def test_lost_object(self):
+        frames = [np.zeros((160, 120, 3), dtype=np.uint8) for _ in range(12)]
+        df = pd.DataFrame(
+            {
+                "frame": [*range(10), 11],
+                "objid": 1,
+                "perspx": 10.0,
+                "perspy": [*range(0, 100, 10), 110],
+            }
+        )
+        actual = self._render(frames, df, trail_length=90, matrix=np.eye(3))
+
+        self.assertTrue((actual[9] == GREEN).all(axis=2).any())
+        # lost at frame 10: the trail is dropped and not continued at frame 11
+        self.assertFalse(actual[10].any())
+        self.assertFalse(actual[11].any())
+
+
+class SlowFrameSource(OpenCVFrameSource):
+    """
+    프레임마다 잠시 멈추는 프레임 소스 (실행 중인 렌더링 취소 테스트용)
+    """
+
+    def read(self) -> np.ndarray | None:
+        time.sleep(0.05)
+        return super().read()
+
+
+class AerialRenderTaskSrvTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = ProcessTaskExecutor(max_workers=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self.repo = TaskItemJsonRepo(os.path.join(self._dir, "tasks.json"))
+        self.output_repo = TaskOutputFileRepo(
+            os.path.join(self._dir, "outputs.json"), self._dir
+        )
+        self.engine = TaskEngine(self.repo, {r: 1 for r in ResourceClass})
+        self.render = CCTVAerialRenderTaskSrv(
+            self.repo, self._dir, self.output_repo, self.engine
+        )
+        self.analysis = CCTVTrackingAnalysisTaskSrv(
+            self.repo,
+            self._dir,
+            self.output_repo,
+            self.engine,
+            render_srv=self.render,
+            executor=self.executor,
+        )
+
+        # recorded video and its tracking result
+        writer = cv2.VideoWriter(
+            os.path.join(self._dir, "record.mp4"),
+            cv2.VideoWriter.fourcc(*"mp4v"),
+            30,
+            (160, 120),
+        )
+        for frame in make_frames(40, (160, 120)):
+            writer.write(frame)
+        writer.release()
+        track = pd.DataFrame(
+            [
+                {"frame": f, "objid": i, "clsid": 2, "x": 30 + 30 * i, "y": 20 + 2 * f}
+                for f in range(40)
+                for i in range(1, 4)
+            ]
+        )
+        track.to_csv(os.path.join(self._dir, "track.csv"), index=False)
+        self.output_repo.save(
+            TaskOutput(
+                "track.csv",
+                "text/csv",
+                "",
+                "tracking",
+                {"fps": "30", "targetname": "record.mp4", "cctv": "cctv"},
+            )
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _wait(self, task: TaskItem):
+        deadline = time.monotonic() + 60
+        while task.state in (TaskState.PENDING, TaskState.STARTED):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.02)
+
+    def _analyze(self, **params) -> TaskItem:
+        task = self.analysis.start(
+            {
+                "trackdata": "track.csv",
+                "roi": json.dumps([[20, 10], [0, 119], [140, 10], [159, 119]]),
+                "roadwidth": "10",
+                "roadheight": "20",
+                **params,
+            }
+        )
+        self._wait(task)
+        self.assertEqual(task.state, TaskState.FINISHED, task.reason)
+        return task
+
+    def _wait_render(self) -> TaskItem:
+        deadline = time.monotonic() + 10
+        while not self.render.get_tasks():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.02)
+        task = self.render.get_tasks()[0]
+        self._wait(task)
+        return task
+
+    def _assert_rendered(self, task: TaskItem):
+        self.assertEqual(task.state, TaskState.FINISHED, task.reason)
+        outputs = self.output_repo.get_by_taskid(task.id)
+        self.assertEqual(
+            [(o.name, o.type) for o in outputs], [(f"{task.id}.mp4", "video/mp4")]
+        )
+        cap = cv2.VideoCapture(os.path.join(self._dir, f"{task.id}.mp4"))
+        self.assertEqual(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 40)
+        cap.release()
+
+    def test_analysis_without_render(self):
+        task = self._analyze()
+        outputs = self.output_repo.get_by_taskid(task.id)
+        self.assertEqual({o.type for o in outputs}, {"text/csv"})
+        self.assertEqual(len(outputs), 3)
+        time.sleep(0.1)
+        self.assertEqual(self.render.get_tasks(), [])
+
+    def test_analysis_with_render(self):
+        task = self._analyze(render="true")
+        render_task = self._wait_render()
+        self.assertEqual(render_task.params["analysis"], f"{task.id}.csv")
+        self._assert_rendered(render_task)
+
+    def test_render_gzip_tiered(self):
+        task = self._analyze()
+        path = compress_file(os.path.join(self._dir, f"{task.id}.csv"))
+        self.assertTrue(path.endswith(GZIP_SUFFIX))
+
+        render_task = self.render.start({"analysis": f"{task.id}.csv"})
+        self._wait(render_task)
+        self._assert_rendered(render_task)
+
+    def test_cancel_render(self):
+        task = self._analyze()
+        self.render._decode_backend = "slow"
+        backends = srv.video_frame_source.FRAME_SOURCE_BACKENDS
+        with mock.patch.dict(backends, {"slow": SlowFrameSource}):
+            render_task = self.render.start({"analysis": f"{task.id}.csv"})
+            deadline = time.monotonic() + 10
+            while render_task.state != TaskState.STARTED:
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.01)
+
+            self.render.stop(render_task.id)
+            self._wait(render_task)
+
+        self.assertEqual(render_task.state, TaskState.CANCELED)
+        path = os.path.join(self._dir, f"{render_task.id}.mp4")
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.output_repo.get_by_taskid(render_task.id), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
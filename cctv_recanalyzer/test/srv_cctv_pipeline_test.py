@@ -0,0 +1,169 @@
+"""
+testing CCTVPipelineTaskSrv in cctv_pipeline.py
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from typing import Callable
+from uuid import uuid4
+
+sys.path.append("..")
+
+import pandas as pd
+from core.engine import JobContext, ResourceClass, TaskEngine
+from core.model import TaskItem, TaskParamMeta, TaskState
+from core.srv import TaskService
+from repo.task_item_file import TaskItemJsonRepo
+from repo.task_output_file import TaskOutputFileRepo
+from srv.cctv_pipeline import CCTVPipelineTaskSrv, split_segments
+
+
+class StageTaskSrv(TaskService):
+    """
+    run(task)을 엔진에서 실행하는 단계 작업 서비스
+    """
+
+    def __init__(
+        self, name: str, repo: TaskItemJsonRepo, engine: TaskEngine, run: Callable
+    ):
+        self.name = name
+        self.started: list[dict[str, str]] = []
+        self._repo = repo
+        self._engine = engine
+        self._run = run
+
+    def get_name(self) -> str:
+        return self.name
+
+    def get_params(self) -> list[TaskParamMeta]:
+        return []
+
+    def get_tasks(self) -> list[TaskItem]:
+        return self._repo.get_by_name(self.name)
+
+    def del_task(self, id: str):
+        self._repo.delete(id)
+
+    def start(self, params: dict[str, str]) -> TaskItem:
+        task = TaskItem(str(uuid4()), self.name, params, TaskState.PENDING, "", 0.0)
+        self._repo.add(task)
+        self.started.append(params)
+
+        def job(ctx: JobContext):
+            self._run(task)
+            self._repo.update(task.id, TaskState.FINISHED, "done")
+
+        self._engine.submit(task.id, ResourceClass.CPU_LIGHT, job)
+        return task
+
+    def stop(self, id: str):
+        self._engine.cancel(id)
+
+
+class CCTVPipelineTaskSrvTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self.repo = TaskItemJsonRepo(os.path.join(self._dir, "tasks.json"))
+        self.output_repo = TaskOutputFileRepo(
+            os.path.join(self._dir, "outputs.json"), self._dir
+        )
+        self.engine = TaskEngine(self.repo, {r: 4 for r in ResourceClass})
+
+        def write_flow(task: TaskItem):
+            pd.DataFrame(
+                {"bin": [0, 1], "lane": [0, 0], "start": [0.0, 0.5], "volume": [1, 2]}
+            ).to_csv(os.path.join(self._dir, f"{task.id}_flow.csv"), index=False)
+
+        self.record = StageTaskSrv("record", self.repo, self.engine, lambda t: None)
+        self.tracking = StageTaskSrv("tracking", self.repo, self.engine, lambda t: None)
+        self.analysis = StageTaskSrv("analysis", self.repo, self.engine, write_flow)
+        self.srv = CCTVPipelineTaskSrv(
+            self.repo,
+            self._dir,
+            self.output_repo,
+            self.engine,
+            self.record,
+            self.tracking,
+            self.analysis,
+        )
+        self.srv._poll_seconds = 0.01
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _params(self, **params) -> dict[str, str]:
+        startat = datetime(2024, 1, 1, 9, 0, 0)
+        return {
+            "cctv": "cctv",
+            "startat": startat.isoformat(),
+            "endat": (startat + timedelta(seconds=3)).isoformat(),
+            "roi": json.dumps([[0, 0], [0, 10], [10, 0], [10, 10]]),
+            "roadwidth": "10",
+            "roadheight": "20",
+            **params,
+        }
+
+    def _wait(self, task: TaskItem):
+        deadline = time.monotonic() + 10
+        while task.state in (TaskState.PENDING, TaskState.STARTED):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_split_segments(self):
+        startat = datetime(2024, 1, 1)
+        endat = startat + timedelta(seconds=150)
+        self.assertEqual(split_segments(startat, endat, 0), [(startat, endat)])
+        segments = split_segments(startat, endat, 60)
+        self.assertEqual(len(segments), 3)
+        self.assertEqual(segments[-1], (startat + timedelta(seconds=120), endat))
+
+    def test_pipeline(self):
+        task = self.srv.start(self._params(segmentsec="1", lanes="2"))
+        self._wait(task)
+        self.assertEqual(task.state, TaskState.FINISHED, task.reason)
+        self.assertEqual(task.progress, 1.0)
+
+        # each stage consumes the previous stage's output
+        self.assertEqual(len(self.record.started), 3)
+        self.assertEqual(len(self.analysis.started), 3)
+        # segments run concurrently, so stages are matched by name, not by order
+        segments = json.loads(task.params["segments"])
+        self.assertEqual(
+            sorted(params["targetname"] for params in self.tracking.started),
+            sorted(f"{segment['record']}.mp4" for segment in segments),
+        )
+        self.assertEqual(
+            sorted(params["trackdata"] for params in self.analysis.started),
+            sorted(f"{segment['tracking']}.csv" for segment in segments),
+        )
+        self.assertEqual({params["lanes"] for params in self.analysis.started}, {"2"})
+
+        flow = pd.read_csv(os.path.join(self._dir, f"{task.id}_flow.csv"))
+        self.assertEqual(flow["segment"].tolist(), [0, 0, 1, 1, 2, 2])
+        self.assertEqual(flow["start"].tolist(), [0.0, 0.5, 1.0, 1.5, 2.0, 2.5])
+        self.assertEqual(self.output_repo.get_by_taskid(task.id)[0].type, "text/csv")
+
+    def test_stage_failure(self):
+        def fail(task: TaskItem):
+            raise RuntimeError("tracking failed")
+
+        self.tracking._run = fail
+        task = self.srv.start(self._params())
+        self._wait(task)
+        self.assertEqual(task.state, TaskState.FAILED)
+        self.assertIn("tracking failed", task.reason)
+        self.assertEqual(self.analysis.started, [])
+
+        with self.assertRaises(ValueError):
+            self.srv.start(self._params(roi="[[0, 0]]"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,396 @@
+"""
+testing data processing functions in cctv_tracking_analysis.py
+"""
+
+import io
+import json
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+
+sys.path.append("..")
+
+import unittest
+
+import cv2
+import numpy as np
+import pandas as pd
+from srv.cctv_tracking_analysis import (
+    analyze_in_chunks,
+    calculate_speed,
+    interpolate_persp_data,
+    summarize_objects,
+    transform_persp_data,
+)
+from srv.cctv_tracking_batch_analysis import parse_roi_configs, run_batch_analysis
+from srv.process_task_executor import ProcessTaskContext
+from srv.traffic_flow import TrafficFlowAccumulator
+
+
+def legacy_interpolate_persp_data(persp_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    객체마다 pd.concat을 수행하던 이전 interpolate_persp_data 구현 (회귀 테스트 기준)
+    """
+    df = pd.DataFrame(columns=["objid", "frame"])
+
+    for objid in persp_df["objid"].unique():
+        temp_df: pd.DataFrame = persp_df[persp_df["objid"] == objid]
+        frames = temp_df["frame"].sort_values().values
+
+        col_frame = np.arange(frames[0], frames[-1] + 1)
+        df = pd.concat(
+            [df, pd.DataFrame({"objid": objid, "frame": col_frame})], ignore_index=True
+        )
+
+    df = df.join(
+        persp_df.set_index(["objid", "frame"]), on=["objid", "frame"], how="left"
+    )
+    df["clsid"] = df.groupby("objid")["clsid"].ffill().bfill()
+    for col in ["x", "y", "perspx", "perspy"]:
+        df[col] = (
+            df.groupby("objid")[col]
+            .apply(lambda x: x.interpolate(method="linear"))
+            .reset_index(drop=True)
+        )
+
+    return df
+
+
+def legacy_transform_persp_data(
+    df: pd.DataFrame, matrix: np.ndarray, roiwidth: int, roiheight: int
+) -> pd.DataFrame:
+    """
+    행마다 cv2.perspectiveTransform을 호출하던 이전 구현 (회귀 테스트 기준)
+    """
+
+    def transform(p):
+        return cv2.perspectiveTransform(np.array([[p]], dtype=np.float32), matrix)[0][0]
+
+    df = df.copy()
+    df["_src"] = list(zip(df["x"], df["y"]))
+    df["_dst"] = df["_src"].apply(transform)
+    df["perspx"] = df["_dst"].apply(lambda p: p[0])
+    df["perspy"] = df["_dst"].apply(lambda p: p[1])
+    df = df.drop(columns=["_src", "_dst"])
+
+    df = df[(df["perspx"] >= 0) & (df["perspx"] < roiwidth)]
+    df = df[(df["perspy"] >= 0) & (df["perspy"] < roiheight)]
+    return df
+
+
+def make_persp_data(num_objects: int, seed: int) -> pd.DataFrame:
+    """
+    objid 순서대로 등장하고, 일부 프레임이 누락된 추적 데이터를 생성한다.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for objid in range(1, num_objects + 1):
+        first = objid * 5 + int(rng.integers(0, 5))
+        length = int(rng.integers(1, 60))
+        frames = np.arange(first, first + length)
+        # drop random inner frames (keep first and last)
+        keep = rng.random(length) > 0.3
+        keep[0] = keep[-1] = True
+        clsid = int(rng.integers(0, 8))
+        for frame in frames[keep]:
+            rows.append(
+                {
+                    "frame": int(frame),
+                    "objid": objid,
+                    "clsid": clsid,
+                    "x": int(rng.integers(0, 1920)),
+                    "y": int(rng.integers(0, 1080)),
+                }
+            )
+
+    df = pd.DataFrame(rows).sort_values(by=["frame", "objid"], ignore_index=True)
+    df["perspx"] = (df["x"] * 0.5).astype(np.float32)
+    df["perspy"] = (df["y"] * 1.5).astype(np.float32)
+    return df
+
+
+class TransformPerspDataTest(unittest.TestCase):
+
+    def _assert_same_as_legacy(self, df, matrix, roiwidth, roiheight) -> pd.DataFrame:
+        expected = legacy_transform_persp_data(df, matrix, roiwidth, roiheight)
+        actual = transform_persp_data(df, matrix, roiwidth, roiheight)
+        self.assertEqual(actual.index.tolist(), expected.index.tolist())
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+        return actual
+
+    def test_same_as_legacy(self):
+        # a trapezoid ROI on a 1920x1080 image, with points around it
+        srcpoints = np.array([[600, 300], [100, 1000], [1300, 300], [1800, 1000]])
+        dstpoints = np.array([[0, 0], [0, 1500], [900, 0], [900, 1500]])
+        matrix = cv2.getPerspectiveTransform(
+            srcpoints.astype(np.float32), dstpoints.astype(np.float32)
+        )
+        for seed in range(3):
+            track = make_persp_data(num_objects=50, seed=seed)
+            df = track[["frame", "objid", "clsid", "x", "y"]]
+            actual = self._assert_same_as_legacy(df, matrix, 900, 1500)
+            self.assertGreater(len(actual), 0)
+            self.assertLess(len(actual), len(df))
+
+    def test_roi_edges(self):
+        # scale by 0.5: x=0/y=0 map onto the lower edges (kept),
+        # x=1800/y=1000 onto the upper edges (dropped)
+        matrix = np.array([[0.5, 0, 0], [0, 0.5, 0], [0, 0, 1]])
+        xs = [0, 1799, 1800, -1, 0, 0, 0, 1799]
+        ys = [0, 0, 0, 0, 999, 1000, -1, 999]
+        df = pd.DataFrame(
+            {"frame": range(len(xs)), "objid": 1, "clsid": 2, "x": xs, "y": ys}
+        )
+        actual = self._assert_same_as_legacy(df, matrix, 900, 500)
+        self.assertEqual(actual["frame"].tolist(), [0, 1, 4, 7])
+        self.assertEqual(actual["perspx"].tolist(), [0, 899.5, 0, 899.5])
+        self.assertEqual(actual["perspy"].tolist(), [0, 0, 499.5, 499.5])
+
+
+class InterpolatePerspDataTest(unittest.TestCase):
+
+    def test_same_as_legacy(self):
+        for seed in range(5):
+            persp_df = make_persp_data(num_objects=50, seed=seed)
+            expected = legacy_interpolate_persp_data(persp_df)
+            actual = interpolate_persp_data(persp_df)
+            pd.testing.assert_frame_equal(
+                actual.reset_index(drop=True),
+                expected.reset_index(drop=True),
+                check_dtype=False,
+            )
+
+    def test_fill_gap(self):
+        persp_df = pd.DataFrame(
+            {
+                "frame": [0, 4],
+                "objid": [7, 7],
+                "clsid": [2, 2],
+                "x": [0, 8],
+                "y": [0, 4],
+                "perspx": [0.0, 4.0],
+                "perspy": [0.0, 8.0],
+            }
+        )
+        df = interpolate_persp_data(persp_df)
+        self.assertEqual(df["frame"].tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(df["x"].tolist(), [0, 2, 4, 6, 8])
+        self.assertEqual(df["perspy"].tolist(), [0, 2, 4, 6, 8])
+        self.assertTrue((df["clsid"] == 2).all())
+
+
+class CalculateSpeedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.df = interpolate_persp_data(make_persp_data(num_objects=30, seed=42))
+
+    def test_same_as_legacy(self):
+        fps, meter_per_pixel, delta_frame = 30, 0.05, 5
+        df = calculate_speed(self.df, fps, meter_per_pixel, delta_frame=delta_frame)
+
+        # 객체마다 diff를 수행하던 이전 구현
+        expected = self.df.copy()
+        delta_time = delta_frame / fps
+        for objid in expected["objid"].unique():
+            spds = expected[expected["objid"] == objid]["perspy"].diff(delta_frame)
+            spds = (spds * (meter_per_pixel / delta_time)) * 3.6
+            expected.loc[expected["objid"] == objid, "speed"] = spds
+
+        np.testing.assert_allclose(df["speed"], expected["speed"], rtol=1e-6)
+
+    def test_frame_gap(self):
+        # object 1 leaves the ROI after frame 9 and comes back at frame 20
+        frames = np.concatenate([np.arange(10), np.arange(20, 30)])
+        df = pd.DataFrame(
+            {
+                "objid": 1,
+                "frame": frames,
+                "perspx": frames * 0.5,
+                "perspy": frames.astype(np.float64) ** 2,
+            }
+        )
+        actual = calculate_speed(df, 30, 0.05, delta_frame=5)
+
+        # no value is computed across the gap
+        across = (frames >= 20) & (frames < 25)
+        for col in ["speed", "accel", "heading"]:
+            self.assertTrue(actual.loc[across, col].isna().all(), col)
+
+        # rows with a contiguous history are computed as without the gap
+        for part in [df[frames < 10], df[frames >= 20]]:
+            expected = calculate_speed(part, 30, 0.05, delta_frame=5)
+            pd.testing.assert_frame_equal(actual.loc[part.index], expected)
+
+    def test_smoothing(self):
+        df = calculate_speed(self.df, 30, 0.05, delta_frame=3, smoothing=4)
+        raw = calculate_speed(self.df, 30, 0.05, delta_frame=3)
+        expected = raw.groupby("objid")["speed"].transform(
+            lambda s: s.rolling(4, min_periods=1).mean()
+        )
+        np.testing.assert_allclose(df["speed"], expected, rtol=1e-6)
+
+    def test_summary(self):
+        df = calculate_speed(self.df, 30, 0.05)
+        summary = summarize_objects(df, 30)
+        self.assertEqual(len(summary), self.df["objid"].nunique())
+        valid = summary.dropna()
+        self.assertTrue((valid["maxspeed"] >= valid["p85speed"]).all())
+        np.testing.assert_allclose(
+            summary["timeinroi"],
+            self.df.groupby("objid").size().to_numpy() / 30,
+        )
+
+
+class AnalyzeInChunksTest(unittest.TestCase):
+
+    def setUp(self):
+        self.fps, self.meter_per_pixel = 30, 0.1
+        self.matrix = np.array([[0.5, 0, 0], [0, 0.5, 0], [0, 0, 1]])
+        track = make_persp_data(num_objects=100, seed=7)
+        self.track = track[["frame", "objid", "clsid", "x", "y"]]
+
+    def _flow(self) -> TrafficFlowAccumulator:
+        return TrafficFlowAccumulator(
+            self.fps, self.meter_per_pixel, 900, road_length=50, bin_seconds=2
+        )
+
+    def _stream(self, chunk_rows: int, track: pd.DataFrame | None = None):
+        track = self.track if track is None else track
+        result_f, summary_f, flow = io.StringIO(), io.StringIO(), self._flow()
+        analyze_in_chunks(
+            io.BytesIO(track.to_csv(index=False).encode()),
+            self.matrix,
+            900,
+            500,
+            self.fps,
+            self.meter_per_pixel,
+            result_f,
+            summary_f,
+            flow,
+            delta_frame=5,
+            smoothing=3,
+            chunk_rows=chunk_rows,
+        )
+        result_f.seek(0)
+        summary_f.seek(0)
+        return pd.read_csv(result_f), pd.read_csv(summary_f), flow.result()
+
+    def test_same_as_in_memory(self):
+        df = transform_persp_data(self.track, self.matrix, 900, 500)
+        df = calculate_speed(
+            interpolate_persp_data(df),
+            self.fps,
+            self.meter_per_pixel,
+            delta_frame=5,
+            smoothing=3,
+        )
+        summary = summarize_objects(df, self.fps)
+        flow = self._flow()
+        flow.add(df)
+
+        for chunk_rows in [50, 500, 10**6]:
+            result, actual_summary, actual_flow = self._stream(chunk_rows)
+            pd.testing.assert_frame_equal(
+                result.sort_values(["objid", "frame"], ignore_index=True),
+                df.reset_index(drop=True),
+                check_dtype=False,
+                atol=1e-4,
+            )
+            pd.testing.assert_frame_equal(
+                actual_summary.sort_values("objid", ignore_index=True),
+                summary,
+                check_dtype=False,
+            )
+            pd.testing.assert_frame_equal(actual_flow, flow.result(), check_dtype=False)
+
+    def test_requires_frame_order(self):
+        track = self.track.sort_values(["objid", "frame"])
+        with self.assertRaises(ValueError):
+            self._stream(100, track)
+
+
+class BatchAnalysisTest(unittest.TestCase):
+
+    def test_parse_roi_configs(self):
+        roi = [[0, 0], [0, 1080], [1920, 0], [1920, 1080]]
+        config = parse_roi_configs(
+            json.dumps([{"roi": roi, "roadwidth": 16, "roadheight": 9}])
+        )[0]
+        self.assertEqual((config["roiwidth"], config["roiheight"]), (1920, 1080))
+
+        for rois in [
+            "not json",
+            json.dumps({"roi": roi, "roadwidth": 16, "roadheight": 9}),
+            json.dumps(5),
+            json.dumps([]),
+            json.dumps([{"roi": roi[:3], "roadwidth": 16, "roadheight": 9}]),
+            json.dumps([{"roi": roi, "roadwidth": 16}]),
+            json.dumps([{"roi": roi, "roadwidth": 0, "roadheight": 9}]),
+            json.dumps([{"roi": roi, "roadwidth": 16, "roadheight": -9}]),
+        ]:
+            with self.subTest(rois=rois), self.assertRaises(ValueError):
+                parse_roi_configs(rois)
+
+    def test_same_as_single_analysis(self):
+        # a rectangular ROI maps affinely, so interpolating in image space (batch) and
+        # in ROI space (single analysis) agree up to float32 rounding of the transform
+        track = make_persp_data(num_objects=40, seed=3)[
+            ["frame", "objid", "clsid", "x", "y"]
+        ]
+        roi = [[0, 0], [0, 1080], [1920, 0], [1920, 1080]]
+        config = parse_roi_configs(
+            json.dumps([{"roi": roi, "roadwidth": 16, "roadheight": 9}])
+        )[0]
+        matrix = cv2.getPerspectiveTransform(
+            np.array(config["srcpoints"], dtype=np.float32),
+            np.array(config["dstpoints"], dtype=np.float32),
+        )
+        fps, meter_per_pixel = 30, 9 / config["roiheight"]
+
+        result_f, summary_f = io.StringIO(), io.StringIO()
+        analyze_in_chunks(
+            io.BytesIO(track.to_csv(index=False).encode()),
+            matrix,
+            config["roiwidth"],
+            config["roiheight"],
+            fps,
+            meter_per_pixel,
+            result_f,
+            summary_f,
+            delta_frame=5,
+            smoothing=3,
+        )
+        result_f.seek(0)
+        expected = pd.read_csv(result_f).sort_values(["objid", "frame"])
+
+        outputs_path = tempfile.mkdtemp()
+        try:
+            track.to_csv(os.path.join(outputs_path, "track.csv"), index=False)
+            ctx = ProcessTaskContext("batch", queue.Queue(), threading.Event())
+            params = {
+                "trackdata": "track.csv",
+                "rois": json.dumps([{"roi": roi, "roadwidth": 16, "roadheight": 9}]),
+                "fps": str(fps),
+                "deltaframe": "5",
+                "smoothing": "3",
+            }
+            run_batch_analysis(ctx, outputs_path, "batch", params)
+            actual = pd.read_csv(os.path.join(outputs_path, "batch_roi0.csv"))
+        finally:
+            shutil.rmtree(outputs_path)
+
+        actual = actual.sort_values(["objid", "frame"])
+        self.assertEqual(len(actual), len(expected))
+        pd.testing.assert_frame_equal(
+            actual[expected.columns].reset_index(drop=True),
+            expected.reset_index(drop=True),
+            check_dtype=False,
+            atol=1e-3,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+testing JobQueueScheduler and JobWorker in job_queue.py (several worker processes)
+"""
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from uuid import uuid4
+
+sys.path.append("..")
+from core.engine import JobContext, ResourceClass, TaskEngine
+from core.model import TaskItem, TaskOutput, TaskState
+from repo.job_queue_sqlite import JobQueueSQLiteRepo
+from repo.task_item_file import TaskItemJsonRepo
+from repo.task_output_file import TaskOutputFileRepo
+from srv.job_queue import (
+    JobQueueScheduler,
+    JobRunner,
+    JobWorker,
+    QueuedTaskItemRepo,
+    QueuedTaskOutputRepo,
+)
+
+
+def run_worker(db_path: str, outputs_path: str, worker: str):
+    """
+    params["sec"]초 동안 진행률을 보고한 뒤 작업자 이름을 결과로 저장하는 작업자
+    """
+    queue = JobQueueSQLiteRepo(db_path)
+    task_repo = QueuedTaskItemRepo(queue, worker, lease_seconds=1.0)
+    output_repo = QueuedTaskOutputRepo(queue, worker)
+    engine = TaskEngine(task_repo, {r: 1 for r in ResourceClass})
+
+    def run(ctx: JobContext, task: TaskItem):
+        for i in range(10):
+            if ctx.wait(float(task.params["sec"]) / 10):
+                ctx.raise_if_canceled()
+            ctx.set_progress((i + 1) / 10, "running" if i == 0 else None)
+
+        name = f"{task.id}.txt"
+        with open(os.path.join(outputs_path, name), "w") as f:
+            f.write(worker)
+        output_repo.save(
+            TaskOutput(name, "text/plain", "test", task.id, {"worker": worker})
+        )
+        task.stats = {"worker": len(worker)}
+        task_repo.update(task.id, TaskState.FINISHED, "done")
+
+    JobWorker(
+        queue,
+        engine,
+        task_repo,
+        {"test": JobRunner(ResourceClass.CPU_HEAVY, run)},
+        worker,
+        lease_seconds=1.0,
+        heartbeat_seconds=0.2,
+        poll_seconds=0.05,
+    ).run(threading.Event())
+
+
+class JobQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self._dir, "jobs.db")
+        self.queue = JobQueueSQLiteRepo(self.db_path)
+        self.task_repo = TaskItemJsonRepo(os.path.join(self._dir, "tasks.json"))
+        self.output_repo = TaskOutputFileRepo(
+            os.path.join(self._dir, "outputs.json"), self._dir
+        )
+        self.scheduler = JobQueueScheduler(
+            self.queue, self.task_repo, self.output_repo, poll_seconds=0.05
+        )
+        self.workers: dict[str, multiprocessing.process.BaseProcess] = {}
+        self.finished: list[str] = []
+
+    def tearDown(self):
+        for process in self.workers.values():
+            process.kill()
+            process.join()
+        shutil.rmtree(self._dir)
+
+    def _start_worker(self, worker: str):
+        process = multiprocessing.get_context("spawn").Process(
+            target=run_worker, args=(self.db_path, self._dir, worker), daemon=True
+        )
+        process.start()
+        self.workers[worker] = process
+
+    def _submit(self, sec: float) -> TaskItem:
+        params = {"sec": str(sec)}
+        task = TaskItem(str(uuid4()), "test", params, TaskState.PENDING, "", 0.0)
+        self.task_repo.add(task)
+        self.scheduler.submit(
+            "test", task, on_finished=lambda t, o: self.finished.append(t.id)
+        )
+        return task
+
+    def _wait_state(self, task: TaskItem, state: TaskState, timeout: float = 30):
+        deadline = time.monotonic() + timeout
+        while task.state != state and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(task.state, state, task.reason)
+
+    def test_workers(self):
+        for worker in ["a", "b", "c"]:
+            self._start_worker(worker)
+        tasks = [self._submit(0.3) for _ in range(6)]
+
+        for task in tasks:
+            self._wait_state(task, TaskState.FINISHED)
+            self.assertEqual(task.progress, 1.0)
+            self.assertEqual(task.stats, {"worker": 1})
+
+        # each job ran once and its outputs were registered once
+        workers = set()
+        for task in tasks:
+            outputs = self.output_repo.get_by_taskid(task.id)
+            self.assertEqual(len(outputs), 1)
+            workers.add(outputs[0].metadata["worker"])
+        self.assertGreater(len(workers), 1)
+        self.assertCountEqual(self.finished, [task.id for task in tasks])
+
+        # finished jobs are removed from the queue
+        self.assertEqual(self.queue.get_updated(0), [])
+
+    def test_worker_crash(self):
+        self._start_worker("a")
+        task = self._submit(2.0)
+        self._wait_state(task, TaskState.STARTED)
+
+        # the lease expires and another worker runs the job again
+        self.workers["a"].kill()
+        self._start_worker("b")
+        self._wait_state(task, TaskState.FINISHED)
+        output = self.output_repo.get_by_taskid(task.id)[0]
+        self.assertEqual(output.metadata["worker"], "b")
+
+    def test_cancel(self):
+        pending = self._submit(30)
+        self.assertTrue(self.scheduler.cancel(pending.id))
+        self.assertEqual(pending.state, TaskState.CANCELED)
+
+        self._start_worker("a")
+        running = self._submit(30)
+        self._wait_state(running, TaskState.STARTED)
+        self.assertTrue(self.scheduler.cancel(running.id))
+        self._wait_state(running, TaskState.CANCELED, timeout=5)
+        self.assertEqual(self.output_repo.get_by_taskid(running.id), [])
+        self.assertFalse(self.scheduler.cancel(running.id))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+testing output_file_response in output_file.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append("..")
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from srv.output_file import RangeNotSatisfiable, output_file_response, parse_range
+from srv.output_tier import compress_file
+
+
+class ParseRangeTest(unittest.TestCase):
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_range("bytes=900-", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=990-2000", 1000), (990, 999))
+        self.assertIsNone(parse_range("bytes=0-1,5-9", 1000))
+        self.assertIsNone(parse_range("items=0-1", 1000))
+        self.assertIsNone(parse_range("bytes=x-1", 1000))
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range("bytes=1000-", 1000)
+
+
+class OutputFileResponseTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self.video = os.urandom(1_000_000)
+        with open(os.path.join(self._dir, "video.mp4"), "wb") as f:
+            f.write(self.video)
+        self.csv = b"".join(b"%d,1,2,3\n" % i for i in range(10000))
+        with open(os.path.join(self._dir, "data.csv"), "wb") as f:
+            f.write(self.csv)
+
+        app = FastAPI()
+
+        @app.api_route("/file/{name}", methods=["GET", "HEAD"])
+        def get_file(request: Request, name: str):
+            media_type = "video/mp4" if name.endswith(".mp4") else "text/csv"
+            return output_file_response(
+                os.path.join(self._dir, name),
+                media_type,
+                request.method,
+                request.headers,
+            )
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_range(self):
+        res = self.client.get("/file/video.mp4", headers={"Range": "bytes=100-199"})
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(res.content, self.video[100:200])
+        self.assertEqual(res.headers["content-range"], "bytes 100-199/1000000")
+
+        res = self.client.head("/file/video.mp4", headers={"Range": "bytes=-10"})
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(res.headers["content-length"], "10")
+
+        res = self.client.get("/file/video.mp4", headers={"Range": "bytes=2000000-"})
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res.headers["content-range"], "bytes */1000000")
+
+    def test_conditional(self):
+        res = self.client.get("/file/video.mp4")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, self.video)
+        etag = res.headers["etag"]
+
+        res = self.client.get("/file/video.mp4", headers={"If-None-Match": etag})
+        self.assertEqual(res.status_code, 304)
+
+        # a stale If-Range sends the whole file
+        headers = {"Range": "bytes=0-9", "If-Range": '"stale"'}
+        res = self.client.get("/file/video.mp4", headers=headers)
+        self.assertEqual(res.status_code, 200)
+        headers["If-Range"] = etag
+        res = self.client.get("/file/video.mp4", headers=headers)
+        self.assertEqual(res.status_code, 206)
+
+    def test_gzip(self):
+        res = self.client.get("/file/data.csv", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.headers["content-encoding"], "gzip")
+        # httpx decodes the body
+        self.assertEqual(res.content, self.csv)
+
+        res = self.client.get(
+            "/file/data.csv",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": res.headers["etag"]},
+        )
+        self.assertEqual(res.status_code, 304)
+
+        res = self.client.get("/file/data.csv", headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("content-encoding", res.headers)
+        self.assertEqual(res.content, self.csv)
+
+    def test_gzip_stored(self):
+        compress_file(os.path.join(self._dir, "data.csv"))
+
+        res = self.client.get("/file/data.csv", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.headers["content-encoding"], "gzip")
+        self.assertEqual(res.content, self.csv)
+
+        res = self.client.get("/file/data.csv", headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("content-encoding", res.headers)
+        self.assertEqual(res.content, self.csv)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+testing OutputStorageManager in output_storage.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.append("..")
+from core.model import TaskItem, TaskOutput, TaskState
+from repo.task_output_file import TaskOutputFileRepo
+from srv.output_storage import OutputStorageManager
+
+
+class OutputStorageManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self.json_path = os.path.join(self._dir, "outputs.json")
+        self.repo = TaskOutputFileRepo(self.json_path, self._dir)
+        self.tasks: list[TaskItem] = []
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _manager(self, **kwargs) -> OutputStorageManager:
+        storage = OutputStorageManager(
+            self._dir, self.repo, lambda: self.tasks, **kwargs
+        )
+        self.repo.add_save_listener(storage.on_output_saved)
+        return storage
+
+    def _save(self, taskid: str, size: int, cctv: str = "cctv", **kwargs):
+        with open(os.path.join(self._dir, f"{taskid}.mp4"), "wb") as f:
+            f.write(b"x" * size)
+        metadata = {"cctv": cctv}
+        self.repo.save(
+            TaskOutput(f"{taskid}.mp4", "video/mp4", "", taskid, metadata, **kwargs)
+        )
+
+    def _taskids(self) -> list[str]:
+        return [output.taskid for output in self.repo.get_all()]
+
+    def test_quota_lru(self):
+        storage = self._manager(quota_bytes=250)
+        self._save("a", 100)
+        time.sleep(0.01)
+        self._save("b", 100)
+        storage.touch("a.mp4")  # b is now the least recently used
+
+        self._save("c", 100)
+        self.assertEqual(self._taskids(), ["a", "c"])
+        self.assertFalse(os.path.exists(os.path.join(self._dir, "b.mp4")))
+
+    def test_pinned_and_active(self):
+        storage = self._manager(quota_bytes=250, policy="age")
+        self._save("pinned", 100, pinned=True)
+        self._save("input", 100)
+        # the running task "new" reads input.mp4
+        self.tasks.append(
+            TaskItem("new", "추적", {"targetname": "input.mp4"}, TaskState.STARTED, "", 0)
+        )
+
+        self._save("new", 100)
+        self.assertEqual(self._taskids(), ["pinned", "input", "new"])
+
+        self.tasks.clear()
+        storage.enforce()
+        self.assertEqual(self._taskids(), ["pinned", "new"])
+
+    def test_reserve(self):
+        storage = self._manager(quota_bytes=250)
+        self._save("a", 100)
+
+        storage.reserve("record", 200)  # evicts a
+        self.assertEqual(self._taskids(), [])
+        with self.assertRaises(ValueError):
+            storage.reserve("other", 100)
+
+        storage.release("record")
+        storage.reserve("other", 100)
+        self.assertEqual(storage.usage()["reserved_bytes"], 100)
+
+    def test_reserve_written(self):
+        storage = self._manager(min_free_bytes=150)
+        self._save("a", 100)
+        free = {"bytes": 450}
+        with mock.patch.object(storage, "_free_bytes", lambda: free["bytes"]):
+            path = os.path.join(self._dir, "record.mp4")
+            storage.reserve("record", 200, path)
+
+            # 150 of the reserved bytes are written and already gone from the disk
+            with open(path, "wb") as f:
+                f.write(b"x" * 150)
+            free["bytes"] = 300
+            storage.enforce()
+            self.assertEqual(self._taskids(), ["a"])
+
+    def test_hard_linked(self):
+        storage = self._manager(min_free_bytes=150)
+        self._save("a", 100)
+        self._save("b", 100)
+        # a is also kept by the result cache, deleting it frees nothing
+        os.link(os.path.join(self._dir, "a.mp4"), os.path.join(self._dir, "cached.mp4"))
+
+        def free_bytes() -> int:
+            b_exists = os.path.exists(os.path.join(self._dir, "b.mp4"))
+            return 100 if b_exists else 200
+
+        with mock.patch.object(storage, "_free_bytes", free_bytes):
+            storage.enforce()
+        self.assertEqual(self._taskids(), ["a"])
+
+    def test_max_age(self):
+        storage = self._manager(max_age_seconds=3600)
+        self._save("old", 100, createdat=datetime.now() - timedelta(hours=2))
+        self._save("new", 100)
+        storage.enforce()
+        self.assertEqual(self._taskids(), ["new"])
+
+    def test_usage(self):
+        storage = self._manager()
+        self.tasks.append(TaskItem("a", "CCTV 녹화", {}, TaskState.FINISHED, "", 1))
+        self._save("a", 100, cctv="x")
+        self._save("b", 50, cctv="y", pinned=True)
+
+        usage = storage.usage()
+        self.assertEqual(usage["used_bytes"], 150)
+        self.assertEqual(usage["pinned_bytes"], 50)
+        self.assertEqual(usage["by_cctv"], {"x": 100, "y": 50})
+        self.assertEqual(usage["by_task"], {"CCTV 녹화": 100, "N/A": 50})
+
+        # sizes are persisted with the outputs
+        reloaded = TaskOutputFileRepo(self.json_path, self._dir)
+        self.assertEqual([output.size for output in reloaded.get_all()], [100, 50])
+
+
+if __name__ == "__main__":
+    unittest.main()
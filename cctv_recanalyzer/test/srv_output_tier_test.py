@@ -0,0 +1,106 @@
+"""
+testing OutputTieringJob and the compressed output readers in output_tier.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import cv2
+import numpy as np
+import pandas as pd
+
+sys.path.append("..")
+from core.model import TaskItem, TaskOutput, TaskState
+from repo.task_output_file import TaskOutputFileRepo
+from srv.output_storage import OutputStorageManager
+from srv.output_tier import (
+    TIER_GZIP,
+    TIER_KEY,
+    TIER_TRANSCODED,
+    OutputTieringJob,
+    decompressed,
+    output_path,
+)
+
+
+class OutputTieringJobTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self.repo = TaskOutputFileRepo(os.path.join(self._dir, "outputs.json"), self._dir)
+        self.tasks: list[TaskItem] = []
+        storage = OutputStorageManager(self._dir, self.repo, lambda: self.tasks)
+        self.job = OutputTieringJob(
+            self._dir,
+            self.repo,
+            storage,
+            video_idle_seconds=3600,
+            text_idle_seconds=3600,
+        )
+        self.old = datetime.now() - timedelta(hours=2)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _save_csv(self, taskid: str, createdat: datetime) -> pd.DataFrame:
+        df = pd.DataFrame({"frame": range(1000), "objid": 1, "x": 10, "y": 20})
+        df.to_csv(os.path.join(self._dir, f"{taskid}.csv"), index=False)
+        self.repo.save(
+            TaskOutput(f"{taskid}.csv", "text/csv", "", taskid, {}, createdat=createdat)
+        )
+        return df
+
+    def test_gzip(self):
+        df = self._save_csv("old", self.old)
+        self._save_csv("new", datetime.now())
+
+        self.assertEqual(self.job.run_once(), ["old.csv"])
+        output = self.repo.get_by_name("old.csv")
+        self.assertEqual(output.metadata[TIER_KEY], TIER_GZIP)
+
+        path = output_path(self._dir, "old.csv")
+        self.assertEqual(path, os.path.join(self._dir, "old.csv.gz"))
+        self.assertEqual(output.size, os.path.getsize(path))
+        pd.testing.assert_frame_equal(pd.read_csv(path), df)
+        with open(path, "rb") as f:
+            pd.testing.assert_frame_equal(pd.read_csv(decompressed(f)), df)
+
+        # already moved
+        self.assertEqual(self.job.run_once(), [])
+
+        self.repo.delete("old")
+        self.assertFalse(os.path.exists(path))
+
+    def test_in_use(self):
+        self._save_csv("old", self.old)
+        self.tasks.append(
+            TaskItem("analysis", "분석", {"trackdata": "old.csv"}, TaskState.STARTED, "", 0)
+        )
+        self.assertEqual(self.job.run_once(), [])
+
+    @unittest.skipUnless(shutil.which("ffmpeg"), "ffmpeg is not installed")
+    def test_transcode(self):
+        path = os.path.join(self._dir, "old.mp4")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter.fourcc(*"mp4v"), 30, (640, 360))
+        rng = np.random.default_rng(0)
+        for _ in range(30):
+            writer.write(rng.integers(0, 255, (360, 640, 3), dtype=np.uint8))
+        writer.release()
+        self.repo.save(TaskOutput("old.mp4", "video/mp4", "", "old", {}, createdat=self.old))
+
+        self.assertEqual(self.job.run_once(), ["old.mp4"])
+        output = self.repo.get_by_name("old.mp4")
+        self.assertEqual(output.metadata[TIER_KEY], TIER_TRANSCODED)
+        # pixel coordinates of tracking results stay valid
+        cap = cv2.VideoCapture(path)
+        self.assertEqual(cap.get(cv2.CAP_PROP_FRAME_WIDTH), 640)
+        self.assertEqual(cap.get(cv2.CAP_PROP_FRAME_HEIGHT), 360)
+        cap.release()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+testing ProcessTaskExecutor in process_task_executor.py
+"""
+
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append("..")
+
+from core.model import TaskCancelException
+from srv.process_task_executor import ProcessTaskContext, ProcessTaskExecutor
+
+
+def report_progress(ctx: ProcessTaskContext, steps: int) -> int:
+    for i in range(steps):
+        ctx.set_progress((i + 1) / steps, f"step {i + 1}")
+    return steps
+
+
+def wait_for_cancel(ctx: ProcessTaskContext):
+    ctx.set_progress(0.0, "started")
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        ctx.raise_if_canceled("canceled")
+        time.sleep(0.01)
+
+
+def fail(ctx: ProcessTaskContext):
+    raise RuntimeError("failed in worker")
+
+
+class ProcessTaskExecutorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = ProcessTaskExecutor(max_workers=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def test_progress(self):
+        reports = []
+        done = threading.Event()
+
+        def on_progress(progress, reason):
+            reports.append((progress, reason))
+            if progress == 1.0:
+                done.set()
+
+        future = self.executor.submit(
+            "progress", report_progress, 4, on_progress=on_progress
+        )
+        self.assertEqual(future.result(timeout=60), 4)
+        self.assertTrue(done.wait(timeout=10))
+        self.assertEqual(reports[-1], (1.0, "step 4"))
+
+    def test_cancel_running_and_pending(self):
+        started = threading.Event()
+        running = self.executor.submit(
+            "running",
+            wait_for_cancel,
+            on_progress=lambda progress, reason: started.set(),
+        )
+        # max_workers=1: the second job waits in the queue
+        pending = self.executor.submit(
+            "pending", wait_for_cancel, on_progress=lambda *_: None
+        )
+        self.assertTrue(started.wait(timeout=60))
+
+        self.assertTrue(self.executor.cancel("pending"))
+        self.assertTrue(self.executor.cancel("running"))
+        self.assertFalse(self.executor.cancel("unknown"))
+
+        with self.assertRaises(TaskCancelException):
+            running.result(timeout=30)
+        # a queued job may already be handed to the pool's call queue,
+        # in which case it stops on its first cancellation check
+        self.assertTrue(
+            pending.cancelled()
+            or isinstance(pending.exception(timeout=30), TaskCancelException)
+        )
+
+    def test_exception(self):
+        future = self.executor.submit("fail", fail, on_progress=lambda *_: None)
+        with self.assertRaises(RuntimeError):
+            future.result(timeout=60)
+
+
+if __name__ == "__main__":
+    unittest.main()
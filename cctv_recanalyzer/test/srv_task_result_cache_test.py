@@ -0,0 +1,82 @@
+"""
+testing file_digest, prefetch_digest and make_cache_key in task_result_cache.py
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append("..")
+from core.model import TaskOutput
+from srv.task_result_cache import (
+    file_digest,
+    make_cache_key,
+    prefetch_digest,
+    prefetch_output_digest,
+)
+
+
+class FileDigestTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self._dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_small_file(self):
+        data = b"frame,objid\n0,1\n"
+        path = self._write("small.csv", data)
+        self.assertEqual(file_digest(path), hashlib.sha256(data).hexdigest())
+
+    def test_whole_content(self):
+        data = os.urandom(3 * 1024 * 1024)
+        digest = file_digest(self._write("video.mp4", data))
+        self.assertEqual(digest, hashlib.sha256(data).hexdigest())
+
+        # keyed on content, not on the path
+        self.assertEqual(file_digest(self._write("copy.mp4", data)), digest)
+        changed = bytearray(data)
+        changed[len(data) // 2 + 12345] ^= 0xFF
+        path = self._write("changed.mp4", bytes(changed))
+        self.assertNotEqual(file_digest(path), digest)
+
+    def test_prefetch(self):
+        data = os.urandom(1024 * 1024)
+        path = self._write("record.mp4", data)
+        future = prefetch_digest(path)
+        assert future is not None
+        self.assertEqual(future.result(10), hashlib.sha256(data).hexdigest())
+        self.assertIsNone(prefetch_digest(path))
+
+        # restored outputs are hard links of the cached file and share the digest
+        linked = os.path.join(self._dir, "restored.mp4")
+        os.link(path, linked)
+        self.assertIsNone(prefetch_digest(linked))
+
+        csv = TaskOutput("track.csv", "text/csv", "", "task", {})
+        self._write("track.csv", b"frame,objid\n")
+        prefetch_output_digest(self._dir, csv)
+        csv_path = os.path.join(self._dir, "track.csv")
+        expected = hashlib.sha256(b"frame,objid\n").hexdigest()
+        self.assertEqual(file_digest(csv_path), expected)
+        self.assertIsNone(prefetch_digest(csv_path))
+
+    def test_cache_key(self):
+        path = self._write("track.csv", b"frame,objid\n")
+        key = make_cache_key("analysis", "1", [path], {"roi": "[]"})
+        self.assertEqual(key, make_cache_key("analysis", "1", [path], {"roi": "[]"}))
+        self.assertNotEqual(key, make_cache_key("analysis", "2", [path], {"roi": "[]"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+testing TaskUsage and profiling helpers in task_usage.py
+"""
+
+import os
+import pstats
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append("..")
+from srv.process_task_executor import ProcessTaskContext, ProcessTaskExecutor
+from srv.task_usage import TaskUsage, profiled, run_measured
+
+
+def busy(seconds: float):
+    deadline = time.process_time() + seconds
+    while time.process_time() < deadline:
+        pass
+
+
+def write_and_busy(ctx: ProcessTaskContext, path: str) -> str:
+    with open(path, "wb") as f:
+        f.write(b"\0" * 1024 * 1024)
+    busy(0.1)
+    return "done"
+
+
+class TaskUsageTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_self(self):
+        usage = TaskUsage()
+        with open(os.path.join(self._dir, "out.bin"), "wb") as f:
+            f.write(b"\0" * 1024 * 1024)
+        busy(0.1)
+
+        stats = usage.stats(frames=10)
+        self.assertGreater(stats["wall_seconds"], 0)
+        self.assertGreaterEqual(stats["cpu_seconds"], 0.05)
+        self.assertGreaterEqual(stats["write_bytes"], 1024 * 1024)
+        self.assertGreater(stats["peak_rss_bytes"], 0)
+        self.assertEqual(stats["frames"], 10)
+        self.assertGreater(stats["frames_per_second"], 0)
+
+    def test_external_process(self):
+        script = "import time\nt = time.time()\nwhile time.time() - t < 0.5: pass"
+        process = subprocess.Popen([sys.executable, "-c", script])
+        usage = TaskUsage(process.pid)
+        while process.poll() is None:
+            usage.sample()
+            time.sleep(0.05)
+
+        # the last sample taken while the process was running is kept
+        stats = usage.stats()
+        self.assertGreater(stats["cpu_seconds"], 0)
+        self.assertGreater(stats["peak_rss_bytes"], 0)
+
+    def test_run_measured(self):
+        executor = ProcessTaskExecutor(max_workers=1)
+        prof_path = os.path.join(self._dir, "task.prof")
+        try:
+            future = executor.submit(
+                "task",
+                run_measured,
+                prof_path,
+                write_and_busy,
+                os.path.join(self._dir, "out.bin"),
+                on_progress=lambda progress, reason: None,
+            )
+            result, stats = future.result(timeout=60)
+        finally:
+            executor.shutdown()
+
+        self.assertEqual(result, "done")
+        self.assertGreaterEqual(stats["write_bytes"], 1024 * 1024)
+        functions = [func[2] for func in pstats.Stats(prof_path).stats]  # type: ignore
+        self.assertIn("busy", functions)
+
+    def test_profiled_failure(self):
+        prof_path = os.path.join(self._dir, "task.prof")
+        with self.assertRaises(RuntimeError):
+            with profiled(prof_path):
+                raise RuntimeError()
+        self.assertFalse(os.path.exists(prof_path))
+
+        with profiled(None):
+            pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+testing traffic flow aggregation in traffic_flow.py
+"""
+
+import sys
+
+sys.path.append("..")
+
+import unittest
+
+import numpy as np
+import pandas as pd
+from srv.cctv_tracking_analysis import calculate_speed
+from srv.traffic_flow import aggregate_traffic_flow, flow_partials, merge_flow_partials
+
+
+class AggregateTrafficFlowTest(unittest.TestCase):
+
+    def setUp(self):
+        # 0.5 m/pixel, 1 pixel/frame, 30 fps -> 15 m/s = 54 km/h
+        # object 1: lane 0, frames 0..199 / object 2: lane 1, frames 100..299
+        self.fps = 30
+        self.meter_per_pixel = 0.5
+        frames1 = np.arange(0, 200)
+        frames2 = np.arange(100, 300)
+        df = pd.DataFrame(
+            {
+                "objid": np.r_[np.full(200, 1), np.full(200, 2)],
+                "frame": np.r_[frames1, frames2],
+                "clsid": 2,
+                "perspx": np.r_[np.full(200, 5.0), np.full(200, 30.0)],
+                "perspy": np.r_[frames1, frames2 - 100].astype(np.float64),
+            }
+        )
+        self.df = calculate_speed(df, self.fps, self.meter_per_pixel, delta_frame=5)
+
+    def _aggregate(self, df: pd.DataFrame) -> pd.DataFrame:
+        return aggregate_traffic_flow(
+            df,
+            self.fps,
+            self.meter_per_pixel,
+            roiwidth=40,
+            road_length=100,
+            bin_seconds=5,
+            line=50,
+            zone=5,
+            lanes=2,
+        ).set_index(["bin", "lane"])
+
+    def test_aggregate(self):
+        flow = self._aggregate(self.df)
+
+        self.assertEqual(len(flow), 4)  # 2 bins x 2 lanes
+        self.assertEqual(flow.loc[(0, 0), "volume"], 1)
+        self.assertEqual(flow.loc[(0, 1), "volume"], 0)
+        self.assertEqual(flow.loc[(1, 1), "volume"], 1)
+        self.assertAlmostEqual(flow.loc[(0, 0), "flow"], 3600 / 5)
+        self.assertAlmostEqual(flow.loc[(0, 0), "tms"], 54.0)
+        self.assertAlmostEqual(flow.loc[(1, 1), "sms"], 54.0)
+        self.assertTrue(np.isnan(flow.loc[(0, 1), "tms"]))
+
+        # object 1 is in lane 0 for the whole first bin: 1 vehicle / 0.1 km
+        self.assertAlmostEqual(flow.loc[(0, 0), "density"], 10.0)
+        # 5 m zone = 10 pixels -> 11 frames occupied out of 150
+        self.assertAlmostEqual(flow.loc[(0, 0), "occupancy"], 11 / 150)
+
+    def test_merge_partials(self):
+        args = dict(roiwidth=40, bin_frames=150, line_px=100, zone_px=10, lanes=2)
+        whole = flow_partials(self.df, **args)
+
+        # split rows by frame (no crossing happens at the boundary)
+        parts = [
+            flow_partials(self.df[self.df["frame"] < 150], **args),
+            flow_partials(self.df[self.df["frame"] >= 150], **args),
+        ]
+        merged = merge_flow_partials(parts)
+        pd.testing.assert_frame_equal(
+            merged.sort_index(), whole.sort_index(), check_dtype=False
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+testing TrajectoryIndex, TrajectoryIndexStore in trajectory_index.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append("..")
+
+import numpy as np
+import pandas as pd
+from srv.trajectory_index import TrajectoryIndexStore
+
+
+class TrajectoryIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        rows = []
+        for objid in rng.permutation(np.arange(1, 41)):
+            first = int(rng.integers(0, 100))
+            for frame in range(first, first + int(rng.integers(1, 30))):
+                rows.append((frame, objid, 2, rng.random() * 100))
+        # frame order, as written by the tracking task
+        self.df = pd.DataFrame(rows, columns=["frame", "objid", "clsid", "speed"])
+        self.df = self.df.sort_values(["frame", "objid"], ignore_index=True)
+        self.df.to_csv(os.path.join(self._dir, "task.csv"), index=False)
+        self.store = TrajectoryIndexStore(self._dir)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_by_objid(self):
+        index = self.store.get("task.csv")
+        for objid in [1, 17, 40]:
+            expected = self.df[self.df["objid"] == objid].reset_index(drop=True)
+            pd.testing.assert_frame_equal(index.by_objid(objid), expected)
+        self.assertEqual(len(index.by_objid(999)), 0)
+
+    def test_by_frame(self):
+        index = self.store.get("task.csv")
+        df = index.by_frame(30, 50)
+        expected = self.df[(self.df["frame"] >= 30) & (self.df["frame"] < 50)]
+        pd.testing.assert_frame_equal(df, expected.reset_index(drop=True))
+        self.assertEqual(len(index.by_frame(30, 50, limit=5)), 5)
+
+    def test_objects(self):
+        index = self.store.get("task.csv")
+        objects = index.objects(minspeed=90)
+        maxspeed = self.df.groupby("objid")["speed"].max()
+        self.assertEqual(
+            objects["objid"].tolist(), maxspeed.index[maxspeed >= 90].tolist()
+        )
+        self.assertEqual(len(index.objects()), self.df["objid"].nunique())
+
+    def test_rebuild_on_change(self):
+        index = self.store.get("task.csv")
+        self.assertIs(self.store.get("task.csv"), index)
+
+        self.df[self.df["objid"] != 1].to_csv(
+            os.path.join(self._dir, "task.csv"), index=False
+        )
+        os.utime(os.path.join(self._dir, "task.csv"), ns=(0, 0))
+        index = self.store.get("task.csv")
+        self.assertEqual(len(index.by_objid(1)), 0)
+
+        # removed outputs are purged on startup
+        os.remove(os.path.join(self._dir, "task.csv"))
+        TrajectoryIndexStore(self._dir)
+        self.assertEqual(os.listdir(os.path.join(self._dir, ".index")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+testing the frame source backends in video_frame_source.py
+"""
+
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append("..")
+
+import cv2
+import numpy as np
+from srv.video_frame_source import open_frame_source
+
+FRAMES = 30
+SIZE = (320, 240)
+
+BACKENDS = {
+    "opencv": True,
+    "pyav": importlib.util.find_spec("av") is not None,
+    "ffmpeg": bool(shutil.which("ffmpeg") and shutil.which("ffprobe")),
+}
+
+
+class FrameSourceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._dir = tempfile.mkdtemp()
+        cls.path = os.path.join(cls._dir, "clip.mp4")
+        writer = cv2.VideoWriter(cls.path, cv2.VideoWriter.fourcc(*"mp4v"), 30, SIZE)
+        for i in range(FRAMES):
+            frame = np.full((SIZE[1], SIZE[0], 3), i * 8, dtype=np.uint8)
+            frame[:, : SIZE[0] // 2, 2] = 255  # left half red
+            writer.write(frame)
+        writer.release()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._dir)
+
+    def _read(self, backend: str, **kwargs) -> list[np.ndarray]:
+        with open_frame_source(self.path, backend=backend, **kwargs) as source:
+            self.assertEqual((source.src_width, source.src_height), SIZE)
+            self.assertAlmostEqual(source.fps, 30, places=1)
+            return [frame.copy() for frame in source]
+
+    def test_backends(self):
+        expected = self._read("opencv")
+        for backend, available in BACKENDS.items():
+            if not available:
+                continue
+            for threads in (0, 2):
+                with self.subTest(backend=backend, threads=threads):
+                    frames = self._read(backend, threads=threads)
+                    self.assertEqual(len(frames), FRAMES)
+                    self.assertEqual(frames[0].shape, (SIZE[1], SIZE[0], 3))
+                    # same picture whatever the decoder (BGR order, up to rounding)
+                    for frame, other in zip(frames, expected):
+                        diff = np.abs(frame.astype(int) - other.astype(int))
+                        self.assertLess(diff.mean(), 4)
+
+    def test_resize(self):
+        for backend, available in BACKENDS.items():
+            if not available:
+                continue
+            with self.subTest(backend=backend):
+                frames = self._read(backend, size=(160, 120))
+                self.assertEqual(len(frames), FRAMES)
+                self.assertEqual(frames[0].shape, (120, 160, 3))
+                self.assertGreater(frames[0][:, :80, 2].mean(), 200)
+                self.assertLess(frames[0][:, 80:, 2].mean(), 50)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            open_frame_source(self.path, backend="unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+testing VideoSpriteStore in video_sprite.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append("..")
+
+import cv2
+import numpy as np
+from core.model import EntityNotFound, TaskOutput
+from srv.video_sprite import VideoSpriteStore
+
+
+def write_video(path: str, frames: int = 60, size: tuple[int, int] = (320, 180)):
+    # 30 fps, brightness of frame i is i * 4
+    writer = cv2.VideoWriter(path, cv2.VideoWriter.fourcc(*"mp4v"), 30, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), i * 4, dtype=np.uint8))
+    writer.release()
+
+
+class VideoSpriteStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        write_video(os.path.join(self._dir, "video.mp4"))
+        self.store = VideoSpriteStore(
+            self._dir, interval=0.5, width=64, columns=3, rows=1
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _decode(self, jpeg: bytes) -> np.ndarray:
+        return cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def test_generate_on_save(self):
+        with self.assertRaises(EntityNotFound):
+            self.store.get_index("video.mp4")  # schedules generation
+
+        self.store.on_output_saved(
+            TaskOutput(
+                name="video.mp4", type="video/mp4", desc="", taskid="t", metadata={}
+            )
+        )
+        self.store.schedule("video.mp4").result(timeout=30)
+
+        index = self.store.get_index("video.mp4")
+        self.assertEqual(index["count"], 4)
+        self.assertEqual((index["width"], index["height"]), (64, 36))
+        self.assertEqual(index["sheets"], ["sheet0.jpg", "sheet1.jpg"])
+
+        vtt = self.store.get_vtt("video.mp4")
+        self.assertTrue(vtt.startswith("WEBVTT"))
+        self.assertIn("00:00:01.500 --> 00:00:02.000\nsheet1.jpg#xywh=0,0,64,36", vtt)
+
+        sheet, _ = self.store.get_sheet("video.mp4", "sheet0.jpg")
+        self.assertEqual(self._decode(sheet).shape, (36, 192, 3))
+        with self.assertRaises(EntityNotFound):
+            self.store.get_sheet("video.mp4", "../video.mp4")
+
+    def test_tile(self):
+        self.store.generate("video.mp4")
+
+        for t, frame in [(0.0, 0), (0.7, 15), (1.0, 30), (100.0, 45)]:
+            tile, etag = self.store.get_tile("video.mp4", t)
+            image = self._decode(tile)
+            self.assertEqual(image.shape, (36, 64, 3))
+            self.assertAlmostEqual(image.mean(), frame * 4, delta=8)
+            self.assertTrue(etag.endswith(f'-{frame // 15}"'))
+
+        # a modified video is not served from the old sprite
+        write_video(os.path.join(self._dir, "video.mp4"), frames=30)
+        os.utime(os.path.join(self._dir, "video.mp4"), ns=(0, 0))
+        self.store.schedule("video.mp4").result(timeout=30)
+        self.assertEqual(self.store.get_index("video.mp4")["count"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
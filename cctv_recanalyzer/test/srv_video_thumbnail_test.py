@@ -0,0 +1,78 @@
+"""
+testing VideoThumbnailStore in video_thumbnail.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append("..")
+
+import cv2
+import numpy as np
+from core.model import TaskOutput
+from srv.video_thumbnail import VideoThumbnailStore
+
+
+def write_video(path: str, frames: int = 60, size: tuple[int, int] = (640, 360)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter.fourcc(*"mp4v"), 30, size)
+    for i in range(frames):
+        frame = np.full((size[1], size[0], 3), i * 4 % 256, dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+
+
+class VideoThumbnailStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        write_video(os.path.join(self._dir, "video.mp4"))
+        self.store = VideoThumbnailStore(self._dir, widths=(160, 320, 0))
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _width(self, jpeg: bytes) -> int:
+        image = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return image.shape[1]
+
+    def test_sizes(self):
+        self.assertEqual(self._width(self.store.get("video.mp4", 160)[0]), 160)
+        self.assertEqual(self._width(self.store.get("video.mp4", 200)[0]), 320)
+        self.assertEqual(self._width(self.store.get("video.mp4", 0)[0]), 640)
+        self.assertEqual(self._width(self.store.get("video.mp4", 5000)[0]), 640)
+
+    def test_cache_and_etag(self):
+        jpeg, etag = self.store.get("video.mp4", 320)
+        self.assertIs(self.store.get("video.mp4", 320)[0], jpeg)  # memory hit
+
+        # a new store reads the same thumbnail from disk
+        store = VideoThumbnailStore(self._dir, widths=(160, 320, 0))
+        self.assertEqual(store.get("video.mp4", 320), (jpeg, etag))
+
+        # replacing the video invalidates the thumbnail
+        write_video(os.path.join(self._dir, "video.mp4"), frames=90)
+        os.utime(os.path.join(self._dir, "video.mp4"), ns=(0, 0))
+        self.assertNotEqual(self.store.get("video.mp4", 320)[1], etag)
+
+        with self.assertRaises(ValueError):
+            self.store.get("missing.mp4")
+
+    def test_generate_on_save(self):
+        self.store.on_output_saved(
+            TaskOutput(
+                name="video.mp4", type="video/mp4", desc="", taskid="t", metadata={}
+            )
+        )
+        path = os.path.join(self._dir, ".thumb", "video.mp4", "160.jpg")
+        deadline = time.monotonic() + 30
+        while not os.path.exists(path) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertTrue(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+작업자 노드: 공유 볼륨의 작업 대기열(JOB_QUEUE_PATH)에서 객체 추적, 분석 작업을 가져와 실행한다.
+API 노드(main.py)와 같은 JOB_QUEUE_PATH, TASK_OUTPUT_PATH를 사용해야 한다.
+
+    python worker.py
+"""
+
+import os
+import signal
+import socket
+import threading
+
+from core.engine import ResourceClass, TaskEngine
+from dotenv import load_dotenv
+from repo.job_queue_sqlite import JobQueueSQLiteRepo
+from srv.job_queue import (
+    JobRunner,
+    JobWorker,
+    QueuedTaskItemRepo,
+    QueuedTaskOutputRepo,
+)
+from srv.process_task_executor import ProcessTaskExecutor
+
+load_dotenv()
+
+
+def get_env_force(key: str) -> str:
+    value = os.getenv(key)
+    if value is None:
+        raise ValueError(f"{key} is not set")
+    return value
+
+
+JOB_QUEUE_PATH = get_env_force("JOB_QUEUE_PATH")
+TASK_OUTPUT_PATH = get_env_force("TASK_OUTPUT_PATH")
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+WORKER_KINDS = os.getenv("WORKER_KINDS", "tracking,analysis,batch_analysis")
+VIDEO_DECODE_BACKEND = os.getenv("VIDEO_DECODE_BACKEND", "opencv")
+ANALYSIS_CHUNK_ROWS = int(os.getenv("ANALYSIS_CHUNK_ROWS", "0"))
+ANALYSIS_MAX_WORKERS = int(os.getenv("ANALYSIS_MAX_WORKERS", "2"))
+TASK_CPU_HEAVY_WORKERS = int(os.getenv("TASK_CPU_HEAVY_WORKERS", "1"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+
+def main():
+    kinds = [kind.strip() for kind in WORKER_KINDS.split(",") if kind.strip()]
+
+    job_queue = JobQueueSQLiteRepo(JOB_QUEUE_PATH, max_attempts=JOB_MAX_ATTEMPTS)
+    task_repo = QueuedTaskItemRepo(job_queue, WORKER_ID, JOB_LEASE_SECONDS)
+    output_repo = QueuedTaskOutputRepo(job_queue, WORKER_ID)
+    engine = TaskEngine(
+        task_repo,
+        {
+            ResourceClass.CPU_HEAVY: TASK_CPU_HEAVY_WORKERS,
+            ResourceClass.CPU_LIGHT: ANALYSIS_MAX_WORKERS,
+            ResourceClass.CONTROL: 1,
+        },
+    )
+
+    runners: dict[str, JobRunner] = {}
+    if "tracking" in kinds:
+        # imported here so analysis-only workers do not load the detection model
+        from srv.cctv_yolov8_deepsort import (
+            YOLOv8DeepSORTTackingTaskSrv,
+            load_tracking_modules,
+        )
+
+        # load the heavy modules before leasing the first job
+        load_tracking_modules()
+        tracking_srv = YOLOv8DeepSORTTackingTaskSrv(
+            task_repo=task_repo,
+            model_path=get_env_force("YOLO_MODEL_PATH"),
+            outputs_path=TASK_OUTPUT_PATH,
+            output_repo=output_repo,
+            engine=engine,
+            decode_backend=VIDEO_DECODE_BACKEND,
+        )
+        runners["tracking"] = JobRunner(ResourceClass.CPU_HEAVY, tracking_srv.run_task)
+
+    if "analysis" in kinds or "batch_analysis" in kinds:
+        from srv.cctv_tracking_analysis import CCTVTrackingAnalysisTaskSrv
+        from srv.cctv_tracking_batch_analysis import CCTVTrackingBatchAnalysisTaskSrv
+
+        executor = ProcessTaskExecutor(ANALYSIS_MAX_WORKERS)
+        analysis_srv = CCTVTrackingAnalysisTaskSrv(
+            task_repo=task_repo,
+            outputs_path=TASK_OUTPUT_PATH,
+            output_repo=output_repo,
+            engine=engine,
+            chunk_rows=ANALYSIS_CHUNK_ROWS,
+            executor=executor,
+        )
+        batch_analysis_srv = CCTVTrackingBatchAnalysisTaskSrv(
+            task_repo=task_repo,
+            outputs_path=TASK_OUTPUT_PATH,
+            output_repo=output_repo,
+            engine=engine,
+            executor=executor,
+        )
+        if "analysis" in kinds:
+            runners["analysis"] = JobRunner(
+                ResourceClass.CPU_LIGHT, analysis_srv.run_task
+            )
+        if "batch_analysis" in kinds:
+            runners["batch_analysis"] = JobRunner(
+                ResourceClass.CPU_LIGHT, batch_analysis_srv.run_task
+            )
+
+    if not runners:
+        raise ValueError(f"실행할 수 있는 작업 종류가 없습니다: {WORKER_KINDS}")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    print(f"worker {WORKER_ID} started: {', '.join(runners)}")
+    JobWorker(
+        job_queue,
+        engine,
+        task_repo,
+        runners,
+        WORKER_ID,
+        lease_seconds=JOB_LEASE_SECONDS,
+        heartbeat_seconds=JOB_HEARTBEAT_SECONDS,
+    ).run(stop)
+
+
+if __name__ == "__main__":
+    main()